@@ -18,7 +18,10 @@
     'depends': ['point_of_sale', 'odoo_ncf_module'],
     'data': [
         'security/ir.model.access.csv',
+        'data/ir_cron_data.xml',
+        'wizard/ncf_sequence_pos_split_wizard_views.xml',
         'views/pos_order_views.xml',
+        'views/ncf_sequence_views.xml',
     ],
     'assets': {
         'point_of_sale._assets_pos': [
@@ -9,7 +9,7 @@
         - Integración con RNC
         - Gestión de secuencias NCF
         - Integración con facturas y POS
-        - Generación de reportes 606 y 607 para DGII
+        - Generación de reportes 606, 607 y 608 para DGII
         - Validaciones según normativas fiscales dominicanas
     ''',
     'category': 'Accounting/Localizations',
@@ -23,13 +23,24 @@
     'data': [
         'security/fiscal_groups.xml',
         'security/ir.model.access.csv',
+        'security/fiscal_rules.xml',
         'data/tipo_comprobante_data.xml',
+        'data/ir_cron_data.xml',
+        'data/ncf_reporte_linea_data.xml',
         'views/tipo_comprobante_views.xml',
         'views/account_move_views.xml',
         'views/pos_order_views.xml',
         'views/res_partner_views.xml',
+        'views/res_company_views.xml',
+        'views/ecf_submission_views.xml',
+        'views/ncf_audit_event_views.xml',
+        'views/ncf_reporte_linea_views.xml',
+        'views/ncf_reporte_envio_views.xml',
         'wizard/reporte_606_wizard_views.xml',
         'wizard/reporte_607_wizard_views.xml',
+        'wizard/reporte_608_wizard_views.xml',
+        'wizard/ncf_anulacion_wizard_views.xml',
+        'wizard/ncf_impresion_masiva_wizard_views.xml',
         'reports/external_layout.xml',
         'reports/invoice_report.xml',
     ],
@@ -39,6 +50,6 @@
     'application': False,
     'auto_install': False,
     'external_dependencies': {
-        'python': ['xlsxwriter'],
+        'python': ['xlsxwriter', 'cryptography', 'requests'],
     },
 }
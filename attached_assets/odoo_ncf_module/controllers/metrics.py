@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+import hmac
+
+from odoo import http
+from odoo.http import request
+from odoo.tools import config
+
+from ..tools import metrics
+
+
+class NCFMetricsController(http.Controller):
+
+    @http.route('/odoo_ncf/metrics', type='http', auth='none', methods=['GET'], csrf=False, save_session=False)
+    def ncf_metrics(self):
+        """Expone las métricas fiscales del proceso en formato Prometheus
+
+        Requiere la opción ``ncf_metrics_token`` en la configuración de Odoo;
+        el cliente debe enviarla como ``Authorization: Bearer <token>``.
+        """
+        token = config.get('ncf_metrics_token')
+        authorization = request.httprequest.headers.get('Authorization', '')
+        if not token or not hmac.compare_digest(authorization, f'Bearer {token}'):
+            return request.not_found()
+        return request.make_response(
+            metrics.REGISTRY.render_prometheus(),
+            headers=[('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')]
+        )
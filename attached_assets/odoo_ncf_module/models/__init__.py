@@ -1,5 +1,16 @@
 # -*- coding: utf-8 -*-
 from . import tipo_comprobante
+from . import ncf_sequence_counter
+from . import ncf_sequence_gap
+from . import ncf_audit_event
+from . import ncf_reporte_linea
+from . import ncf_reporte_envio
+from . import ncf_reporte_archivo
+from . import ecf_document
+from . import ecf_submission
 from . import account_move
 from . import pos_order
 from . import res_partner
+from . import res_company
+from . import ir_actions_report
+from . import report_invoice
@@ -1,11 +1,32 @@
 # -*- coding: utf-8 -*-
+from collections import defaultdict
+
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
+from odoo.tools.sql import create_index
 import re
 
+from ..tools import metrics
+from .ncf_reporte_linea import CAMPOS_REPORTE
+
+# Tipos de anulación del formato 608 de la DGII
+TIPOS_ANULACION = [
+    ('01', '01 - Deterioro de factura preimpresa'),
+    ('02', '02 - Errores de impresión (factura preimpresa)'),
+    ('03', '03 - Impresión defectuosa'),
+    ('04', '04 - Corrección de la información'),
+    ('05', '05 - Cambio de productos'),
+    ('06', '06 - Devolución de productos'),
+    ('07', '07 - Omisión de productos'),
+    ('08', '08 - Errores en secuencia de NCF'),
+    ('09', '09 - Por cese de operaciones'),
+    ('10', '10 - Pérdida o hurto de talonarios'),
+]
+
 
 class AccountMove(models.Model):
-    _inherit = 'account.move'
+    _inherit = ['account.move', 'ecf.document.mixin']
+    _name = 'account.move'
 
     tipo_comprobante_id = fields.Many2one(
         'tipo.comprobante',
@@ -14,12 +35,12 @@ class AccountMove(models.Model):
     )
     ncf = fields.Char(
         string='NCF',
-        size=11,
+        size=13,
         help='Número de Comprobante Fiscal (asignado automáticamente)'
     )
     ncf_modificado = fields.Char(
         string='NCF Modificado',
-        size=11,
+        size=13,
         help='NCF del documento que modifica (para notas de crédito/débito)'
     )
     es_fiscal = fields.Boolean(
@@ -41,6 +62,12 @@ class AccountMove(models.Model):
         string='Motivo Anulación',
         help='Motivo de la anulación del comprobante'
     )
+    tipo_anulacion = fields.Selection(
+        TIPOS_ANULACION,
+        string='Tipo de Anulación',
+        copy=False,
+        help='Tipo de anulación reportado en el formato 608 de la DGII'
+    )
     rnc = fields.Char(
         string='RNC/Cédula',
         size=20,
@@ -60,11 +87,12 @@ class AccountMove(models.Model):
         'ncf.sequence',
         string='Secuencia NCF Utilizada',
         help='Secuencia utilizada para generar el NCF',
-        readonly=True
+        readonly=True,
+        check_company=True
     )
     requiere_ncf = fields.Boolean(
         string='Requiere NCF',
-        compute='_compute_requiere_ncf',
+        compute='_compute_clasificacion_fiscal',
         store=True,
         help='Indica si esta factura debe tener NCF'
     )
@@ -75,46 +103,68 @@ class AccountMove(models.Model):
     )
     es_factura_fiscal = fields.Boolean(
         string='Es Factura Fiscal',
-        compute='_compute_es_factura_fiscal',
+        compute='_compute_clasificacion_fiscal',
         store=True
     )
 
-    @api.depends('move_type', 'tipo_comprobante_id')
-    def _compute_requiere_ncf(self):
-        """Determina si la factura requiere NCF basado en el tipo de movimiento y comprobante"""
-        for record in self:
-            # Solo facturas de venta con tipo de comprobante fiscal requieren NCF
-            record.requiere_ncf = (
-                record.move_type in ['out_invoice', 'out_refund'] and
-                record.tipo_comprobante_id and
-                record.tipo_comprobante_id.es_fiscal
-            )
-    
-    @api.depends('tipo_comprobante_id', 'move_type')
-    def _compute_es_factura_fiscal(self):
-        """Determina si es una factura fiscal"""
+    def init(self):
+        """Índices por empresa para la unicidad del NCF y los reportes DGII"""
+        super().init()
+        create_index(
+            self._cr, 'account_move_company_ncf_idx', self._table,
+            ['company_id', 'ncf'], where='ncf IS NOT NULL'
+        )
+        create_index(
+            self._cr, 'account_move_company_reporte_fiscal_idx', self._table,
+            ['company_id', 'move_type', 'invoice_date'], where="state = 'posted'"
+        )
+        create_index(
+            self._cr, 'account_move_company_anulado_fecha_idx', self._table,
+            ['company_id', 'anulado', 'fecha_anulacion']
+        )
+        create_index(
+            self._cr, 'account_move_company_factura_fiscal_idx', self._table,
+            ['company_id', 'tipo_comprobante_id', 'invoice_date'], where='es_factura_fiscal'
+        )
+
+    @api.depends('move_type', 'tipo_comprobante_id.es_fiscal')
+    def _compute_clasificacion_fiscal(self):
+        """Clasificación fiscal almacenada: facturas de venta con tipo de comprobante fiscal
+
+        Un solo cómputo para ``requiere_ncf`` y ``es_factura_fiscal``; el ORM
+        lo recalcula en lote cuando cambia el tipo de movimiento, el tipo de
+        comprobante o el carácter fiscal del tipo.
+        """
         for record in self:
-            record.es_factura_fiscal = (
-                record.move_type in ['out_invoice', 'out_refund'] and
-                record.tipo_comprobante_id and
+            fiscal = bool(
+                record.move_type in ('out_invoice', 'out_refund') and
                 record.tipo_comprobante_id.es_fiscal
             )
+            record.requiere_ncf = fiscal
+            record.es_factura_fiscal = fiscal
     
-    @api.depends('tipo_comprobante_id', 'company_id')
+    @api.depends('tipo_comprobante_id', 'company_id', 'es_factura_fiscal')
     def _compute_alertas_ncf(self):
-        """Calcula alertas relacionadas con NCF"""
-        for record in self:
-            if record.tipo_comprobante_id and record.es_factura_fiscal:
-                try:
-                    sequence = self.env['ncf.sequence'].get_active_sequence_for_type(
-                        record.tipo_comprobante_id.id, 
-                        record.company_id.id
-                    )
-                    record.alerta_ncf = sequence.get_alert_message()
-                except ValidationError:
-                    record.alerta_ncf = '❌ No hay secuencia NCF configurada para este tipo de comprobante'
-            else:
-                record.alerta_ncf = ''
+        """Calcula alertas relacionadas con NCF
+
+        La secuencia activa se busca una vez por (empresa, tipo) para todo el
+        conjunto, así una lista de facturas no hace una búsqueda por fila.
+        """
+        fiscales = self.filtered(lambda r: r.tipo_comprobante_id and r.es_factura_fiscal)
+        (self - fiscales).alerta_ncf = ''
+        
+        alertas = {}
+        for company in fiscales.company_id:
+            tipos = fiscales.filtered(lambda r: r.company_id == company).tipo_comprobante_id
+            sequences = self.env['ncf.sequence'].get_active_sequences_for_types(tipos.ids, company.id)
+            for tipo in tipos:
+                sequence = sequences.get(tipo.id)
+                alertas[company.id, tipo.id] = (
+                    sequence.get_alert_message() if sequence
+                    else _('❌ No hay secuencia NCF configurada para este tipo de comprobante')
+                )
+        for record in fiscales:
+            record.alerta_ncf = alertas[record.company_id.id, record.tipo_comprobante_id.id]
     
     @api.onchange('partner_id', 'move_type')
     def _onchange_partner_tipo_comprobante(self):
@@ -144,6 +194,13 @@ class AccountMove(models.Model):
         if not self.move_type in ['out_invoice', 'out_refund']:
             return
         
+        if self.move_type == 'out_invoice' and self.partner_id.rnc == self.rnc:
+            # Perfil fiscal precalculado del cliente: no requiere búsqueda
+            tipo_defecto = self.partner_id.tipo_comprobante_defecto_id
+            if tipo_defecto:
+                self.tipo_comprobante_id = tipo_defecto
+                return
+        
         domain = [('para_venta', '=', True), ('activo', '=', True)]
         
         # Determinar tipo basado en cliente
@@ -201,21 +258,23 @@ class AccountMove(models.Model):
         """Valida el formato del NCF"""
         for record in self:
             if record.ncf:
-                if not re.match(r'^[A-Z]\d{10}$', record.ncf):
+                if not re.match(r'^([A-Z]\d{10}|E\d{12})$', record.ncf):
                     raise ValidationError(
-                        _('El NCF debe tener el formato: 1 letra seguida de 10 dígitos')
+                        _('El NCF debe tener el formato: 1 letra seguida de 10 dígitos '
+                          '(e-CF: E seguida de 12 dígitos)')
                     )
 
-    @api.constrains('ncf')
+    @api.constrains('ncf', 'company_id')
     def _check_ncf_unique(self):
-        """Valida que el NCF sea único"""
+        """Valida que el NCF sea único por empresa"""
         for record in self:
             if record.ncf:
                 existing = self.search([
+                    ('company_id', '=', record.company_id.id),
                     ('ncf', '=', record.ncf),
                     ('id', '!=', record.id),
                     ('anulado', '=', False)
-                ])
+                ], limit=1)
                 if existing:
                     raise ValidationError(
                         _('Ya existe una factura con el NCF %s') % record.ncf
@@ -231,7 +290,8 @@ class AccountMove(models.Model):
                 
                 # Generar NCF si no tiene uno
                 if not record.ncf:
-                    record._generate_ncf()
+                    with metrics.timer('ncf_invoice_assign_seconds'):
+                        record._generate_ncf()
                     
                 # Validar que el NCF se generó correctamente
                 if not record.ncf:
@@ -242,6 +302,9 @@ class AccountMove(models.Model):
         # Llamar al método padre
         result = super().action_post()
         
+        # Los e-CF se generan en lote fuera de la confirmación (ver _cron_generate_ecf)
+        self._mark_ecf_pending()
+        
         # Si se generó NCF, forzar refrescado de la vista
         if self.ncf and self.es_factura_fiscal:
             # Invalida cache para asegurar que la UI se actualice
@@ -297,14 +360,15 @@ class AccountMove(models.Model):
                 self.company_id.id
             )
             
-            # Calcular siguiente número sin consumir
-            next_number = sequence.secuencia_actual + 1 if sequence.secuencia_actual >= sequence.secuencia_desde else sequence.secuencia_desde
-            preview_ncf = f"{sequence.serie}{self.tipo_comprobante_id.codigo}{str(next_number).zfill(8)}"
+            # Calcular siguiente número sin consumir, según el contador
+            status = sequence.get_live_status()[sequence.id]
+            next_number = max(status['secuencia_actual'] + 1, sequence.secuencia_desde)
+            preview_ncf = sequence._format_ncf(next_number)
             
             return {
                 'ncf': preview_ncf,
                 'sequence': sequence.display_name,
-                'disponibles': sequence.disponibles
+                'disponibles': status['disponibles']
             }
             
         except ValidationError:
@@ -329,7 +393,7 @@ class AccountMove(models.Model):
             )
             
             # Generar NCF y asociar secuencia usando write para bypass readonly
-            ncf_generado = sequence.get_next_ncf()
+            ncf_generado = sequence.get_next_ncf(document=self)
             
             # Forzar la actualización usando sudo para bypass de cualquier restricción
             self.sudo().write({
@@ -339,15 +403,15 @@ class AccountMove(models.Model):
             
             # Refrescar el record para asegurar que se vean los cambios
             self.env.flush_all()
-            self._compute_es_factura_fiscal()
             
             # Recargar el record desde la base de datos para refrescar todos los campos
             self.env.cache.invalidate()
             
-            # Log para auditoría
-            self.message_post(
-                body=_('NCF %s asignado desde secuencia %s') % (ncf_generado, sequence.display_name)
-            )
+            # La asignación queda en la bitácora fiscal; el chatter es opcional en documentos POS
+            if self._ncf_chatter_enabled():
+                self.message_post(
+                    body=_('NCF %s asignado desde secuencia %s') % (ncf_generado, sequence.display_name)
+                )
             
             return ncf_generado
             
@@ -356,6 +420,12 @@ class AccountMove(models.Model):
                 _('Error al generar NCF para la factura: %s') % str(e)
             )
 
+    def _ncf_chatter_enabled(self):
+        """Publica en el chatter salvo en facturas del POS, si la empresa lo desactivó"""
+        self.ensure_one()
+        es_pos = 'pos_order_ids' in self._fields and bool(self.pos_order_ids)
+        return not es_pos or self.company_id.ncf_chatter_pos
+
     def action_force_generate_ncf(self):
         """Método para generar NCF manualmente (para debug)"""
         self.ensure_one()
@@ -391,30 +461,64 @@ class AccountMove(models.Model):
             }
 
     def action_anular_ncf(self):
-        """Anula el NCF del comprobante"""
-        for record in self:
-            if record.state != 'posted':
-                raise ValidationError(_('Solo se pueden anular facturas confirmadas'))
-            
-            record.write({
+        """Abre el asistente de anulación para los comprobantes seleccionados"""
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('Anular NCF'),
+            'res_model': 'ncf.anulacion.wizard',
+            'view_mode': 'form',
+            'target': 'new',
+            'context': {'active_model': 'account.move', 'active_ids': self.ids},
+        }
+
+    def _check_anulable(self):
+        """Valida en conjunto que los comprobantes se puedan anular"""
+        errores = []
+        no_confirmadas = self.filtered(lambda m: m.state != 'posted')
+        if no_confirmadas:
+            errores.append(_('No están confirmadas: %s') % ', '.join(no_confirmadas[:10].mapped('name')))
+        anuladas = self.filtered('anulado')
+        if anuladas:
+            errores.append(_('Ya están anuladas: %s') % ', '.join(anuladas[:10].mapped('ncf')))
+        sin_ncf = self.filtered(lambda m: not m.ncf)
+        if sin_ncf:
+            errores.append(_('No tienen NCF: %s') % ', '.join(sin_ncf[:10].mapped('name')))
+        if errores:
+            raise ValidationError(
+                _('No se pueden anular %d comprobantes.\n%s') % (
+                    len(no_confirmadas | anuladas | sin_ncf), '\n'.join(errores)
+                )
+            )
+
+    def _anular_ncf(self, tipo_anulacion, motivo, fecha=None):
+        """Anula los comprobantes con una sola escritura para todo el conjunto"""
+        self._check_anulable()
+        with metrics.timer('ncf_bulk_void_seconds'):
+            self.write({
                 'anulado': True,
-                'fecha_anulacion': fields.Datetime.now(),
+                'fecha_anulacion': fecha or fields.Datetime.now(),
+                'tipo_anulacion': tipo_anulacion,
+                'motivo_anulacion': motivo,
                 'state': 'cancel'
             })
+            self.env['ncf.audit.event']._log_documents('anulacion', self, detalle=tipo_anulacion)
+        metrics.incr('ncf_voided_total', amount=len(self))
 
     def action_reactivar_ncf(self):
         """Reactiva el NCF del comprobante"""
-        for record in self:
-            record.write({
-                'anulado': False,
-                'fecha_anulacion': False,
-                'motivo_anulacion': False
-            })
+        self.write({
+            'anulado': False,
+            'fecha_anulacion': False,
+            'tipo_anulacion': False,
+            'motivo_anulacion': False
+        })
+        self.env['ncf.audit.event']._log_documents('reactivacion', self.filtered('ncf'))
 
     @api.model
-    def get_facturas_606(self, fecha_desde, fecha_hasta):
+    def get_facturas_606(self, fecha_desde, fecha_hasta, company_id=None):
         """Obtiene facturas para reporte 606 (ventas)"""
         domain = [
+            ('company_id', '=', company_id or self.env.company.id),
             ('move_type', 'in', ['out_invoice', 'out_refund']),
             ('state', '=', 'posted'),
             ('invoice_date', '>=', fecha_desde),
@@ -425,9 +529,10 @@ class AccountMove(models.Model):
         return self.search(domain)
 
     @api.model
-    def get_facturas_607(self, fecha_desde, fecha_hasta):
+    def get_facturas_607(self, fecha_desde, fecha_hasta, company_id=None):
         """Obtiene facturas para reporte 607 (compras)"""
         domain = [
+            ('company_id', '=', company_id or self.env.company.id),
             ('move_type', 'in', ['in_invoice', 'in_refund']),
             ('state', '=', 'posted'),
             ('invoice_date', '>=', fecha_desde),
@@ -436,6 +541,46 @@ class AccountMove(models.Model):
         ]
         return self.search(domain)
 
+    def _prepare_ecf_data(self):
+        """Datos de las facturas para el XML e-CF"""
+        result = []
+        for move in self:
+            lines = move.invoice_line_ids.filtered(lambda l: l.display_type == 'product')
+            items = []
+            monto_gravado = monto_exento = 0.0
+            for numero, line in enumerate(lines, 1):
+                gravado = bool(line.tax_ids)
+                if gravado:
+                    monto_gravado += line.price_subtotal
+                else:
+                    monto_exento += line.price_subtotal
+                items.append({
+                    'numero_linea': numero,
+                    'indicador_facturacion': 1 if gravado else 4,
+                    'nombre_item': (line.name or line.product_id.name or '')[:80],
+                    'indicador_bien_servicio': 2 if line.product_id.type == 'service' else 1,
+                    'cantidad_item': line.quantity,
+                    'precio_unitario_item': line.price_unit,
+                    'monto_item': line.price_subtotal,
+                })
+            result.append({
+                'tipo_ecf': move.ncf[1:3],
+                'encf': move.ncf,
+                'fecha_vencimiento_secuencia': move.ncf_sequence_id.fecha_fin,
+                'tipo_ingresos': '01',
+                'tipo_pago': 1 if move.invoice_date_due == move.invoice_date else 2,
+                'fecha_emision': move.invoice_date,
+                'rnc_comprador': move.rnc,
+                'razon_social_comprador': move.partner_id.name if move.rnc else None,
+                'monto_gravado_total': monto_gravado,
+                'monto_exento': monto_exento,
+                'total_itbis': move.get_itbis_amount(),
+                'monto_total': move.get_total_amount(),
+                'items': items,
+                'ncf_modificado': move.ncf_modificado,
+            })
+        return result
+
     def get_itbis_amount(self):
         """Calcula el monto de ITBIS"""
         self.ensure_one()
@@ -445,6 +590,21 @@ class AccountMove(models.Model):
                 itbis_amount += abs(line.balance)
         return itbis_amount
 
+    def _get_ncf_itbis_amounts(self):
+        """ITBIS de cada factura en una sola consulta: ``{move_id: monto}``"""
+        amounts = defaultdict(float)
+        if not self.ids:
+            return amounts
+        groups = self.env['account.move.line']._read_group(
+            [('move_id', 'in', self.ids), ('tax_line_id', '!=', False)],
+            ['move_id', 'tax_line_id'],
+            ['balance:sum'],
+        )
+        for move, tax, balance in groups:
+            if 'ITBIS' in (tax.name or '').upper():
+                amounts[move.id] += abs(balance)
+        return amounts
+
     def get_base_amount(self):
         """Calcula el monto base (sin impuestos)"""
         self.ensure_one()
@@ -455,6 +615,36 @@ class AccountMove(models.Model):
         self.ensure_one()
         return abs(self.amount_total)
 
+    def _get_ncf_tax_summary(self):
+        """Impuestos de cada factura en una sola consulta: ``{move_id: [(impuesto, monto), ...]}``"""
+        summary = {move.id: [] for move in self}
+        if not self.ids:
+            return summary
+        groups = self.env['account.move.line']._read_group(
+            [('move_id', 'in', self.ids), ('tax_line_id', '!=', False)],
+            ['move_id', 'tax_line_id'],
+            ['amount_currency:sum'],
+        )
+        for move, tax, amount in groups:
+            summary[move.id].append((tax.name, amount))
+        return summary
+
+    def _ncf_prefetch_report_data(self):
+        """Carga de una vez los datos que la plantilla de factura lee por documento"""
+        self.mapped('partner_id.state_id.name')
+        self.mapped('tipo_comprobante_id.name')
+        self.mapped('currency_id.symbol')
+        lines = self.mapped('invoice_line_ids')
+        lines.mapped('product_id.default_code')
+        lines.mapped('product_uom_id.name')
+
     def write(self, vals):
-        """Sobrescribir write para permitir actualización de NCF desde código interno"""
-        return super().write(vals)
+        """Mantiene el registro fiscal 606/607 al confirmar, anular, reactivar o pasar a borrador"""
+        result = super().write(vals)
+        if CAMPOS_REPORTE.intersection(vals):
+            moves = self
+            if 'state' not in vals and 'anulado' not in vals:
+                # Sin cambio de estado solo importan los documentos ya reportados
+                moves = self.filtered(lambda m: m.state == 'posted' or m.anulado)
+            self.env['ncf.reporte.linea']._sync_moves(moves)
+        return result
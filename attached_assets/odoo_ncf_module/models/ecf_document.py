@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+import base64
+import logging
+from collections import defaultdict
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from odoo.tools import split_every
+
+from ..tools import ecf, metrics
+
+_logger = logging.getLogger(__name__)
+
+# Documentos por lote: se preparan, renderizan y escriben juntos
+ECF_BATCH_SIZE = 200
+
+
+class EcfDocumentMixin(models.AbstractModel):
+    _name = 'ecf.document.mixin'
+    _description = 'Documento con Comprobante Fiscal Electrónico'
+
+    ecf_estado = fields.Selection([
+        ('pendiente', 'Pendiente'),
+        ('generado', 'Generado'),
+        ('error', 'Error'),
+    ], string='Estado e-CF', copy=False, index=True)
+    ecf_xml = fields.Binary(
+        string='XML e-CF',
+        attachment=True,
+        copy=False
+    )
+    ecf_xml_fname = fields.Char(
+        string='Archivo e-CF',
+        copy=False
+    )
+    ecf_fecha_firma = fields.Datetime(
+        string='Fecha de Firma',
+        copy=False
+    )
+    ecf_error = fields.Text(
+        string='Error e-CF',
+        copy=False
+    )
+    ecf_submission_id = fields.Many2one(
+        'ecf.submission',
+        string='Envío a la DGII',
+        copy=False,
+        readonly=True
+    )
+    ecf_dgii_estado = fields.Selection(
+        related='ecf_submission_id.estado',
+        string='Estado DGII'
+    )
+    ecf_track_id = fields.Char(
+        related='ecf_submission_id.track_id',
+        string='TrackId DGII'
+    )
+
+    def _prepare_ecf_data(self):
+        """Datos de cada documento para ``tools.ecf`` (una lista, en el orden de ``self``)"""
+        raise NotImplementedError()
+
+    def _prepare_ecf_emisor(self, company):
+        """Datos del emisor comunes a todos los documentos de la empresa"""
+        return {
+            'rnc_emisor': company.partner_id.rnc or company.vat,
+            'razon_social_emisor': company.name,
+            'direccion_emisor': company.street,
+        }
+
+    def _mark_ecf_pending(self):
+        """Encola para generación los documentos con NCF electrónico"""
+        self.filtered(lambda r: ecf.is_ecf(r.ncf) and r.ecf_estado != 'generado').write({
+            'ecf_estado': 'pendiente',
+            'ecf_error': False,
+        })
+
+    def _generate_ecf(self):
+        """Genera, valida y firma los e-CF en lotes por empresa
+
+        Los datos de cada lote se leen juntos (``_prepare_ecf_data``), el
+        esquema XSD y el certificado se cargan una vez por proceso, y cada
+        documento queda en estado ``generado`` o ``error`` sin interrumpir
+        al resto del lote. Los generados quedan en la cola de envío a la DGII.
+        """
+        documents = self.filtered(lambda r: ecf.is_ecf(r.ncf))
+        generated = self.browse()
+        for company in documents.company_id:
+            company_docs = documents.filtered(lambda r: r.company_id == company)
+            try:
+                signer = company._get_ecf_signer()
+            except (UserError, ValueError) as e:
+                company_docs.write({'ecf_estado': 'error', 'ecf_error': str(e)})
+                continue
+            emisor = self._prepare_ecf_emisor(company)
+            
+            for batch in split_every(ECF_BATCH_SIZE, company_docs.ids, self.browse):
+                with metrics.timer('ncf_ecf_batch_seconds', modelo=self._name):
+                    generated |= batch._generate_ecf_batch(signer, emisor, company.ecf_xsd_directorio)
+        self.env['ecf.submission'].sudo()._enqueue(generated)
+
+    def _generate_ecf_batch(self, signer, emisor, xsd_directorio):
+        """Genera los e-CF de un lote y escribe los resultados agrupados
+
+        Un documento que falla (datos inválidos para el esquema, o un error al
+        renderizar o firmar) queda en ``error`` con el mensaje y no detiene el
+        lote. Los estados se escriben una vez por lote (una escritura por
+        mensaje de error distinto); solo el XML y su nombre, propios de cada
+        documento, se escriben por documento. Retorna los generados.
+        """
+        datas = self._prepare_ecf_data()
+        now = fields.Datetime.now()
+        errores = defaultdict(list)
+        xmls = []
+        for record, data in zip(self, datas):
+            data.update(emisor, fecha_hora_firma=now)
+            try:
+                xml, errors = ecf.build_document(data, signer, xsd_directorio)
+            except Exception as e:
+                _logger.exception('Error al generar el e-CF %s', record.ncf)
+                errors = [str(e) or e.__class__.__name__]
+            if errors:
+                errores['\n'.join(errors)].append(record.id)
+            else:
+                xmls.append((record, xml))
+
+        for mensaje, ids in errores.items():
+            self.browse(ids).write({'ecf_estado': 'error', 'ecf_error': mensaje})
+        if errores:
+            metrics.incr('ncf_ecf_errors_total', sum(map(len, errores.values())), modelo=self._name)
+
+        generated = self.browse([record.id for record, _xml in xmls])
+        for record, xml in xmls:
+            record.write({'ecf_xml': base64.b64encode(xml), 'ecf_xml_fname': '%s.xml' % record.ncf})
+        if generated:
+            generated.write({'ecf_estado': 'generado', 'ecf_fecha_firma': now, 'ecf_error': False})
+            metrics.incr('ncf_ecf_generated_total', len(generated), modelo=self._name)
+        return generated
+
+    def action_generate_ecf(self):
+        """Botón para generar (o regenerar) el e-CF de los documentos seleccionados"""
+        documents = self.filtered(lambda r: ecf.is_ecf(r.ncf))
+        if not documents:
+            raise UserError(_('Los documentos seleccionados no tienen NCF electrónico (serie E)'))
+        documents._generate_ecf()
+
+    def action_send_ecf(self):
+        """Envía de inmediato a la DGII los e-CF generados seleccionados"""
+        documents = self.filtered(lambda r: r.ecf_estado == 'generado')
+        if not documents:
+            raise UserError(_('Los documentos seleccionados no tienen e-CF generado'))
+        self.env['ecf.submission'].sudo()._enqueue(
+            documents.filtered(lambda r: r.ecf_dgii_estado in (False, 'rechazado', 'error'))
+        )
+        documents.ecf_submission_id.sudo().action_process_now()
+
+    @api.model
+    def _cron_generate_ecf(self, limit=2000):
+        """Genera los e-CF pendientes"""
+        pending = self.search([('ecf_estado', '=', 'pendiente')], limit=limit)
+        _logger.info('Generando %s e-CF pendientes de %s', len(pending), self._name)
+        pending._generate_ecf()
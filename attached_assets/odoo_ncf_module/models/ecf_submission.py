@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+import base64
+import logging
+from datetime import timedelta
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+
+from ..tools import ecf_client, metrics
+
+_logger = logging.getLogger(__name__)
+
+# Envíos (o consultas) por lote; cada lote se confirma por separado en el cron
+ECF_SUBMISSION_BATCH = 50
+# Reintentos de envío antes de dejar el documento en error
+ECF_MAX_INTENTOS = 8
+# Espera antes de la primera consulta de estado (la DGII procesa en diferido)
+ECF_POLL_DELAY = 30
+
+ESTADOS_DGII = {
+    'Aceptado': 'aceptado',
+    'Aceptado Condicional': 'aceptado_condicional',
+    'Rechazado': 'rechazado',
+}
+
+
+class EcfSubmission(models.Model):
+    _name = 'ecf.submission'
+    _description = 'Cola de Envío de e-CF'
+    _order = 'proximo_intento, id'
+
+    name = fields.Char(
+        string='e-NCF',
+        required=True,
+        index=True
+    )
+    company_id = fields.Many2one(
+        'res.company',
+        string='Empresa',
+        required=True,
+        index=True
+    )
+    res_model = fields.Char(
+        string='Modelo',
+        required=True
+    )
+    res_id = fields.Many2oneReference(
+        string='Documento',
+        model_field='res_model',
+        required=True
+    )
+    estado = fields.Selection([
+        ('pendiente', 'En Cola'),
+        ('enviado', 'Enviado'),
+        ('aceptado', 'Aceptado'),
+        ('aceptado_condicional', 'Aceptado Condicional'),
+        ('rechazado', 'Rechazado'),
+        ('error', 'Error'),
+    ], string='Estado', required=True, default='pendiente', index=True)
+    track_id = fields.Char(
+        string='TrackId',
+        index=True,
+        readonly=True
+    )
+    intentos = fields.Integer(
+        string='Intentos',
+        readonly=True
+    )
+    proximo_intento = fields.Datetime(
+        string='Próximo Intento',
+        default=fields.Datetime.now,
+        index=True
+    )
+    fecha_envio = fields.Datetime(
+        string='Fecha de Envío',
+        readonly=True
+    )
+    fecha_respuesta = fields.Datetime(
+        string='Fecha de Respuesta',
+        readonly=True
+    )
+    mensaje = fields.Text(
+        string='Mensaje',
+        readonly=True
+    )
+
+    _sql_constraints = [
+        ('document_uniq', 'unique(res_model, res_id)', 'El documento ya está en la cola de envío'),
+    ]
+
+    @api.model
+    def _enqueue(self, documents):
+        """Pone en cola los e-CF generados de ``documents`` (reencola los ya existentes)"""
+        if not documents:
+            return self.browse()
+        existing = self.search([('res_model', '=', documents._name), ('res_id', 'in', documents.ids)])
+        existing.write({
+            'estado': 'pendiente',
+            'track_id': False,
+            'intentos': 0,
+            'proximo_intento': fields.Datetime.now(),
+            'mensaje': False,
+        })
+        nuevos = documents.browse(set(documents.ids) - set(existing.mapped('res_id')))
+        created = self.create([{
+            'name': document.ncf,
+            'company_id': document.company_id.id,
+            'res_model': document._name,
+            'res_id': document.id,
+        } for document in nuevos])
+        for submission, document in zip(created, nuevos):
+            document.ecf_submission_id = submission
+        return existing | created
+
+    def _lock_due(self, estado, limit):
+        """Toma (y bloquea) los envíos vencidos; otro proceso salta los bloqueados"""
+        self.env.cr.execute("""
+            SELECT id FROM ecf_submission
+             WHERE estado = %s AND proximo_intento <= (now() AT TIME ZONE 'UTC')
+             ORDER BY proximo_intento, id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+        """, (estado, limit))
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
+    def _get_documents(self):
+        """Documentos de los envíos, leídos por modelo: ``{(modelo, id): registro}``"""
+        documents = {}
+        for res_model in set(self.mapped('res_model')):
+            records = self.env[res_model].browse(
+                self.filtered(lambda s: s.res_model == res_model).mapped('res_id')
+            ).exists()
+            documents.update({(res_model, record.id): record for record in records})
+        return documents
+
+    def _schedule_retry(self, message, max_intentos=ECF_MAX_INTENTOS, base=ECF_POLL_DELAY):
+        """Reprograma con espera exponencial; agotados los intentos queda en error"""
+        now = fields.Datetime.now()
+        for submission in self:
+            intentos = submission.intentos + 1
+            vals = {'intentos': intentos, 'mensaje': message}
+            if max_intentos and intentos >= max_intentos:
+                vals['estado'] = 'error'
+            else:
+                vals['proximo_intento'] = now + timedelta(seconds=ecf_client.backoff_delay(intentos, base))
+            submission.write(vals)
+        metrics.incr('ncf_ecf_retries_total', amount=len(self))
+
+    def _get_client_or_retry(self, company):
+        """Cliente de la empresa; si no está configurada, reprograma sus envíos"""
+        try:
+            return company._get_ecf_client()
+        except (UserError, ValueError) as e:
+            self._schedule_retry(str(e))
+            return None
+
+    def _send(self):
+        """Envía los e-CF en paralelo (por empresa) y guarda el trackId de cada uno"""
+        documents = self._get_documents()
+        for company in self.company_id:
+            submissions = self.filtered(lambda s: s.company_id == company)
+            client = submissions._get_client_or_retry(company)
+            if client is None:
+                continue
+
+            ready = self.browse()
+            items = []
+            for submission in submissions:
+                document = documents.get((submission.res_model, submission.res_id))
+                if not document or not document.ecf_xml:
+                    submission.write({'estado': 'error', 'mensaje': _('El documento no tiene XML e-CF')})
+                    continue
+                ready |= submission
+                items.append((base64.b64decode(document.ecf_xml), document.ecf_xml_fname or '%s.xml' % submission.name))
+
+            with metrics.timer('ncf_ecf_submit_batch_seconds'):
+                results = client.submit_many(items)
+            now = fields.Datetime.now()
+            for submission, (data, error) in zip(ready, results):
+                if error is None:
+                    submission.write({
+                        'estado': 'enviado',
+                        'track_id': data['trackId'],
+                        'intentos': 0,
+                        'fecha_envio': now,
+                        'proximo_intento': now + timedelta(seconds=ECF_POLL_DELAY),
+                        'mensaje': False,
+                    })
+                    metrics.incr('ncf_ecf_submitted_total')
+                elif isinstance(error, ecf_client.EcfRejectedError):
+                    submission.write({'estado': 'rechazado', 'fecha_respuesta': now, 'mensaje': str(error)})
+                    metrics.incr('ncf_ecf_rejected_total')
+                else:
+                    submission._schedule_retry(str(error))
+
+    def _poll(self):
+        """Consulta en paralelo el estado de los e-CF enviados"""
+        for company in self.company_id:
+            submissions = self.filtered(lambda s: s.company_id == company)
+            client = submissions._get_client_or_retry(company)
+            if client is None:
+                continue
+
+            with metrics.timer('ncf_ecf_status_batch_seconds'):
+                results = client.status_many(submissions.mapped('track_id'))
+            now = fields.Datetime.now()
+            for submission, (data, error) in zip(submissions, results):
+                estado = ESTADOS_DGII.get(data.get('estado')) if data else None
+                if estado is None:
+                    # En proceso o sin respuesta: se vuelve a consultar, sin límite de intentos
+                    submission._schedule_retry(
+                        str(error) if error else data.get('estado'), max_intentos=0
+                    )
+                    continue
+                submission.write({
+                    'estado': estado,
+                    'fecha_respuesta': now,
+                    'mensaje': '\n'.join(
+                        m.get('valor') or '' for m in data.get('mensajes') or []
+                    ) or False,
+                })
+                metrics.incr('ncf_ecf_%s_total' % estado)
+
+    @api.model
+    def _cron_process_queue(self, limit=1000):
+        """Envía los e-CF en cola y consulta el estado de los enviados
+
+        Cada lote se confirma al terminar, así un envío aceptado por la DGII
+        no se repite aunque falle un lote posterior.
+        """
+        for estado, method in (('pendiente', '_send'), ('enviado', '_poll')):
+            procesados = 0
+            while procesados < limit:
+                batch = self._lock_due(estado, min(ECF_SUBMISSION_BATCH, limit - procesados))
+                if not batch:
+                    break
+                getattr(batch, method)()
+                procesados += len(batch)
+                self.env.cr.commit()  # pylint: disable=invalid-commit
+            if procesados:
+                _logger.info('e-CF: %s envíos procesados en estado %s', procesados, estado)
+
+    def action_process_now(self):
+        """Envía o consulta de inmediato los registros seleccionados"""
+        failed = self.filtered(lambda s: s.estado == 'error')
+        failed.write({'estado': 'pendiente', 'intentos': 0})
+        self.filtered(lambda s: s.estado == 'pendiente')._send()
+        self.filtered(lambda s: s.estado == 'enviado')._poll()
+
+    def action_open_document(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self.res_model,
+            'res_id': self.res_id,
+            'view_mode': 'form',
+        }
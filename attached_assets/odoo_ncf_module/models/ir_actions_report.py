@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+from odoo import models
+
+
+class IrActionsReport(models.Model):
+    _inherit = 'ir.actions.report'
+
+    def _render_qweb_pdf(self, report_ref, res_ids=None, data=None):
+        """Registra en la bitácora fiscal cada impresión de facturas con NCF"""
+        result = super()._render_qweb_pdf(report_ref, res_ids=res_ids, data=data)
+        report = self._get_report(report_ref)
+        if report.model == 'account.move' and res_ids:
+            moves = self.env['account.move'].browse(res_ids).filtered('ncf')
+            self.env['ncf.audit.event']._log_documents('impresion', moves, detalle=report.name)
+        return result
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from odoo.tools.sql import create_index
+
+# Clave de los eventos pendientes en ``cr.precommit.data``
+_PENDING_KEY = 'ncf.audit.event.pending'
+
+
+class NCFAuditEvent(models.Model):
+    """Bitácora fiscal de solo inserción
+
+    Reemplaza los mensajes de chatter por NCF: cada evento es una fila
+    angosta sin seguidores ni notificaciones. Los eventos de una
+    transacción se acumulan en memoria y se insertan juntos antes del
+    commit (``cr.precommit``), por lo que no son visibles en búsquedas
+    dentro de la misma transacción que los generó.
+    """
+    _name = 'ncf.audit.event'
+    _description = 'Bitácora Fiscal de NCF'
+    _order = 'fecha desc, id desc'
+    _log_access = False
+
+    fecha = fields.Datetime(
+        string='Fecha',
+        required=True,
+        readonly=True,
+        default=fields.Datetime.now
+    )
+    evento = fields.Selection([
+        ('asignacion', 'Asignación'),
+        ('anulacion', 'Anulación'),
+        ('reactivacion', 'Reactivación'),
+        ('impresion', 'Impresión / Reimpresión'),
+    ], string='Evento', required=True, readonly=True)
+    ncf = fields.Char(
+        string='NCF',
+        size=13,
+        readonly=True
+    )
+    company_id = fields.Many2one(
+        'res.company',
+        string='Empresa',
+        required=True,
+        readonly=True
+    )
+    sequence_id = fields.Many2one(
+        'ncf.sequence',
+        string='Secuencia NCF',
+        readonly=True,
+        ondelete='set null'
+    )
+    res_model = fields.Char(
+        string='Modelo',
+        readonly=True
+    )
+    res_id = fields.Many2oneReference(
+        string='Documento',
+        model_field='res_model',
+        readonly=True
+    )
+    user_id = fields.Many2one(
+        'res.users',
+        string='Usuario',
+        readonly=True
+    )
+    detalle = fields.Char(
+        string='Detalle',
+        readonly=True
+    )
+
+    def init(self):
+        """Índices para consultar la bitácora por NCF, secuencia o período"""
+        create_index(
+            self._cr, 'ncf_audit_event_company_fecha_idx', self._table,
+            ['company_id', 'fecha']
+        )
+        create_index(
+            self._cr, 'ncf_audit_event_ncf_idx', self._table,
+            ['ncf'], where='ncf IS NOT NULL'
+        )
+        create_index(
+            self._cr, 'ncf_audit_event_sequence_fecha_idx', self._table,
+            ['sequence_id', 'fecha'], where='sequence_id IS NOT NULL'
+        )
+
+    def write(self, vals):
+        raise UserError(_('Los eventos de la bitácora fiscal no se pueden modificar'))
+
+    def unlink(self):
+        raise UserError(_('Los eventos de la bitácora fiscal no se pueden eliminar'))
+
+    @api.model
+    def _log(self, evento, company, ncf=False, sequence=None, document=None, detalle=False):
+        """Registra un evento; se inserta junto con los demás antes del commit"""
+        precommit = self.env.cr.precommit
+        pending = precommit.data.get(_PENDING_KEY)
+        if pending is None:
+            pending = precommit.data[_PENDING_KEY] = []
+            precommit.add(self._flush_pending)
+        pending.append({
+            'fecha': fields.Datetime.now(),
+            'evento': evento,
+            'ncf': ncf,
+            'company_id': company.id,
+            'sequence_id': sequence.id if sequence else False,
+            'res_model': document._name if document else False,
+            'res_id': document.id if document else False,
+            'user_id': self.env.uid,
+            'detalle': detalle,
+        })
+
+    @api.model
+    def _log_documents(self, evento, documents, detalle=False):
+        """Registra el mismo evento para cada documento con NCF"""
+        for document in documents:
+            self._log(evento, document.company_id, ncf=document.ncf, document=document, detalle=detalle)
+
+    @api.model
+    def _flush_pending(self):
+        """Inserta en un solo lote los eventos acumulados en la transacción"""
+        vals_list = self.env.cr.precommit.data.pop(_PENDING_KEY, None)
+        if vals_list:
+            self.sudo().create(vals_list)
+
+    def action_open_document(self):
+        self.ensure_one()
+        if not (self.res_model and self.res_id):
+            raise UserError(_('El evento no está asociado a un documento'))
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self.res_model,
+            'res_id': self.res_id,
+            'view_mode': 'form',
+        }
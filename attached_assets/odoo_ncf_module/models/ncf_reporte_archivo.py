@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+
+
+class NCFReporteArchivo(models.Model):
+    """Archivo 606/607 generado, guardado para volver a descargarlo
+
+    Un registro por clave (empresa, reporte, período, anulados y formato)
+    con la huella de los registros fiscales con que se generó; mientras la
+    huella siga vigente el asistente entrega el archivo sin recalcularlo. El
+    archivo es un campo binario del modelo, así que solo lo leen los
+    usuarios de reportes DGII de la empresa (no es un adjunto de la empresa
+    visible para cualquier usuario interno).
+    """
+    _name = 'ncf.reporte.archivo'
+    _description = 'Archivo de Reporte 606/607 en Caché'
+
+    company_id = fields.Many2one(
+        'res.company',
+        string='Empresa',
+        required=True,
+        readonly=True
+    )
+    clave = fields.Char(
+        string='Clave',
+        required=True,
+        readonly=True
+    )
+    huella = fields.Char(
+        string='Huella de los Registros',
+        readonly=True
+    )
+    archivo = fields.Binary(
+        string='Archivo',
+        attachment=True,
+        readonly=True
+    )
+    mimetype = fields.Char(
+        string='Tipo MIME',
+        readonly=True
+    )
+
+    _sql_constraints = [
+        ('clave_uniq', 'unique(clave)', 'Ya existe un archivo guardado con esta clave'),
+    ]
+
+    @api.model
+    def _get_archivo(self, company, clave, huella):
+        """Archivo guardado para ``clave`` si su huella sigue vigente"""
+        guardado = self.search([('company_id', '=', company.id), ('clave', '=', clave)], limit=1)
+        if guardado and guardado.huella == huella:
+            return guardado.archivo
+        return False
+
+    @api.model
+    def _set_archivo(self, company, clave, huella, archivo, mimetype):
+        """Guarda (o reemplaza) el archivo generado para ``clave``"""
+        guardado = self.search([('company_id', '=', company.id), ('clave', '=', clave)], limit=1)
+        vals = {'archivo': archivo, 'huella': huella, 'mimetype': mimetype}
+        if guardado:
+            guardado.write(vals)
+        else:
+            self.create(dict(vals, company_id=company.id, clave=clave))
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+
+# NCF listados por categoría en el resumen de cambios
+MAX_NCF_RESUMEN = 50
+
+
+class NCFReporteEnvio(models.Model):
+    """Reporte 606/607 enviado a la DGII
+
+    Guarda el archivo enviado y la huella de cada fila (por documento) para
+    calcular, al rectificar el período, qué filas se agregaron, eliminaron o
+    cambiaron desde el último envío. La huella de cada registro fiscal se
+    almacena al escribirlo, así que la comparación no recalcula las filas ni
+    depende de las fechas de modificación.
+    """
+    _name = 'ncf.reporte.envio'
+    _description = 'Envío de Reporte 606/607'
+    _order = 'fecha_envio desc, id desc'
+
+    name = fields.Char(
+        string='Nombre',
+        compute='_compute_name',
+        store=True
+    )
+    company_id = fields.Many2one(
+        'res.company',
+        string='Empresa',
+        required=True,
+        readonly=True,
+        index=True
+    )
+    reporte = fields.Selection([
+        ('606', '606 - Ventas'),
+        ('607', '607 - Compras'),
+    ], string='Reporte', required=True, readonly=True)
+    fecha_desde = fields.Date(
+        string='Fecha Desde',
+        required=True,
+        readonly=True
+    )
+    fecha_hasta = fields.Date(
+        string='Fecha Hasta',
+        required=True,
+        readonly=True
+    )
+    incluir_anulados = fields.Boolean(
+        string='Incluye Anulados',
+        readonly=True
+    )
+    fecha_envio = fields.Datetime(
+        string='Fecha de Envío',
+        required=True,
+        readonly=True,
+        default=fields.Datetime.now
+    )
+    user_id = fields.Many2one(
+        'res.users',
+        string='Registrado por',
+        readonly=True,
+        default=lambda self: self.env.user
+    )
+    archivo = fields.Binary(
+        string='Archivo Enviado',
+        attachment=True,
+        readonly=True
+    )
+    nombre_archivo = fields.Char(
+        string='Nombre del Archivo',
+        readonly=True
+    )
+    cantidad_filas = fields.Integer(
+        string='Filas',
+        readonly=True
+    )
+    filas = fields.Json(
+        string='Huellas de las Filas',
+        readonly=True,
+        help='{move_id: [huella, ncf]} de cada fila del archivo enviado'
+    )
+
+    @api.depends('reporte', 'fecha_desde', 'fecha_hasta')
+    def _compute_name(self):
+        for envio in self:
+            envio.name = f"{envio.reporte} {envio.fecha_desde} - {envio.fecha_hasta}"
+
+    def _get_domain_lineas(self):
+        self.ensure_one()
+        return self.env['ncf.reporte.linea']._get_domain(
+            self.company_id, self.reporte, self.fecha_desde, self.fecha_hasta, self.incluir_anulados
+        )
+
+    @api.model
+    def _registrar(self, company, reporte, fecha_desde, fecha_hasta, incluir_anulados,
+                   archivo, nombre_archivo):
+        """Registra el envío del archivo con la huella de los registros actuales"""
+        Linea = self.env['ncf.reporte.linea']
+        huellas = Linea._get_huellas_filas(
+            Linea._get_domain(company, reporte, fecha_desde, fecha_hasta, incluir_anulados)
+        )
+        return self.create({
+            'company_id': company.id,
+            'reporte': reporte,
+            'fecha_desde': fecha_desde,
+            'fecha_hasta': fecha_hasta,
+            'incluir_anulados': incluir_anulados,
+            'archivo': archivo,
+            'nombre_archivo': nombre_archivo,
+            'cantidad_filas': len(huellas),
+            'filas': {str(move_id): list(valor) for move_id, valor in huellas.items()},
+        })
+
+    @api.model
+    def _get_ultimo(self, company, reporte, fecha_desde, fecha_hasta, incluir_anulados):
+        return self.search([
+            ('company_id', '=', company.id),
+            ('reporte', '=', reporte),
+            ('fecha_desde', '=', fecha_desde),
+            ('fecha_hasta', '=', fecha_hasta),
+            ('incluir_anulados', '=', incluir_anulados),
+        ], limit=1)
+
+    def _get_cambios(self):
+        """Filas agregadas, eliminadas y modificadas desde este envío
+
+        Retorna un diccionario con las listas de NCF de cada categoría. Las
+        huellas de las filas actuales están almacenadas (``huella``), así que
+        la comparación con las enviadas, por documento, es una sola consulta
+        sin recalcular ninguna fila.
+        """
+        self.ensure_one()
+        enviadas = {int(move_id): tuple(valor) for move_id, valor in (self.filas or {}).items()}
+        actuales = self.env['ncf.reporte.linea']._get_huellas_filas(self._get_domain_lineas())
+        agregados, modificados = [], []
+        for move_id, (huella, ncf) in actuales.items():
+            anterior = enviadas.get(move_id)
+            if anterior is None:
+                agregados.append(ncf)
+            elif anterior[0] != huella:
+                modificados.append(ncf)
+        eliminados = [ncf for move_id, (_huella, ncf) in enviadas.items() if move_id not in actuales]
+        return {
+            'agregados': sorted(agregados),
+            'eliminados': sorted(eliminados),
+            'modificados': sorted(modificados),
+            'filas': len(actuales),
+        }
+
+    @api.model
+    def _format_resumen(self, cambios, envio):
+        """Texto del resumen de cambios contra ``envio``"""
+        lineas = [
+            _('Cambios contra el envío del %(fecha)s (%(filas)s filas):',
+              fecha=fields.Datetime.to_string(envio.fecha_envio), filas=envio.cantidad_filas),
+        ]
+        etiquetas = [
+            ('agregados', _('Agregados')),
+            ('eliminados', _('Eliminados')),
+            ('modificados', _('Modificados')),
+        ]
+        for clave, etiqueta in etiquetas:
+            ncfs = cambios[clave]
+            lineas.append(f"{etiqueta}: {len(ncfs)}")
+            if ncfs:
+                resto = len(ncfs) - MAX_NCF_RESUMEN
+                lineas.append('  ' + ', '.join(ncf or _('(sin NCF)') for ncf in ncfs[:MAX_NCF_RESUMEN])
+                              + (_(' y %s más', resto) if resto > 0 else ''))
+        if not any(cambios[clave] for clave, _etiqueta in etiquetas):
+            lineas.append(_('No hay cambios: el archivo es igual al enviado.'))
+        lineas.append(_('Filas del archivo de reemplazo: %s', cambios['filas']))
+        return '\n'.join(lineas)
+
+    def action_descargar_archivo(self):
+        self.ensure_one()
+        if not self.archivo:
+            raise UserError(_('El envío no tiene archivo'))
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f'/web/content?model=ncf.reporte.envio&id={self.id}&field=archivo&download=true&filename={self.nombre_archivo}',
+            'target': 'self',
+        }
@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+import hashlib
+
+from odoo import models, fields, api
+from odoo.tools import split_every
+from odoo.tools.sql import create_index
+
+from ..tools import dgii_validacion
+
+# Reporte DGII de cada tipo de movimiento
+REPORTE_POR_TIPO = {
+    'out_invoice': '606',
+    'out_refund': '606',
+    'in_invoice': '607',
+    'in_refund': '607',
+}
+# Campos de account.move que cambian el registro fiscal de un documento
+CAMPOS_REPORTE = {
+    'state', 'anulado', 'ncf', 'ncf_modificado', 'ref', 'partner_id',
+    'invoice_date', 'invoice_date_due', 'tipo_comprobante_id',
+}
+# Documentos procesados por lote al reconstruir el almacén
+LOTE_REPORTE = 1000
+# Versión de los formatos de archivo; forma parte de la huella de los
+# reportes en caché, así un cambio de formato invalida los archivos guardados
+VERSION_ARCHIVOS = 4
+# Columnas enviadas a la DGII; su contenido forma la huella de cada fila
+CAMPOS_ENVIO = (
+    'estado', 'rnc', 'tipo_id', 'tipo_bienes_servicios', 'ncf', 'ncf_modificado',
+    'tipo_comprobante', 'fecha_comprobante', 'fecha_pago', 'monto_facturado',
+    'itbis_facturado', 'itbis_retenido', 'itbis_percibido', 'retencion_renta',
+    'isr_percibido', 'impuesto_selectivo', 'otros_impuestos', 'propina_legal',
+    'forma_pago',
+)
+
+
+class NCFReporteLinea(models.Model):
+    """Registro fiscal 606/607 materializado
+
+    Una fila normalizada por factura confirmada (o anulada), con los datos
+    que piden los formatos de la DGII. Se mantiene al confirmar, anular,
+    reactivar o pasar a borrador el documento (ver ``account.move.write``),
+    de modo que generar el reporte de un mes es una lectura por rango del
+    índice (empresa, reporte, fecha) sin recalcular montos por factura. Los
+    datos del cliente quedan como estaban al confirmar.
+    """
+    _name = 'ncf.reporte.linea'
+    _description = 'Registro Fiscal 606/607'
+    _order = 'fecha_comprobante, move_name, id'
+
+    move_id = fields.Many2one(
+        'account.move',
+        string='Documento',
+        required=True,
+        readonly=True,
+        ondelete='cascade'
+    )
+    move_name = fields.Char(
+        string='Número',
+        readonly=True
+    )
+    company_id = fields.Many2one(
+        'res.company',
+        string='Empresa',
+        required=True,
+        readonly=True
+    )
+    reporte = fields.Selection([
+        ('606', '606 - Ventas'),
+        ('607', '607 - Compras'),
+    ], string='Reporte', required=True, readonly=True)
+    periodo = fields.Char(
+        string='Período',
+        size=6,
+        readonly=True,
+        help='Período fiscal AAAAMM'
+    )
+    estado = fields.Selection([
+        ('vigente', 'Vigente'),
+        ('anulado', 'Anulado'),
+    ], string='Estado', required=True, default='vigente', readonly=True)
+    rnc = fields.Char(
+        string='RNC/Cédula',
+        readonly=True
+    )
+    tipo_id = fields.Char(
+        string='Tipo ID',
+        size=1,
+        readonly=True
+    )
+    tipo_bienes_servicios = fields.Char(
+        string='Tipo Bienes y Servicios',
+        size=2,
+        readonly=True
+    )
+    ncf = fields.Char(
+        string='NCF',
+        size=13,
+        readonly=True
+    )
+    ncf_modificado = fields.Char(
+        string='NCF Modificado',
+        size=13,
+        readonly=True
+    )
+    tipo_comprobante = fields.Char(
+        string='Tipo Comprobante',
+        size=2,
+        readonly=True
+    )
+    fecha_comprobante = fields.Date(
+        string='Fecha Comprobante',
+        required=True,
+        readonly=True
+    )
+    fecha_pago = fields.Date(
+        string='Fecha Vencimiento / Pago',
+        readonly=True
+    )
+    monto_facturado = fields.Float(
+        string='Monto Facturado',
+        readonly=True
+    )
+    itbis_facturado = fields.Float(
+        string='ITBIS Facturado',
+        readonly=True
+    )
+    itbis_retenido = fields.Float(
+        string='ITBIS Retenido',
+        readonly=True
+    )
+    itbis_percibido = fields.Float(
+        string='ITBIS Percibido',
+        readonly=True
+    )
+    retencion_renta = fields.Float(
+        string='Retención Renta',
+        readonly=True
+    )
+    isr_percibido = fields.Float(
+        string='ISR Percibido',
+        readonly=True
+    )
+    impuesto_selectivo = fields.Float(
+        string='Impuesto Selectivo Consumo',
+        readonly=True
+    )
+    otros_impuestos = fields.Float(
+        string='Otros Impuestos/Tasas',
+        readonly=True
+    )
+    propina_legal = fields.Float(
+        string='Monto Propina Legal',
+        readonly=True
+    )
+    forma_pago = fields.Char(
+        string='Forma de Pago',
+        size=2,
+        readonly=True
+    )
+    huella = fields.Char(
+        string='Huella',
+        compute='_compute_huella',
+        store=True,
+        help='Resumen de las columnas enviadas a la DGII; se recalcula al escribir la fila'
+    )
+
+    _sql_constraints = [
+        ('move_uniq', 'unique(move_id)', 'El documento ya tiene un registro fiscal'),
+    ]
+
+    def init(self):
+        """Índice de la lectura por rango de los reportes mensuales"""
+        create_index(
+            self._cr, 'ncf_reporte_linea_company_reporte_fecha_idx', self._table,
+            ['company_id', 'reporte', 'fecha_comprobante']
+        )
+
+    @api.model
+    def _sync_moves(self, moves):
+        """Crea, actualiza o elimina los registros fiscales de ``moves``
+
+        Un documento tiene registro si está confirmado o anulado (las ventas,
+        además, solo si son fiscales). Los montos de ITBIS de todo el lote se
+        obtienen con una consulta agrupada.
+        """
+        moves = moves.filtered(lambda m: m.move_type in REPORTE_POR_TIPO)
+        if not moves:
+            return
+        lineas = self.sudo()
+        incluidas = moves.filtered(
+            lambda m: (m.state == 'posted' or m.anulado)
+            and (REPORTE_POR_TIPO[m.move_type] == '607' or m.es_fiscal)
+        )
+        existing = lineas.search([('move_id', 'in', moves.ids)])
+        existing.filtered(lambda r: r.move_id not in incluidas).unlink()
+        by_move = {row.move_id.id: row for row in existing if row.move_id in incluidas}
+
+        itbis = incluidas._get_ncf_itbis_amounts()
+        vals_list = []
+        for move in incluidas:
+            vals = lineas._prepare_vals(move, itbis.get(move.id, 0.0))
+            row = by_move.get(move.id)
+            if row is None:
+                vals_list.append(vals)
+            elif row._has_changes(vals):
+                row.write(vals)
+        if vals_list:
+            lineas.create(vals_list)
+
+    def _has_changes(self, vals):
+        self.ensure_one()
+        for field, value in vals.items():
+            current = self[field]
+            if isinstance(current, models.BaseModel):
+                current = current.id
+            if current != value:
+                return True
+        return False
+
+    @api.model
+    def _prepare_vals(self, move, itbis_facturado):
+        reporte = REPORTE_POR_TIPO[move.move_type]
+        partner = move.partner_id
+        fecha = move.invoice_date or move.date
+        vals = {
+            'move_id': move.id,
+            'move_name': move.name,
+            'company_id': move.company_id.id,
+            'reporte': reporte,
+            'periodo': fecha.strftime('%Y%m'),
+            'estado': 'anulado' if move.anulado else 'vigente',
+            'rnc': partner.rnc or partner.vat or False,
+            'tipo_id': '1' if partner.tipo_rnc == 'rnc' else '2',
+            'fecha_comprobante': fecha,
+            'monto_facturado': abs(move.amount_total),
+            'itbis_facturado': itbis_facturado,
+            'forma_pago': '01',
+        }
+        if reporte == '606':
+            vals.update({
+                'tipo_bienes_servicios': False,
+                'ncf': move.ncf or False,
+                'ncf_modificado': move.ncf_modificado or False,
+                'tipo_comprobante': move.tipo_comprobante_id.codigo or False,
+                'fecha_pago': move.invoice_date_due or fecha,
+            })
+        else:
+            vals.update({
+                'tipo_bienes_servicios': '01',
+                'ncf': move.ref or False,
+                'ncf_modificado': False,
+                'tipo_comprobante': '01',
+                'fecha_pago': fecha,
+            })
+        return vals
+
+    @api.model
+    def _get_domain(self, company, reporte, fecha_desde, fecha_hasta, incluir_anulados=False):
+        domain = [
+            ('company_id', '=', company.id),
+            ('reporte', '=', reporte),
+            ('fecha_comprobante', '>=', fecha_desde),
+            ('fecha_comprobante', '<=', fecha_hasta),
+        ]
+        if not incluir_anulados:
+            domain.append(('estado', '=', 'vigente'))
+        return domain
+
+    @api.model
+    def _get_lineas(self, company, reporte, fecha_desde, fecha_hasta, incluir_anulados=False):
+        """Registros del período, en el orden del reporte"""
+        return self.search(
+            self._get_domain(company, reporte, fecha_desde, fecha_hasta, incluir_anulados)
+        )
+
+    @api.model
+    def _get_huella(self, company, reporte, fecha_desde, fecha_hasta, incluir_anulados=False):
+        """Huella de los registros del período
+
+        Cantidad, suma de ids y última modificación, en una consulta agrupada
+        sobre el mismo índice que la lectura del reporte. Cualquier registro
+        creado, modificado o eliminado cambia la huella: los ids nuevos son
+        mayores que los existentes y toda escritura actualiza ``write_date``.
+        """
+        [(cantidad, suma_ids, ultima)] = self._read_group(
+            self._get_domain(company, reporte, fecha_desde, fecha_hasta, incluir_anulados),
+            aggregates=['__count', 'id:sum', 'write_date:max'],
+        )
+        return f"v{VERSION_ARCHIVOS}:{cantidad}:{suma_ids or 0}:{ultima or ''}"
+
+    @api.depends(*CAMPOS_ENVIO)
+    def _compute_huella(self):
+        """Huella de las columnas enviadas (``CAMPOS_ENVIO``)
+
+        Se calcula solo para las filas que ``_sync_moves`` crea o modifica;
+        dos filas con la misma huella producen la misma línea en el archivo.
+        """
+        for linea in self:
+            contenido = repr(tuple(linea[campo] for campo in CAMPOS_ENVIO))
+            linea.huella = hashlib.sha1(contenido.encode('utf-8')).hexdigest()[:16]
+
+    @api.model
+    def _get_huellas_filas(self, domain):
+        """``{move_id: (huella, ncf)}`` de los registros de ``domain``, en una consulta"""
+        lineas = self.search_fetch(domain, ['move_id', 'ncf', 'huella'])
+        return {linea.move_id.id: (linea.huella, linea.ncf or '') for linea in lineas}
+
+    def _validar_envio(self, company, reporte, fecha_desde, fecha_hasta, incluir_anulados=False):
+        """Valida los registros antes de generar el TXT (``tools/dgii_validacion.py``)
+
+        Las columnas se leen completas y los totales de monto e ITBIS se
+        concilian con los documentos contables del período (ver
+        ``_get_totales_documentos``). Retorna la lista de errores.
+        """
+        campos = ('rnc', 'tipo_id', 'ncf', 'ncf_modificado', 'tipo_comprobante') + dgii_validacion.CAMPOS_MONTO
+        columnas = {campo: self.mapped(campo) for campo in campos}
+        totales = self._get_totales_documentos(company, reporte, fecha_desde, fecha_hasta, incluir_anulados)
+        return dgii_validacion.validar(columnas, reporte, totales)
+
+    @api.model
+    def _get_totales_documentos(self, company, reporte, fecha_desde, fecha_hasta, incluir_anulados=False):
+        """Monto e ITBIS de los documentos contables del período
+
+        Se calculan sobre ``account.move`` y ``account.move.line`` con los
+        mismos criterios que ``_sync_moves``, sin leer los registros
+        materializados: una fila faltante, sobrante o desactualizada en el
+        almacén descuadra los totales.
+        """
+        domain = [
+            ('company_id', '=', company.id),
+            ('move_type', 'in', [tipo for tipo, codigo in REPORTE_POR_TIPO.items() if codigo == reporte]),
+            ('invoice_date', '>=', fecha_desde),
+            ('invoice_date', '<=', fecha_hasta),
+        ]
+        if incluir_anulados:
+            domain += ['|', ('state', '=', 'posted'), ('anulado', '=', True)]
+        else:
+            domain += [('state', '=', 'posted'), ('anulado', '=', False)]
+        if reporte == '606':
+            domain.append(('es_fiscal', '=', True))
+        Move = self.env['account.move']
+        [(monto_total,)] = Move._read_group(domain, aggregates=['amount_total:sum'])
+        itbis = Move.search(domain)._get_ncf_itbis_amounts()
+        return {
+            'monto_facturado': monto_total or 0.0,
+            'itbis_facturado': sum(itbis.values()),
+        }
+
+    @api.model
+    def _rebuild(self, company=None):
+        """Reconstruye el almacén a partir de los documentos existentes"""
+        domain = [
+            ('move_type', 'in', list(REPORTE_POR_TIPO)),
+            '|', ('state', '=', 'posted'), ('anulado', '=', True),
+        ]
+        if company:
+            domain.append(('company_id', '=', company.id))
+        moves = self.env['account.move'].search(domain)
+        for ids in split_every(LOTE_REPORTE, moves.ids):
+            self._sync_moves(self.env['account.move'].browse(ids))
+            self.env.invalidate_all()
+        return len(moves)
+
+    def action_open_document(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': 'account.move',
+            'res_id': self.move_id.id,
+            'view_mode': 'form',
+        }
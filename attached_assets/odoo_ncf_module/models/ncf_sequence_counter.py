@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields
+
+
+class NCFSequenceCounter(models.Model):
+    _name = 'ncf.sequence.counter'
+    _description = 'Contador de Asignación de Secuencias NCF'
+    _log_access = False
+
+    sequence_id = fields.Many2one(
+        'ncf.sequence',
+        string='Secuencia NCF',
+        required=True,
+        ondelete='cascade'
+    )
+    valor = fields.Integer(
+        string='Último Número Asignado',
+        default=0
+    )
+
+    _sql_constraints = [
+        ('sequence_uniq', 'unique(sequence_id)', 'Cada secuencia NCF tiene un único contador'),
+    ]
+
+    def init(self):
+        """Crea los contadores de las secuencias existentes a partir de su valor actual"""
+        self._cr.execute("""
+            INSERT INTO ncf_sequence_counter (sequence_id, valor)
+            SELECT s.id, COALESCE(s.secuencia_actual, 0)
+              FROM ncf_sequence s
+             WHERE NOT EXISTS (
+                SELECT 1 FROM ncf_sequence_counter c WHERE c.sequence_id = s.id
+             )
+        """)
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, _
+from odoo.exceptions import UserError
+
+
+class NCFSequenceGap(models.Model):
+    _name = 'ncf.sequence.gap'
+    _description = 'Huecos de Numeración NCF'
+    _order = 'sequence_id, numero'
+
+    sequence_id = fields.Many2one(
+        'ncf.sequence',
+        string='Secuencia NCF',
+        required=True,
+        ondelete='cascade',
+        index=True
+    )
+    company_id = fields.Many2one(
+        related='sequence_id.company_id',
+        store=True
+    )
+    numero = fields.Integer(
+        string='Número',
+        required=True
+    )
+    ncf = fields.Char(
+        string='NCF',
+        required=True
+    )
+    estado = fields.Selection([
+        ('pendiente', 'Pendiente'),
+        ('reutilizado', 'Reutilizado'),
+        ('anulado', 'Anulado'),
+    ], string='Estado', required=True, default='pendiente')
+    fecha_deteccion = fields.Datetime(
+        string='Fecha de Detección',
+        default=fields.Datetime.now
+    )
+
+    _sql_constraints = [
+        ('sequence_numero_uniq', 'unique(sequence_id, numero)', 'El hueco ya está registrado para esta secuencia'),
+    ]
+
+    def action_anular(self):
+        """Marca los huecos como anulados para reportarlos y no reutilizarlos"""
+        if self.filtered(lambda g: g.estado == 'reutilizado'):
+            raise UserError(_('No se puede anular un hueco que ya fue reutilizado'))
+        self.write({'estado': 'anulado'})
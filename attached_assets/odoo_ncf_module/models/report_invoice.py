@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+from odoo import models, api
+
+
+class ReportInvoice(models.AbstractModel):
+    _inherit = 'report.account.report_invoice'
+
+    @api.model
+    def _get_report_values(self, docids, data=None):
+        """Precarga los datos de todas las facturas y su resumen de impuestos"""
+        values = super()._get_report_values(docids, data)
+        docs = values['docs']
+        docs._ncf_prefetch_report_data()
+        values['ncf_tax_summary'] = docs._get_ncf_tax_summary()
+        return values
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import base64
+
+from odoo import models, fields, _
+from odoo.exceptions import UserError
+
+from ..tools import ecf, ecf_client
+
+
+class ResCompany(models.Model):
+    _inherit = 'res.company'
+
+    ncf_chatter_pos = fields.Boolean(
+        string='Chatter NCF en Documentos POS',
+        help='Publica un mensaje en el chatter por cada NCF asignado a órdenes y facturas del POS. '
+             'Desactivado, la asignación solo queda en la bitácora fiscal'
+    )
+    ecf_certificado = fields.Binary(
+        string='Certificado Digital (.p12)',
+        attachment=True,
+        groups='base.group_system',
+        help='Certificado PKCS#12 con el que se firman los comprobantes electrónicos'
+    )
+    ecf_certificado_password = fields.Char(
+        string='Contraseña del Certificado',
+        groups='base.group_system'
+    )
+    ecf_api_url = fields.Char(
+        string='URL del Servicio e-CF',
+        help='URL base del ambiente de la DGII (por ejemplo https://ecf.dgii.gov.do/testecf/). '
+             'Para pruebas locales se puede usar ecf_mock_receiver.py'
+    )
+    ecf_concurrencia = fields.Integer(
+        string='Envíos Simultáneos',
+        default=8,
+        help='Conexiones simultáneas con el servicio de la DGII por proceso'
+    )
+    ecf_xsd_directorio = fields.Char(
+        string='Directorio de Esquemas XSD',
+        help='Directorio del servidor con los esquemas de la DGII (por ejemplo "e-CF 31 v.1.0.xsd"). '
+             'Si está vacío, los e-CF no se validan contra el esquema'
+    )
+
+    def _get_ecf_signer(self):
+        """Firmante de e-CF de la empresa, cargado una sola vez por proceso"""
+        self.ensure_one()
+        company = self.sudo()
+        if not company.ecf_certificado:
+            raise UserError(_('La empresa %s no tiene certificado digital para e-CF') % self.name)
+        return ecf.load_signer(
+            base64.b64decode(company.ecf_certificado),
+            company.ecf_certificado_password
+        )
+
+    def _get_ecf_client(self):
+        """Cliente HTTP de la DGII de la empresa, compartido por proceso"""
+        self.ensure_one()
+        if not self.ecf_api_url:
+            raise UserError(_('La empresa %s no tiene configurada la URL del servicio e-CF') % self.name)
+        return ecf_client.get_client(self.ecf_api_url, self._get_ecf_signer(), self.ecf_concurrencia or 1)
@@ -1,7 +1,16 @@
 # -*- coding: utf-8 -*-
+from collections import Counter
+
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
-import re
+from odoo.tools.sql import create_index
+
+from ..tools import rnc as rnc_tools
+
+# Identificadores inválidos o repetidos que se listan en el mensaje de error
+MAX_ERRORES_RNC = 20
+# Campos que obligan a validar de nuevo el RNC/cédula al escribir
+CAMPOS_RNC = frozenset(('rnc', 'tipo_rnc', 'rnc_legado'))
 
 
 class ResPartner(models.Model):
@@ -19,6 +28,19 @@ class ResPartner(models.Model):
         help='Registro Nacional del Contribuyente o Cédula de Identidad'
     )
     
+    rnc_normalizado = fields.Char(
+        string='RNC/Cédula (dígitos)',
+        compute='_compute_rnc_normalizado',
+        store=True,
+        help='RNC o cédula sin guiones; se usa para la unicidad y la búsqueda por RNC'
+    )
+    
+    rnc_legado = fields.Boolean(
+        string='Identificador Heredado',
+        help='Cédula o RNC antiguo cuyo dígito verificador no cumple el algoritmo de la DGII. '
+             'Solo se valida la longitud'
+    )
+    
     es_contribuyente = fields.Boolean(
         string='Es Contribuyente',
         help='Indica si es contribuyente registrado en la DGII'
@@ -28,64 +50,192 @@ class ResPartner(models.Model):
         string='Exento de ITBIS',
         help='Indica si está exento del pago de ITBIS'
     )
+    
+    tipo_comprobante_defecto_id = fields.Many2one(
+        'tipo.comprobante',
+        string='Comprobante por Defecto',
+        compute='_compute_tipo_comprobante_defecto',
+        store=True,
+        readonly=False,
+        domain=[('para_venta', '=', True), ('activo', '=', True)],
+        help='Tipo de comprobante que se sugiere en facturas y en el POS para este cliente. '
+             'Se calcula según RNC, contribuyente y exención de ITBIS; si se elige otro tipo, '
+             'se conserva aunque esos datos cambien'
+    )
+    tipo_comprobante_defecto_manual = fields.Boolean(
+        string='Comprobante por Defecto Manual',
+        copy=False,
+        help='El comprobante por defecto fue elegido a mano y no se recalcula'
+    )
+
+    @api.model
+    def _get_codigo_comprobante_defecto(self, rnc, es_contribuyente, exento_itbis):
+        """Código del comprobante de venta según el perfil fiscal del cliente"""
+        if rnc and exento_itbis:
+            # Regímenes especiales (zonas francas y demás exentos con RNC)
+            return '14'
+        if rnc and es_contribuyente:
+            return '01'
+        return '02'
+
+    @api.depends('rnc', 'es_contribuyente', 'exento_itbis')
+    def _compute_tipo_comprobante_defecto(self):
+        """Perfil fiscal por defecto; los tipos se buscan una vez para todo el lote
+
+        Los clientes con un comprobante elegido a mano lo conservan.
+        """
+        partners = self.filtered(
+            lambda p: not (p.tipo_comprobante_defecto_manual and p.tipo_comprobante_defecto_id)
+        )
+        codigos = {
+            partner.id: self._get_codigo_comprobante_defecto(
+                partner.rnc, partner.es_contribuyente, partner.exento_itbis
+            )
+            for partner in partners
+        }
+        tipos = {
+            tipo.codigo: tipo
+            for tipo in self.env['tipo.comprobante'].search([
+                ('codigo', 'in', list(set(codigos.values()))),
+                ('para_venta', '=', True),
+                ('activo', '=', True),
+            ])
+        }
+        for partner in partners:
+            partner.tipo_comprobante_defecto_id = tipos.get(codigos[partner.id]) or tipos.get('02')
 
-    @api.onchange('tipo_rnc', 'rnc')
+    def _marcar_comprobante_manual(self):
+        """Marca como manual el comprobante por defecto que difiere del calculado"""
+        manuales = self.filtered(
+            lambda p: p.tipo_comprobante_defecto_id and p.tipo_comprobante_defecto_id.codigo
+            != self._get_codigo_comprobante_defecto(p.rnc, p.es_contribuyente, p.exento_itbis)
+        )
+        if manuales:
+            super(ResPartner, manuales).write({'tipo_comprobante_defecto_manual': True})
+        automaticos = (self - manuales).filtered('tipo_comprobante_defecto_manual')
+        if automaticos:
+            super(ResPartner, automaticos).write({'tipo_comprobante_defecto_manual': False})
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        partners = super().create(vals_list)
+        partners._check_rnc_format()
+        explicitos = [
+            partner for partner, vals in zip(partners, vals_list)
+            if 'tipo_comprobante_defecto_id' in vals
+        ]
+        if explicitos:
+            self.browse([partner.id for partner in explicitos])._marcar_comprobante_manual()
+        return partners
+
+    def write(self, vals):
+        res = super().write(vals)
+        if CAMPOS_RNC.intersection(vals):
+            # Los contactos existentes con cédulas antiguas se siguen
+            # guardando mientras no se cambie su identificador
+            self._check_rnc_format()
+        if 'tipo_comprobante_defecto_id' in vals:
+            self._marcar_comprobante_manual()
+        return res
+
+    def init(self):
+        """Índice para la unicidad y la búsqueda por prefijo del RNC normalizado"""
+        create_index(
+            self._cr, 'res_partner_rnc_normalizado_idx', self._table,
+            ['rnc_normalizado text_pattern_ops'], where='rnc_normalizado IS NOT NULL'
+        )
+
+    @api.depends('rnc')
+    def _compute_rnc_normalizado(self):
+        for partner in self:
+            partner.rnc_normalizado = rnc_tools.normalize(partner.rnc) or False
+
+    @api.onchange('tipo_rnc', 'rnc', 'rnc_legado')
     def _onchange_rnc_validation(self):
-        """Valida formato de RNC/Cédula"""
-        if self.rnc and self.tipo_rnc:
-            rnc_clean = re.sub(r'[^0-9]', '', self.rnc)
-            
-            if self.tipo_rnc == 'rnc':
-                if len(rnc_clean) != 9:
-                    return {
-                        'warning': {
-                            'title': _('RNC Inválido'),
-                            'message': _('El RNC debe tener 9 dígitos.')
-                        }
+        """Valida formato y dígito verificador de RNC/Cédula"""
+        if self.rnc and self.tipo_rnc in rnc_tools.LENGTHS:
+            error = rnc_tools.validate_many([self.rnc], [self.tipo_rnc])[0]
+            if error == rnc_tools.ERROR_CHECK_DIGIT and self.rnc_legado:
+                error = None
+            if error:
+                return {
+                    'warning': {
+                        'title': _('RNC Inválido') if self.tipo_rnc == 'rnc' else _('Cédula Inválida'),
+                        'message': self._rnc_error_message(self.tipo_rnc, error),
                     }
-                # Formatear RNC
-                self.rnc = f"{rnc_clean[:1]}-{rnc_clean[1:3]}-{rnc_clean[3:8]}-{rnc_clean[8:9]}"
-                self.vat = self.rnc
+                }
+            # Formatear RNC/Cédula
+            self.rnc = rnc_tools.format_identifier(rnc_tools.normalize(self.rnc), self.tipo_rnc)
+            self.vat = self.rnc
+            if self.tipo_rnc == 'rnc':
                 self.es_contribuyente = True
-                
-            elif self.tipo_rnc == 'cedula':
-                if len(rnc_clean) != 11:
-                    return {
-                        'warning': {
-                            'title': _('Cédula Inválida'),
-                            'message': _('La cédula debe tener 11 dígitos.')
-                        }
-                    }
-                # Formatear Cédula
-                self.rnc = f"{rnc_clean[:3]}-{rnc_clean[3:10]}-{rnc_clean[10:11]}"
-                self.vat = self.rnc
 
-    @api.constrains('rnc', 'tipo_rnc')
+    @api.model
+    def _rnc_error_message(self, tipo_rnc, error):
+        if error == rnc_tools.ERROR_LENGTH:
+            if tipo_rnc == 'rnc':
+                return _('El RNC debe tener exactamente 9 dígitos')
+            return _('La cédula debe tener exactamente 11 dígitos')
+        if tipo_rnc == 'rnc':
+            return _('El dígito verificador del RNC no es válido. '
+                     'Si es un RNC antiguo, márquelo como identificador heredado')
+        return _('El dígito verificador de la cédula no es válido. '
+                 'Si es una cédula antigua, márquela como identificador heredado')
+
     def _check_rnc_format(self):
-        """Valida el formato de RNC/Cédula"""
-        for record in self:
-            if record.rnc and record.tipo_rnc:
-                rnc_clean = re.sub(r'[^0-9]', '', record.rnc)
-                
-                if record.tipo_rnc == 'rnc' and len(rnc_clean) != 9:
-                    raise ValidationError(_('El RNC debe tener exactamente 9 dígitos'))
-                
-                if record.tipo_rnc == 'cedula' and len(rnc_clean) != 11:
-                    raise ValidationError(_('La cédula debe tener exactamente 11 dígitos'))
+        """Valida longitud y dígito verificador de todo el lote a la vez
+
+        Se llama al crear y al escribir el RNC, su tipo o ``rnc_legado``, no
+        como restricción (otras ediciones no lo validan de nuevo): los
+        identificadores heredados (``rnc_legado``) solo validan la longitud.
+        """
+        partners = self.filtered(lambda p: p.rnc and p.tipo_rnc in rnc_tools.LENGTHS)
+        errors = rnc_tools.validate_many(partners.mapped('rnc'), partners.mapped('tipo_rnc'))
+        invalid = [
+            (partner, error) for partner, error in zip(partners, errors)
+            if error and not (error == rnc_tools.ERROR_CHECK_DIGIT and partner.rnc_legado)
+        ]
+        if not invalid:
+            return
+        if len(invalid) == 1:
+            partner, error = invalid[0]
+            raise ValidationError(self._rnc_error_message(partner.tipo_rnc, error))
+        raise ValidationError(_('Hay %(count)s contactos con RNC/Cédula inválido:\n%(detalle)s') % {
+            'count': len(invalid),
+            'detalle': '\n'.join(
+                '%s [%s]: %s' % (partner.name or '', partner.rnc, self._rnc_error_message(partner.tipo_rnc, error))
+                for partner, error in invalid[:MAX_ERRORES_RNC]
+            ),
+        })
 
     @api.constrains('rnc')
     def _check_rnc_unique(self):
-        """Valida que el RNC sea único"""
-        for record in self:
-            if record.rnc:
-                existing = self.search([
-                    ('rnc', '=', record.rnc),
-                    ('id', '!=', record.id)
-                ])
-                if existing:
-                    raise ValidationError(
-                        _('Ya existe un contacto con el RNC/Cédula %s') % record.rnc
-                    )
+        """Valida que el RNC sea único
+
+        Se compara el RNC sin guiones: primero dentro del lote (creaciones
+        múltiples e importaciones) y luego contra los contactos existentes
+        con una sola consulta.
+        """
+        partners = self.filtered('rnc_normalizado')
+        if not partners:
+            return
+        counts = Counter(partners.mapped('rnc_normalizado'))
+        repetidos = {rnc for rnc, count in counts.items() if count > 1}
+        existing = self.search_read([
+            ('rnc_normalizado', 'in', list(counts)),
+            ('id', 'not in', partners.ids),
+        ], ['rnc_normalizado'])
+        repetidos.update(row['rnc_normalizado'] for row in existing)
+        if not repetidos:
+            return
+        rncs = sorted(
+            partner.rnc for partner in partners if partner.rnc_normalizado in repetidos
+        )
+        if len(repetidos) == 1:
+            raise ValidationError(_('Ya existe un contacto con el RNC/Cédula %s') % rncs[0])
+        raise ValidationError(_('Los siguientes RNC/Cédulas ya existen o están repetidos en el lote:\n%s') % (
+            '\n'.join(sorted(set(rncs))[:MAX_ERRORES_RNC])
+        ))
 
     def name_get(self):
         """Incluye RNC en el nombre si existe"""
@@ -103,7 +253,11 @@ class ResPartner(models.Model):
         if domain is None:
             domain = []
         
-        if name:
+        digits = rnc_tools.normalize(name)
+        if name and digits and operator == 'ilike' and not name.strip(' -0123456789'):
+            # RNC/Cédula parcial (con o sin guiones): búsqueda por prefijo indexada
+            domain = ['|', ('name', operator, name), ('rnc_normalizado', '=like', digits + '%')] + domain
+        elif name:
             # Buscar por RNC también
             domain = ['|', ('name', operator, name), ('rnc', operator, name)] + domain
         
@@ -116,8 +270,7 @@ class ResPartner(models.Model):
             if record.rnc and record.tipo_rnc == 'rnc':
                 # Aquí iría la lógica de validación con la API de DGII
                 # Por ahora, solo marcamos como contribuyente si tiene RNC válido
-                rnc_clean = re.sub(r'[^0-9]', '', record.rnc)
-                if len(rnc_clean) == 9:
+                if rnc_tools.is_valid_rnc(record.rnc):
                     record.es_contribuyente = True
         
         return {
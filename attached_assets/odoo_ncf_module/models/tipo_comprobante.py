@@ -1,8 +1,12 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
+from odoo.tools.sql import create_index
+from psycopg2 import errors, sql
 import re
 
+from ..tools import metrics
+
 
 class TipoComprobante(models.Model):
     _name = 'tipo.comprobante'
@@ -155,7 +159,7 @@ class NCFSequence(models.Model):
     )
     secuencia_actual = fields.Integer(
         string='Número Actual',
-        help='Próximo número a asignar de la secuencia',
+        help='Último número asignado. Se sincroniza periódicamente desde el contador de asignación',
         default=0
     )
     fecha_inicio = fields.Date(
@@ -227,6 +231,35 @@ class NCFSequence(models.Model):
         default=30,
         help='Días antes del vencimiento para mostrar alerta'
     )
+    implementacion = fields.Selection([
+        ('contador', 'Contador sin huecos'),
+        ('postgresql', 'Secuencia PostgreSQL'),
+    ], string='Implementación', required=True, default='contador',
+        help='Contador sin huecos: las asignaciones concurrentes sobre el rango esperan '
+             'su turno. Secuencia PostgreSQL: cada rango usa una secuencia nativa (nextval) '
+             'que nunca bloquea; los números de transacciones revertidas quedan como huecos')
+    reutilizar_huecos = fields.Boolean(
+        string='Reutilizar Huecos',
+        default=True,
+        help='Asignar primero los números detectados como huecos antes de avanzar la secuencia'
+    )
+    gap_ids = fields.One2many(
+        'ncf.sequence.gap',
+        'sequence_id',
+        string='Huecos de Numeración'
+    )
+    huecos_revisado_hasta = fields.Integer(
+        string='Huecos Revisados Hasta',
+        readonly=True,
+        copy=False
+    )
+    huecos_marca = fields.Integer(
+        string='Marca de Revisión de Huecos',
+        readonly=True,
+        copy=False,
+        help='Valor de la secuencia en la revisión anterior; solo se revisan los números '
+             'por debajo de esta marca para no confundir asignaciones en curso con huecos'
+    )
 
     @api.depends('company_id', 'name', 'tipo_comprobante_id', 'serie')
     def _compute_display_name(self):
@@ -309,48 +342,385 @@ class NCFSequence(models.Model):
                     _('La fecha de inicio debe ser anterior a la fecha de fin')
                 )
 
-    def get_next_ncf(self):
-        """Obtiene el próximo NCF de la secuencia con validaciones completas"""
+    def init(self):
+        """Índices compuestos para las búsquedas por empresa
+
+        Todas las búsquedas de secuencias filtran por empresa y tipo, por lo
+        que el costo de la búsqueda no depende de cuántas empresas ni cuántas
+        secuencias históricas existan en la base de datos.
+        """
+        create_index(
+            self._cr, 'ncf_sequence_company_tipo_vigencia_idx', self._table,
+            ['company_id', 'tipo_comprobante_id', 'activa', 'fecha_inicio', 'fecha_fin']
+        )
+        create_index(
+            self._cr, 'ncf_sequence_company_alertas_idx', self._table,
+            ['company_id'],
+            where='activa AND (alerta_stock_bajo OR alerta_vencimiento)'
+        )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Crea el contador de asignación de cada secuencia"""
+        records = super().create(vals_list)
+        # El contador es una tabla interna de solo lectura para los usuarios
+        self.env['ncf.sequence.counter'].sudo().create([
+            {'sequence_id': record.id, 'valor': record.secuencia_actual} for record in records
+        ])
+        for record in records.filtered(lambda r: r.implementacion == 'postgresql'):
+            record._create_pg_sequence(record.secuencia_actual)
+        return records
+
+    def write(self, vals):
+        """Mantiene el contador y la secuencia nativa alineados con el registro"""
+        if self.env.context.get('ncf_counter_sync'):
+            return super().write(vals)
+        
+        cambio_implementacion = 'implementacion' in vals
+        previos = self._get_counter_values() if cambio_implementacion else {}
+        res = super().write(vals)
+        
+        if cambio_implementacion:
+            for record in self:
+                actual = previos.get(record.id, record.secuencia_actual)
+                if record.implementacion == 'postgresql':
+                    record._create_pg_sequence(actual)
+                    # Los números previos se asignaron sin huecos
+                    record.with_context(ncf_counter_sync=True).write({
+                        'huecos_revisado_hasta': actual,
+                        'huecos_marca': actual,
+                    })
+                else:
+                    record._drop_pg_sequence()
+                    record._set_counter_value(actual)
+        elif {'secuencia_desde', 'secuencia_hasta'} & set(vals):
+            for record in self.filtered(lambda r: r.implementacion == 'postgresql'):
+                record._alter_pg_sequence()
+        
+        if 'secuencia_actual' in vals:
+            for record in self:
+                record._set_counter_value(vals['secuencia_actual'] or 0)
+        return res
+
+    def unlink(self):
+        """Elimina las secuencias nativas de los rangos borrados"""
+        nativas = self.filtered(lambda r: r.implementacion == 'postgresql')
+        nombres = [record._pg_sequence_name() for record in nativas]
+        res = super().unlink()
+        for nombre in nombres:
+            self.env.cr.execute(
+                sql.SQL('DROP SEQUENCE IF EXISTS {}').format(sql.Identifier(nombre))
+            )
+        return res
+
+    def _pg_sequence_name(self):
+        """Nombre de la secuencia PostgreSQL que respalda el rango"""
+        self.ensure_one()
+        return 'ncf_sequence_rango_%03d' % self.id
+
+    def _create_pg_sequence(self, actual):
+        """Crea la secuencia nativa limitada al rango autorizado
+
+        ``actual`` es el último número asignado; la secuencia continúa en el
+        siguiente y falla al llegar a ``secuencia_hasta`` en lugar de reiniciar.
+        """
+        self.ensure_one()
+        self.env.cr.execute(
+            sql.SQL(
+                'CREATE SEQUENCE IF NOT EXISTS {} INCREMENT BY 1 '
+                'MINVALUE %s MAXVALUE %s START WITH %s NO CYCLE'
+            ).format(sql.Identifier(self._pg_sequence_name())),
+            (self.secuencia_desde, self.secuencia_hasta, max(actual + 1, self.secuencia_desde))
+        )
+
+    def _alter_pg_sequence(self):
+        """Ajusta los límites de la secuencia nativa al rango actual"""
+        self.ensure_one()
+        self.env.cr.execute(
+            sql.SQL('ALTER SEQUENCE {} MINVALUE %s MAXVALUE %s').format(
+                sql.Identifier(self._pg_sequence_name())
+            ),
+            (self.secuencia_desde, self.secuencia_hasta)
+        )
+
+    def _drop_pg_sequence(self):
+        """Elimina la secuencia nativa del rango"""
+        self.ensure_one()
+        self.env.cr.execute(
+            sql.SQL('DROP SEQUENCE IF EXISTS {}').format(sql.Identifier(self._pg_sequence_name()))
+        )
+
+    def _set_counter_value(self, valor):
+        """Fija el último número asignado en el mecanismo de asignación del rango"""
+        self.ensure_one()
+        if self.implementacion == 'postgresql':
+            if valor < self.secuencia_desde:
+                query, params = 'SELECT setval(%s, %s, false)', (self._pg_sequence_name(), self.secuencia_desde)
+            else:
+                query, params = 'SELECT setval(%s, %s, true)', (self._pg_sequence_name(), valor)
+            self.env.cr.execute(query, params)
+        else:
+            Counter = self.env['ncf.sequence.counter'].sudo()
+            counter = Counter.search([('sequence_id', '=', self.id)], limit=1)
+            if counter:
+                counter.valor = valor
+            else:
+                Counter.create({'sequence_id': self.id, 'valor': valor})
+            # Las asignaciones leen y avanzan el contador con SQL directo
+            Counter.flush_model(['valor'])
+
+    def _get_counter_values(self):
+        """Último número asignado de cada secuencia, leído del contador o de la secuencia nativa"""
+        if not self.ids:
+            return {}
+        values = {}
+        nativas = self.filtered(lambda r: r.implementacion == 'postgresql')
+        contadores = self - nativas
+        if contadores:
+            self.env.cr.execute(
+                'SELECT sequence_id, valor FROM ncf_sequence_counter WHERE sequence_id IN %s',
+                (tuple(contadores.ids),)
+            )
+            values.update(self.env.cr.fetchall())
+        if nativas:
+            por_nombre = {record._pg_sequence_name(): record.id for record in nativas}
+            self.env.cr.execute("""
+                SELECT sequencename, COALESCE(last_value, start_value - 1)
+                  FROM pg_sequences
+                 WHERE schemaname = current_schema() AND sequencename IN %s
+            """, (tuple(por_nombre),))
+            values.update((por_nombre[nombre], valor) for nombre, valor in self.env.cr.fetchall())
+        return values
+
+    def _sync_counters(self):
+        """Copia los contadores a ``secuencia_actual``
+
+        Solo se escriben las secuencias cuyo contador avanzó; la escritura
+        recalcula en lote disponibles, usados, estado y alertas.
+        """
+        values = self._get_counter_values()
+        for record in self:
+            valor = values.get(record.id)
+            if valor is not None and valor != record.secuencia_actual:
+                record.with_context(ncf_counter_sync=True).secuencia_actual = valor
+
+    def get_live_status(self):
+        """Disponibilidad al instante según el contador (sin esperar la sincronización)
+
+        Retorna un diccionario ``{sequence_id: {...}}`` con una sola consulta
+        para todo el conjunto de registros.
+        """
+        values = self._get_counter_values()
+        result = {}
+        for record in self:
+            actual = values.get(record.id, record.secuencia_actual)
+            total = record.secuencia_hasta - record.secuencia_desde + 1
+            disponibles = total - max(0, actual - record.secuencia_desde)
+            result[record.id] = {
+                'secuencia_actual': actual,
+                'disponibles': disponibles,
+                'alerta_stock_bajo': (
+                    record.estado == 'activa' and
+                    0 < disponibles <= record.limite_alerta_stock
+                ),
+            }
+        return result
+
+    def action_sync_counters(self):
+        """Botón para actualizar los campos de disponibilidad desde el contador"""
+        self._sync_counters()
+
+    @api.model
+    def _cron_sync_counters(self):
+        """Sincroniza contadores y recalcula estado y alertas que dependen de la fecha"""
+        sequences = self.search([('activa', '=', True)])
+        sequences._sync_counters()
+        self.env.add_to_compute(self._fields['estado'], sequences)
+        self.env.add_to_compute(self._fields['alerta_vencimiento'], sequences)
+        sequences.flush_recordset()
+
+    def _ncf_digits(self):
+        """Dígitos del número: 10 en la serie electrónica (e-CF), 8 en las demás"""
         self.ensure_one()
+        return 10 if self.serie == 'E' else 8
+
+    def _format_ncf(self, numero):
+        """Formatea el NCF (Serie + Código + Número con 8 dígitos, 10 en e-CF)"""
+        self.ensure_one()
+        return f"{self.serie}{self.tipo_comprobante_id.codigo}{str(numero).zfill(self._ncf_digits())}"
+
+    def _get_used_numbers(self, desde, hasta):
+        """Números del rango ``[desde, hasta]`` que ya figuran en documentos
+
+        Todos los NCF del rango tienen el mismo prefijo y largo, así que el
+        rango de números se traduce en un rango de texto sobre el índice
+        ``(company_id, ncf)``. Otros módulos extienden este método con sus
+        propios documentos.
+        """
+        self.ensure_one()
+        moves = self.env['account.move'].search_read([
+            ('company_id', '=', self.company_id.id),
+            ('ncf', '>=', self._format_ncf(desde)),
+            ('ncf', '<=', self._format_ncf(hasta)),
+        ], ['ncf'])
+        digits = self._ncf_digits()
+        return {int(move['ncf'][-digits:]) for move in moves}
+
+    def _detect_gaps(self):
+        """Registra como huecos los números asignados que ningún documento usa
+
+        La revisión es en dos fases: solo se revisan los números por debajo
+        de la marca tomada en la ejecución anterior, de modo que una
+        transacción que obtuvo su número pero aún no confirma no se confunde
+        con un hueco.
+        """
+        Gap = self.env['ncf.sequence.gap']
+        values = self._get_counter_values()
+        for record in self.filtered(lambda r: r.implementacion == 'postgresql'):
+            # Un número de una transacción que confirmó tarde deja de ser hueco
+            pendientes = record.gap_ids.filtered(lambda g: g.estado == 'pendiente')
+            if pendientes:
+                numeros = pendientes.mapped('numero')
+                usados = record._get_used_numbers(min(numeros), max(numeros))
+                pendientes.filtered(lambda g: g.numero in usados).unlink()
+            
+            desde = max(record.huecos_revisado_hasta + 1, record.secuencia_desde)
+            hasta = min(record.huecos_marca, record.secuencia_hasta)
+            if hasta >= desde:
+                usados = record._get_used_numbers(desde, hasta)
+                registrados = set(Gap.search([
+                    ('sequence_id', '=', record.id),
+                    ('numero', '>=', desde),
+                    ('numero', '<=', hasta),
+                ]).mapped('numero'))
+                Gap.create([{
+                    'sequence_id': record.id,
+                    'numero': numero,
+                    'ncf': record._format_ncf(numero),
+                } for numero in range(desde, hasta + 1) if numero not in usados and numero not in registrados])
+            record.with_context(ncf_counter_sync=True).write({
+                'huecos_revisado_hasta': max(hasta, record.huecos_revisado_hasta),
+                'huecos_marca': values.get(record.id, record.huecos_marca),
+            })
+
+    @api.model
+    def _cron_detect_gaps(self):
+        """Revisa los huecos de las secuencias respaldadas por PostgreSQL"""
+        self.search([('implementacion', '=', 'postgresql')])._detect_gaps()
+
+    @metrics.timed('ncf_get_next_ncf_seconds')
+    def get_next_ncf(self, document=None):
+        """Obtiene el próximo NCF de la secuencia con validaciones completas
+
+        La asignación queda en la bitácora fiscal, asociada a ``document``
+        si se indica.
+        """
+        self.ensure_one()
+        try:
+            ncf = self._allocate_next_ncf()
+        except ValidationError:
+            metrics.incr('ncf_allocation_failures_total', sequence=self.id)
+            raise
+        metrics.incr('ncf_allocations_total', sequence=self.id)
+        self.env['ncf.audit.event']._log(
+            'asignacion', self.company_id, ncf=ncf, sequence=self, document=document
+        )
+        return ncf
+
+    def _increment_counter(self):
+        """Avanza el contador en una sola sentencia y retorna el número asignado
+
+        Retorna ``None`` si el rango está agotado. Los campos derivados de
+        ``ncf.sequence`` se actualizan con ``_sync_counters``.
+        """
+        if self.implementacion == 'postgresql':
+            return self._increment_pg_sequence()
         
+        # Solo se bloquea y reescribe la fila angosta del contador. Una
+        # asignación concurrente sobre la misma secuencia espera el bloqueo y,
+        # cuando la otra transacción confirma, falla por serialización y Odoo
+        # reintenta la petición completa.
+        try:
+            with metrics.timer('ncf_sequence_lock_wait_seconds', sequence=self.id):
+                self.env.cr.execute("""
+                    UPDATE ncf_sequence_counter
+                       SET valor = GREATEST(valor + 1, %(desde)s)
+                     WHERE sequence_id = %(id)s
+                       AND GREATEST(valor + 1, %(desde)s) <= %(hasta)s
+                 RETURNING valor
+                """, {'id': self.id, 'desde': self.secuencia_desde, 'hasta': self.secuencia_hasta})
+        except errors.SerializationFailure:
+            metrics.incr('ncf_allocation_retries_total', sequence=self.id)
+            raise
+        row = self.env.cr.fetchone()
+        return row[0] if row else None
+
+    def _increment_pg_sequence(self):
+        """Asigna un hueco pendiente o el siguiente valor de la secuencia nativa
+
+        ``nextval`` no participa de la transacción, así que nunca espera a
+        otras asignaciones; el costo es que un número obtenido por una
+        transacción que luego se revierte queda como hueco. Los huecos se
+        toman con ``SKIP LOCKED`` para que dos terminales no compitan por el
+        mismo número.
+        """
+        if self.reutilizar_huecos:
+            self.env.cr.execute("""
+                UPDATE ncf_sequence_gap
+                   SET estado = 'reutilizado'
+                 WHERE id = (
+                    SELECT id FROM ncf_sequence_gap
+                     WHERE sequence_id = %s AND estado = 'pendiente'
+                     ORDER BY numero
+                     LIMIT 1
+                       FOR UPDATE SKIP LOCKED
+                 )
+             RETURNING numero
+            """, (self.id,))
+            row = self.env.cr.fetchone()
+            if row:
+                metrics.incr('ncf_gaps_reused_total', sequence=self.id)
+                return row[0]
+        
+        try:
+            with self.env.cr.savepoint(flush=False):
+                self.env.cr.execute('SELECT nextval(%s)', (self._pg_sequence_name(),))
+                return self.env.cr.fetchone()[0]
+        except errors.SequenceGeneratorLimitExceeded:
+            return None
+
+    def _allocate_next_ncf(self):
+        """Valida la secuencia, avanza el contador y formatea el NCF"""
         # Validaciones de estado
         if not self.activa:
             raise ValidationError(
                 _('La secuencia NCF "%s" no está activa') % self.display_name
             )
         
-        if self.vencida:
+        if self.fecha_fin < fields.Date.context_today(self):
             raise ValidationError(
                 _('La secuencia NCF "%s" está vencida. Fecha límite: %s') % 
                 (self.display_name, self.fecha_fin)
             )
         
-        if self.agotada:
+        numero = self._increment_counter()
+        if numero is None:
             raise ValidationError(
                 _('La secuencia NCF "%s" está agotada. No hay más números disponibles.') % 
                 self.display_name
             )
         
-        # Inicializar secuencia si es necesario
-        if self.secuencia_actual < self.secuencia_desde:
-            self.secuencia_actual = self.secuencia_desde
-        else:
-            self.secuencia_actual += 1
-        
-        # Validar que no se exceda el límite
-        if self.secuencia_actual > self.secuencia_hasta:
-            raise ValidationError(
-                _('Se ha excedido el límite de la secuencia NCF "%s"') % self.display_name
-            )
+        # El último número agota el rango: reflejarlo de inmediato en el estado
+        if numero == self.secuencia_hasta:
+            self._sync_counters()
         
-        # Formatear el NCF (Serie + Código + Número con 8 dígitos)
-        ncf = f"{self.serie}{self.tipo_comprobante_id.codigo}{str(self.secuencia_actual).zfill(8)}"
+        ncf = self._format_ncf(numero)
         
         # Verificar que el NCF no esté ya asignado
         existing_ncf = self.env['account.move'].search([
             ('ncf', '=', ncf),
             ('company_id', '=', self.company_id.id)
-        ])
+        ], limit=1)
         
         if existing_ncf:
             raise ValidationError(
@@ -360,30 +730,58 @@ class NCFSequence(models.Model):
         return ncf
     
     @api.model
-    def get_active_sequence_for_type(self, tipo_comprobante_id, company_id=None):
-        """Obtiene la secuencia activa para un tipo de comprobante específico"""
-        if not company_id:
-            company_id = self.env.company.id
-        
+    def _get_active_sequence_domain(self, tipo_comprobante_ids, company_id):
+        """Dominio de las secuencias vigentes para los tipos y empresa indicados"""
         today = fields.Date.context_today(self)
-        
-        sequence = self.search([
-            ('tipo_comprobante_id', '=', tipo_comprobante_id),
+        return [
+            ('tipo_comprobante_id', 'in', tipo_comprobante_ids),
             ('company_id', '=', company_id),
             ('activa', '=', True),
             ('fecha_inicio', '<=', today),
             ('fecha_fin', '>=', today),
             ('estado', '=', 'activa')
-        ], order='fecha_inicio desc', limit=1)
+        ]
+
+    @api.model
+    @metrics.timed('ncf_active_sequence_lookup_seconds')
+    def get_active_sequence_for_type(self, tipo_comprobante_id, company_id=None):
+        """Obtiene la secuencia activa para un tipo de comprobante específico"""
+        if not company_id:
+            company_id = self.env.company.id
+        
+        sequence = self.search(
+            self._get_active_sequence_domain([tipo_comprobante_id], company_id),
+            order='fecha_inicio desc', limit=1
+        )
         
         if not sequence:
             tipo_comprobante = self.env['tipo.comprobante'].browse(tipo_comprobante_id)
+            company = self.env['res.company'].browse(company_id)
             raise ValidationError(
                 _('No hay secuencia NCF activa configurada para el tipo de comprobante %s en la empresa %s') % 
-                (tipo_comprobante.name, self.env.company.name)
+                (tipo_comprobante.name, company.name)
             )
         
         return sequence
+
+    @api.model
+    def get_active_sequences_for_types(self, tipo_comprobante_ids, company_id=None):
+        """Obtiene en una sola consulta la secuencia activa de varios tipos
+
+        Retorna un diccionario ``{tipo_comprobante_id: ncf.sequence}``; los
+        tipos sin secuencia vigente no aparecen en el resultado.
+        """
+        if not company_id:
+            company_id = self.env.company.id
+        
+        result = {}
+        sequences = self.search(
+            self._get_active_sequence_domain(list(tipo_comprobante_ids), company_id),
+            order='fecha_inicio desc'
+        )
+        for sequence in sequences:
+            result.setdefault(sequence.tipo_comprobante_id.id, sequence)
+        return result
     
     def get_alert_message(self):
         """Obtiene mensaje de alerta si aplica"""
@@ -407,10 +805,11 @@ class NCFSequence(models.Model):
     
     @api.model
     def check_all_alerts(self):
-        """Método para verificar todas las alertas del sistema"""
+        """Método para verificar las alertas de las empresas activas del usuario"""
         sequences_with_alerts = self.search([
+            ('company_id', 'in', self.env.companies.ids),
+            ('activa', '=', True),
             '|', ('alerta_stock_bajo', '=', True), ('alerta_vencimiento', '=', True),
-            ('activa', '=', True)
         ])
         
         alerts = []
@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+from . import test_dgii_txt
+from . import test_fiscal_list_queries
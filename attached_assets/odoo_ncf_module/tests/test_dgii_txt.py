@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+from datetime import date
+
+from odoo.tests.common import BaseCase, tagged
+
+from ..tools import dgii_txt
+
+FECHA = date(2026, 1, 31)
+
+
+@tagged('post_install', '-at_install')
+class TestDgiiTxt(BaseCase):
+    """Ida y vuelta y validación de anchos de los TXT 606, 607 y 608"""
+
+    def _fila_606(self, ncf='B0100000001', modificado='', monto=1000.0, itbis=180.0):
+        return ('101000011', '1', ncf, modificado, ncf[1:3], FECHA, monto, itbis)
+
+    def test_606_serie_b_formato_original(self):
+        """La serie B conserva el registro de 68 posiciones con NCF de 11"""
+        data = dgii_txt.TXT_606.encode([self._fila_606(modificado='B0100000002')])
+        self.assertEqual(
+            data,
+            b'101000011  1B0100000001B010000000201'
+            b'31012026      100000       18000',
+        )
+
+    def test_606_ida_y_vuelta(self):
+        filas = [
+            self._fila_606(),
+            self._fila_606('B0400000003', 'B0100000001', 50.25, 0.0),
+            ('00113918205', '2', 'B0200000004', '', '02', date(2026, 1, 1), 0.29, 0.05),
+        ]
+        data = dgii_txt.TXT_606.encode(filas)
+        self.assertEqual({len(linea) for linea in data.split(b'\n')}, {dgii_txt.TXT_606.width})
+        self.assertEqual(dgii_txt.TXT_606.parse(data), filas)
+
+    def test_607_ida_y_vuelta(self):
+        filas = [
+            ('101000011', '1', '01', 'B0100000001', '01', FECHA, 1000.0, 180.0),
+            ('00113918205', '2', '02', 'B1100000002', '11', FECHA, 99999.99, 0.0),
+        ]
+        data = dgii_txt.TXT_607.encode(filas)
+        self.assertEqual(dgii_txt.TXT_607.parse(data), filas)
+
+    def test_608_ida_y_vuelta(self):
+        filas = [('B0100000001', FECHA, '01'), ('E310000000001', date(2026, 1, 2), '04')]
+        data = dgii_txt.TXT_608.encode(filas)
+        self.assertEqual(data, b'B0100000001|20260131|01\nE310000000001|20260102|04')
+        self.assertEqual(dgii_txt.TXT_608.parse(data), filas)
+
+    def test_formato_ecf(self):
+        """Un período con e-NCF usa el formato de 13 posiciones; solo serie B, el original"""
+        self.assertIs(dgii_txt.get_layout('606', ['B0100000001', '']), dgii_txt.TXT_606)
+        self.assertIs(dgii_txt.get_layout('607', ['B0100000001', 'E310000000001']), dgii_txt.TXT_607_ECF)
+        self.assertIs(dgii_txt.get_layout('608', ['E310000000001']), dgii_txt.TXT_608)
+        filas = [self._fila_606(), self._fila_606('E310000000002', 'E310000000001')]
+        layout = dgii_txt.get_layout('606', [fila[2] for fila in filas])
+        data = layout.encode(filas)
+        self.assertEqual(layout.width, dgii_txt.TXT_606.width + 4)
+        self.assertEqual(layout.parse(data), filas)
+
+    def test_ecf_no_cabe_en_serie_b(self):
+        with self.assertRaises(dgii_txt.LayoutError) as error:
+            dgii_txt.TXT_606.encode([self._fila_606(), self._fila_606('E310000000001')])
+        self.assertEqual((error.exception.row, error.exception.field), (1, 'ncf'))
+
+    def test_montos_redondeados(self):
+        """0.29 se escribe como 29 centavos (``int`` lo truncaba a 28)"""
+        data = dgii_txt.TXT_606.encode([self._fila_606(monto=0.29, itbis=0.0)])
+        self.assertTrue(data.endswith(b'          29           0'))
+
+    def test_valores_fuera_de_formato(self):
+        """Un valor que no cabe se rechaza con su fila y campo, nunca se trunca"""
+        fila = self._fila_606()
+        invalidas = [
+            (('101000011999',) + fila[1:], 'rnc'),
+            (fila[:6] + (10 ** 10, 18.0), 'monto_facturado'),
+            (fila[:5] + (None, 100.0, 18.0), 'fecha_comprobante'),
+            (('10100001ñ',) + fila[1:], None),
+        ]
+        for invalida, campo in invalidas:
+            with self.subTest(campo=campo), self.assertRaises(dgii_txt.LayoutError) as error:
+                dgii_txt.TXT_606.encode([fila, invalida])
+            self.assertEqual(error.exception.row, 1)
+            self.assertEqual(error.exception.field, campo)
+
+    def test_lectura_fila_incompleta(self):
+        data = dgii_txt.TXT_606.encode([self._fila_606(), self._fila_606('B0100000002')])
+        with self.assertRaises(dgii_txt.LayoutError) as error:
+            dgii_txt.TXT_606.parse(data[:-1])
+        self.assertEqual(error.exception.row, 1)
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+from odoo import Command, fields
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.tests.common import tagged
+
+from ..tools import rnc as rnc_tools
+
+# Columnas fiscales de la vista lista, como las pide el cliente web
+SPECIFICATION = {
+    'name': {},
+    'partner_id': {'fields': {'display_name': {}}},
+    'invoice_date': {},
+    'tipo_comprobante_id': {'fields': {'display_name': {}}},
+    'ncf': {},
+    'es_factura_fiscal': {},
+    'requiere_ncf': {},
+    'alerta_ncf': {},
+    'amount_total_signed': {},
+    'state': {},
+}
+# Filas de la lista leída: 1.000 facturas
+FACTURAS = 1000
+
+
+@tagged('post_install', '-at_install')
+class TestFiscalListQueries(AccountTestInvoicingCommon):
+    """La lectura de la lista de facturas fiscales no hace consultas por fila"""
+
+    @classmethod
+    def setUpClass(cls, chart_template_ref=None):
+        super().setUpClass(chart_template_ref=chart_template_ref)
+        Tipo = cls.env['tipo.comprobante']
+        cls.tipo_credito = Tipo.search([('codigo', '=', '01')], limit=1)
+        cls.tipo_consumo = Tipo.search([('codigo', '=', '02')], limit=1)
+        hoy = fields.Date.context_today(Tipo)
+        # Solo el crédito fiscal tiene secuencia: las facturas de consumo muestran la alerta
+        cls.env['ncf.sequence'].create({
+            'name': 'Crédito Fiscal Pruebas',
+            'company_id': cls.env.company.id,
+            'tipo_comprobante_id': cls.tipo_credito.id,
+            'serie': 'B',
+            'secuencia_desde': 1,
+            'secuencia_hasta': 1000,
+            'fecha_inicio': hoy - timedelta(days=30),
+            'fecha_fin': hoy + timedelta(days=365),
+        })
+        partners = cls.env['res.partner'].create([
+            {
+                'name': 'Empresa Pruebas NCF',
+                'tipo_rnc': 'rnc',
+                'rnc': rnc_tools.complete('10100001', 'rnc'),
+                'es_contribuyente': True,
+            },
+            {
+                'name': 'Cliente Pruebas NCF',
+                'tipo_rnc': 'cedula',
+                'rnc': rnc_tools.complete('0010000001', 'cedula'),
+            },
+        ])
+        cls.invoices = cls.env['account.move'].create([{
+            'move_type': 'out_invoice',
+            'partner_id': partners[i % 2].id,
+            'invoice_date': hoy,
+            'tipo_comprobante_id': (cls.tipo_credito, cls.tipo_consumo)[i % 2].id,
+            'invoice_line_ids': [Command.create({'product_id': cls.product_a.id, 'price_unit': 100.0})],
+        } for i in range(FACTURAS)])
+        cls.domain = [('id', 'in', cls.invoices.ids)]
+
+    def _leer_lista(self, limit):
+        self.env.invalidate_all()
+        return self.env['account.move'].web_search_read(self.domain, SPECIFICATION, limit=limit)
+
+    def test_clasificacion_y_alertas(self):
+        records = self._leer_lista(FACTURAS)['records']
+        self.assertEqual(len(records), FACTURAS)
+        self.assertTrue(all(record['es_factura_fiscal'] and record['requiere_ncf'] for record in records))
+        sin_secuencia = [
+            record for record in records if record['tipo_comprobante_id']['id'] == self.tipo_consumo.id
+        ]
+        self.assertEqual(len(sin_secuencia), FACTURAS // 2)
+        self.assertTrue(all('No hay secuencia' in record['alerta_ncf'] for record in sin_secuencia))
+
+    def test_consultas_no_crecen_con_las_filas(self):
+        """Leer las 1.000 filas cuesta lo mismo que leer dos (un cliente y un tipo de cada clase)"""
+        self.env.flush_all()
+        self.env.invalidate_all()
+        antes = self.cr.sql_log_count
+        self._leer_lista(2)
+        consultas = self.cr.sql_log_count - antes
+        with self.assertQueryCount(consultas):
+            records = self._leer_lista(FACTURAS)['records']
+        self.assertEqual(len(records), FACTURAS)
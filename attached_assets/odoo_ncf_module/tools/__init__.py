@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+from . import metrics
+from . import dgii_txt
+from . import dgii_validacion
+from . import ecf
+from . import ecf_client
+from . import pdf_pool
+from . import rnc
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+Codificación y lectura de los archivos TXT de los reportes 606, 607 y 608.
+
+Cada formato se declara una sola vez como una lista de campos
+``(nombre, tipo, ancho)`` y se compila al importar el módulo:
+
+- Para escribir, una sola plantilla ``%`` por formato que se aplica con
+  ``map`` a las filas ya convertidas por columna (montos a centavos, fechas
+  a texto una vez por fecha distinta), y el archivo se codifica de una vez.
+  Los anchos se validan por columna (``max(map(len, ...))``), sin revisar
+  campo por campo en Python; un valor que no cabe levanta ``LayoutError``
+  con la fila y el campo, nunca se trunca.
+- Para leer, los formatos de ancho fijo se desempacan con ``struct`` sobre el
+  archivo completo (``iter_unpack``) y se convierten por columna.
+
+Tipos de campo:
+
+- ``text``: alineado a la izquierda y relleno con espacios.
+- ``amount``: monto en centavos, alineado a la derecha.
+- ``date``: fecha ``ddmmaaaa`` (``aaaammdd`` en el 608).
+
+Los montos se redondean a centavos (``round``); la construcción anterior los
+truncaba con ``int``, lo que perdía un centavo en montos como 0.29 por el
+error de punto flotante.
+
+Las filas son tuplas en el orden del formato; los montos se reciben y se
+retornan como ``float`` en pesos. No depende de Odoo.
+"""
+
+import struct
+from datetime import date
+
+TEXT = 'text'
+AMOUNT = 'amount'
+DATE = 'date'
+
+DATE_FORMATS = {'%d%m%Y': (4, 8, 2, 4, 0, 2), '%Y%m%d': (0, 4, 4, 6, 6, 8)}
+
+
+class LayoutError(ValueError):
+    """Un valor no se puede escribir o leer con el formato"""
+
+    def __init__(self, message, row=None, field=None, value=None):
+        super().__init__(message)
+        self.row = row
+        self.field = field
+        self.value = value
+
+
+class Layout:
+    """Formato de registro de un archivo TXT de la DGII
+
+    ``fields`` es una lista de ``(nombre, tipo, ancho)``. Sin ``separator``
+    el registro es de ancho fijo; con ``separator`` los campos van separados
+    y el ancho es el máximo permitido.
+    """
+
+    def __init__(self, code, fields, separator='', date_format='%d%m%Y'):
+        self.code = code
+        self.fields = tuple(fields)
+        self.names = tuple(name for name, _kind, _width in self.fields)
+        self.separator = separator
+        self.date_format = date_format
+        specs = []
+        for _name, kind, width in self.fields:
+            if separator or kind == DATE:
+                specs.append('%s')
+            elif kind == TEXT:
+                specs.append(f'%-{width}s')
+            else:
+                specs.append(f'%{width}d')
+        self.template = separator.replace('%', '%%').join(specs)
+        self.width = None if separator else sum(width for _name, _kind, width in self.fields)
+        if not separator:
+            self._struct = struct.Struct(''.join(f'{width}s' for _n, _k, width in self.fields) + 'x')
+
+    # Escritura
+
+    def _prepare(self, index, column):
+        """Convierte y valida una columna completa; retorna la columna lista"""
+        name, kind, width = self.fields[index]
+        if kind == TEXT:
+            column = [value or '' for value in column]
+            if column and max(map(len, column)) > width:
+                row = next(i for i, value in enumerate(column) if len(value) > width)
+                raise LayoutError(
+                    f'{name}: "{column[row]}" excede {width} caracteres (fila {row + 1})',
+                    row, name, column[row]
+                )
+            contenido = ''.join(column)
+            for invalido in ('\n', '\r', self.separator):
+                if invalido and invalido in contenido:
+                    row = next(i for i, value in enumerate(column) if invalido in value)
+                    raise LayoutError(
+                        f'{name}: "{column[row]}" contiene un separador (fila {row + 1})',
+                        row, name, column[row]
+                    )
+        elif kind == AMOUNT:
+            column = [round((value or 0.0) * 100) for value in column]
+            if column:
+                limite = 10 ** width
+                minimo = -(10 ** (width - 1))
+                if max(column) >= limite or min(column) <= minimo:
+                    row = next(i for i, value in enumerate(column) if not minimo < value < limite)
+                    raise LayoutError(
+                        f'{name}: {column[row] / 100:.2f} excede {width} dígitos (fila {row + 1})',
+                        row, name, column[row] / 100
+                    )
+        else:
+            # Pocas fechas distintas por período: cada una se formatea una vez
+            formato = self.date_format
+            cache = {}
+            fechas = []
+            for value in column:
+                texto = cache.get(value)
+                if texto is None:
+                    if not value:
+                        row = len(fechas)
+                        raise LayoutError(f'{name}: fecha vacía (fila {row + 1})', row, name, value)
+                    texto = cache[value] = value.strftime(formato)
+                fechas.append(texto)
+            column = fechas
+        return column
+
+    def encode(self, rows):
+        """Codifica las filas (ASCII, una por línea, sin salto final)"""
+        rows = list(rows)
+        if not rows:
+            return b''
+        columns = list(zip(*rows))
+        if len(columns) != len(self.fields):
+            raise LayoutError(f'{self.code}: se esperaban {len(self.fields)} campos por fila')
+        columns = [self._prepare(i, column) for i, column in enumerate(columns)]
+        contenido = '\n'.join(map(self.template.__mod__, zip(*columns)))
+        try:
+            return contenido.encode('ascii')
+        except UnicodeEncodeError as error:
+            row = contenido.count('\n', 0, error.start)
+            raise LayoutError(
+                f'{self.code}: carácter no válido "{contenido[error.start]}" (fila {row + 1})', row
+            ) from None
+
+    # Lectura
+
+    def _parse_dates(self, column):
+        y0, y1, m0, m1, d0, d1 = DATE_FORMATS[self.date_format]
+        cache = {}
+        fechas = []
+        for value in column:
+            fecha = cache.get(value)
+            if fecha is None:
+                try:
+                    fecha = cache[value] = date(int(value[y0:y1]), int(value[m0:m1]), int(value[d0:d1]))
+                except ValueError:
+                    raise LayoutError(f'Fecha no válida: {value!r} (fila {len(fechas) + 1})',
+                                      len(fechas), value=value) from None
+            fechas.append(fecha)
+        return fechas
+
+    def _parse_column(self, index, column):
+        name, kind, _width = self.fields[index]
+        if kind == TEXT:
+            texto = b'\x00'.join(column).decode('ascii')
+            return list(map(str.rstrip, texto.split('\x00'))) if self.width else texto.split('\x00')
+        if kind == AMOUNT:
+            try:
+                return [cents / 100 for cents in map(int, column)]
+            except ValueError:
+                row = next(i for i, value in enumerate(column) if not value.strip().lstrip(b'-').isdigit())
+                raise LayoutError(f'{name}: monto no válido {column[row]!r} (fila {row + 1})',
+                                  row, name, column[row]) from None
+        return self._parse_dates(column)
+
+    def parse(self, data):
+        """Lee las filas de un archivo (``bytes``) como lista de tuplas"""
+        if not data:
+            return []
+        if self.width:
+            if not data.endswith(b'\n'):
+                data += b'\n'
+            record = self.width + 1
+            count, resto = divmod(len(data), record)
+            if resto or data[self.width::record] != b'\n' * count:
+                row = next(
+                    (i for i, line in enumerate(data.split(b'\n')[:-1]) if len(line) != self.width), count
+                )
+                raise LayoutError(f'{self.code}: la fila {row + 1} no mide {self.width} caracteres', row)
+            columns = list(zip(*self._struct.iter_unpack(data)))
+        else:
+            lineas = data.rstrip(b'\n').split(b'\n')
+            campos = [linea.split(self.separator.encode('ascii')) for linea in lineas]
+            if any(len(linea) != len(self.fields) for linea in campos):
+                row = next(i for i, linea in enumerate(campos) if len(linea) != len(self.fields))
+                raise LayoutError(f'{self.code}: la fila {row + 1} no tiene {len(self.fields)} campos', row)
+            columns = list(zip(*campos))
+        return list(zip(*(self._parse_column(i, column) for i, column in enumerate(columns))))
+
+
+# Ancho del NCF en el 606 y el 607: 11 posiciones para la serie B, como se
+# escribieron siempre los archivos, y 13 para los e-NCF (serie E). Solo un
+# período con algún e-NCF se escribe con el formato e-CF (ver ``get_layout``)
+ANCHO_NCF = 11
+ANCHO_ECF = 13
+
+
+def _campos_606(ancho_ncf):
+    return [
+        ('rnc', TEXT, 11),
+        ('tipo_id', TEXT, 1),
+        ('ncf', TEXT, ancho_ncf),
+        ('ncf_modificado', TEXT, ancho_ncf),
+        ('tipo_comprobante', TEXT, 2),
+        ('fecha_comprobante', DATE, 8),
+        ('monto_facturado', AMOUNT, 12),
+        ('itbis_facturado', AMOUNT, 12),
+    ]
+
+
+def _campos_607(ancho_ncf):
+    return [
+        ('rnc', TEXT, 11),
+        ('tipo_id', TEXT, 1),
+        ('tipo_bienes_servicios', TEXT, 2),
+        ('ncf', TEXT, ancho_ncf),
+        ('tipo_comprobante', TEXT, 2),
+        ('fecha_comprobante', DATE, 8),
+        ('monto_facturado', AMOUNT, 12),
+        ('itbis_facturado', AMOUNT, 12),
+    ]
+
+
+TXT_606 = Layout('606', _campos_606(ANCHO_NCF))
+TXT_607 = Layout('607', _campos_607(ANCHO_NCF))
+TXT_606_ECF = Layout('606', _campos_606(ANCHO_ECF))
+TXT_607_ECF = Layout('607', _campos_607(ANCHO_ECF))
+
+# El 608 va separado por "|", con fechas aaaammdd y un encabezado
+# "608|RNC|AAAAMM|cantidad" que escribe el asistente
+TXT_608 = Layout('608', [
+    ('ncf', TEXT, 13),
+    ('fecha_comprobante', DATE, 8),
+    ('tipo_anulacion', TEXT, 2),
+], separator='|', date_format='%Y%m%d')
+
+LAYOUTS = {layout.code: layout for layout in (TXT_606, TXT_607, TXT_608)}
+LAYOUTS_ECF = {layout.code: layout for layout in (TXT_606_ECF, TXT_607_ECF)}
+
+
+def get_layout(code, ncfs=()):
+    """Formato ``code`` para un archivo con los NCF ``ncfs``
+
+    El 606 y el 607 usan el formato e-CF (NCF de 13 posiciones) solo si hay
+    algún e-NCF; con la serie B se mantiene el formato de 11 posiciones.
+    """
+    if code in LAYOUTS_ECF and any(ncf and ncf[0] == 'E' for ncf in ncfs):
+        return LAYOUTS_ECF[code]
+    return LAYOUTS[code]
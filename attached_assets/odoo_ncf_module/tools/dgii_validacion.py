@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+Validación previa al envío de los reportes 606/607.
+
+La DGII rechaza el archivo completo ante la primera fila con errores, así que
+antes de generar el TXT se revisan todas las filas con un conjunto de reglas.
+Cada regla recibe las columnas completas (``{campo: lista de valores}``) y
+trabaja sobre la columna entera: filtros con ``map``, ``min``/``max`` para
+descartar columnas sin errores de una vez, ``Counter`` para detectar NCF
+repetidos y ``rnc.validate_many`` para los dígitos verificadores. Solo las
+columnas con errores se recorren para ubicar las filas.
+
+Reglas:
+
+- RNC/cédula requerido (el 606 lo permite vacío en consumo: tipos 02 y 32),
+  longitud y dígito verificador, y tipo de identificación acorde al largo.
+- NCF requerido, con formato ``B`` + 10 dígitos o ``E`` + 12 dígitos, sin
+  repetir (en el 607, sin repetir por proveedor).
+- En el 606, tipo de comprobante igual al del NCF, y NCF modificado válido
+  en las notas de débito y crédito.
+- Montos no negativos e ITBIS no mayor que el monto facturado.
+- Totales de las filas iguales a los de los documentos contables, calculados
+  aparte (no a partir de las filas).
+
+No depende de Odoo.
+"""
+
+import re
+from collections import Counter, namedtuple
+
+from . import rnc as rnc_tools
+
+Error = namedtuple('Error', 'fila campo codigo mensaje')
+
+NCF_PATTERN = re.compile(r'B\d{10}|E\d{12}')
+# Comprobantes de consumo: el 606 los acepta sin RNC del cliente
+TIPOS_SIN_RNC = frozenset(('02', '32'))
+# Notas de débito y crédito: requieren el NCF que modifican
+TIPOS_CON_MODIFICADO = frozenset(('03', '04', '33', '34'))
+TIPO_ID_POR_LONGITUD = {9: '1', 11: '2'}
+# Montos que llena el registro fiscal; las retenciones, percepciones y
+# demás impuestos todavía no se calculan y van en cero en el archivo
+CAMPOS_MONTO = ('monto_facturado', 'itbis_facturado')
+# Diferencia tolerada al conciliar totales
+TOLERANCIA_TOTALES = 0.01
+
+
+def _filas(valores, condicion):
+    """Filas de ``valores`` que cumplen ``condicion``"""
+    return [fila for fila, valor in enumerate(valores) if condicion(valor)]
+
+
+def regla_rnc(columnas, reporte):
+    tipos = columnas['tipo_comprobante']
+    rncs = columnas['rnc']
+    if not all(rncs):
+        for fila in _filas(rncs, lambda valor: not valor):
+            if reporte == '607' or tipos[fila] not in TIPOS_SIN_RNC:
+                yield Error(fila, 'rnc', 'rnc_requerido', 'RNC/cédula requerido')
+
+    esperados = [TIPO_ID_POR_LONGITUD.get(len(valor)) for valor in rncs]
+    tipo_ids = columnas['tipo_id']
+    if esperados != list(tipo_ids):
+        for fila, (esperado, tipo_id) in enumerate(zip(esperados, tipo_ids)):
+            if esperado and esperado != tipo_id:
+                yield Error(fila, 'tipo_id', 'tipo_id',
+                            f'Tipo ID {tipo_id or "vacío"} no corresponde a un identificador '
+                            f'de {len(rncs[fila])} dígitos (debe ser {esperado})')
+
+    tipos_rnc = ['rnc' if tipo_id == '1' else 'cedula' for tipo_id in tipo_ids]
+    resultado = rnc_tools.validate_many(rncs, tipos_rnc)
+    if any(resultado):
+        for fila in _filas(resultado, bool):
+            if resultado[fila] == rnc_tools.ERROR_CHECK_DIGIT:
+                yield Error(fila, 'rnc', 'rnc_digito', f'Dígito verificador inválido en {rncs[fila]}')
+            elif esperados[fila]:
+                # Longitud válida para el otro tipo: ya se reportó el Tipo ID
+                continue
+            else:
+                yield Error(fila, 'rnc', 'rnc_longitud',
+                            f'{rncs[fila]} debe tener 9 (RNC) u 11 (cédula) dígitos')
+
+
+def regla_ncf(columnas, reporte):
+    ncfs = [valor or '' for valor in columnas['ncf']]
+    validos = list(map(NCF_PATTERN.fullmatch, ncfs))
+    if not all(validos):
+        for fila in [fila for fila, valido in enumerate(validos) if valido is None]:
+            if ncfs[fila]:
+                yield Error(fila, 'ncf', 'ncf_formato', f'NCF con formato inválido: {ncfs[fila]}')
+            else:
+                yield Error(fila, 'ncf', 'ncf_requerido', 'NCF requerido')
+
+    # En compras el mismo NCF puede venir de proveedores distintos
+    claves = ncfs if reporte == '606' else list(zip(columnas['rnc'], ncfs))
+    conteo = Counter(claves)
+    if len(conteo) != len(claves):
+        repetidas = {clave for clave, cantidad in conteo.items() if cantidad > 1}
+        primera = {}
+        for fila, clave in enumerate(claves):
+            if clave not in repetidas or not ncfs[fila]:
+                continue
+            if clave in primera:
+                yield Error(fila, 'ncf', 'ncf_duplicado',
+                            f'NCF {ncfs[fila]} repetido (fila {primera[clave] + 1})')
+            else:
+                primera[clave] = fila
+
+    if reporte != '606':
+        return
+    tipos = columnas['tipo_comprobante']
+    prefijos = [ncf[1:3] for ncf in ncfs]
+    if prefijos != list(tipos):
+        for fila, (prefijo, tipo) in enumerate(zip(prefijos, tipos)):
+            if validos[fila] and prefijo != tipo:
+                yield Error(fila, 'tipo_comprobante', 'tipo_comprobante',
+                            f'Tipo de comprobante {tipo or "vacío"} no corresponde al NCF {ncfs[fila]}')
+    modificados = columnas['ncf_modificado']
+    for fila in _filas(tipos, TIPOS_CON_MODIFICADO.__contains__):
+        modificado = modificados[fila] or ''
+        if not NCF_PATTERN.fullmatch(modificado):
+            yield Error(fila, 'ncf_modificado', 'ncf_modificado',
+                        f'Nota de débito/crédito sin NCF modificado válido ({modificado or "vacío"})')
+
+
+def regla_montos(columnas, reporte):
+    for campo in CAMPOS_MONTO:
+        valores = columnas.get(campo)
+        if valores and min(valores) < 0:
+            for fila in _filas(valores, lambda valor: valor < 0):
+                yield Error(fila, campo, 'monto_negativo', f'{campo} negativo: {valores[fila]:.2f}')
+    montos, itbis = columnas['monto_facturado'], columnas['itbis_facturado']
+    excedidos = [fila for fila, (monto, impuesto) in enumerate(zip(montos, itbis)) if impuesto - monto > 0.005]
+    for fila in excedidos:
+        yield Error(fila, 'itbis_facturado', 'itbis_mayor_monto',
+                    f'ITBIS {itbis[fila]:.2f} mayor que el monto facturado {montos[fila]:.2f}')
+
+
+REGLAS = (regla_rnc, regla_ncf, regla_montos)
+
+
+def conciliar_totales(columnas, totales):
+    """Errores (sin fila) si las sumas de las columnas no cuadran con ``totales``"""
+    errores = []
+    for campo, esperado in totales.items():
+        total = sum(columnas[campo])
+        if abs(total - esperado) > TOLERANCIA_TOTALES:
+            errores.append(Error(None, campo, 'totales',
+                                 f'Total de {campo} {total:,.2f} difiere de los documentos {esperado:,.2f}'))
+    return errores
+
+
+def validar(columnas, reporte, totales=None):
+    """Valida las filas del reporte; retorna la lista de ``Error`` por fila
+
+    ``columnas`` tiene una lista por campo, todas del mismo largo.
+    ``totales`` (opcional) son las sumas esperadas por campo de monto.
+    """
+    # Las reglas reciben el RNC/cédula solo con dígitos
+    columnas = dict(columnas, rnc=rnc_tools.normalize_many(columnas['rnc']))
+    errores = []
+    for regla in REGLAS:
+        errores.extend(regla(columnas, reporte))
+    errores.sort(key=lambda error: error.fila)
+    if totales:
+        errores.extend(conciliar_totales(columnas, totales))
+    return errores
+
+
+def resumen(errores, documentos=None, limite=200):
+    """Reporte de texto: cantidad por regla y las primeras ``limite`` filas
+
+    ``documentos`` (opcional) es una lista paralela a las filas con el número
+    de cada documento, para ubicarlo en Odoo.
+    """
+    if not errores:
+        return ''
+    filas = len({error.fila for error in errores if error.fila is not None})
+    lineas = [f'{len(errores)} errores en {filas} filas']
+    for codigo, cantidad in Counter(error.codigo for error in errores).most_common():
+        lineas.append(f'  {codigo}: {cantidad}')
+    lineas.append('')
+    for error in errores[:limite]:
+        if error.fila is None:
+            lineas.append(f'Totales - {error.campo}: {error.mensaje}')
+            continue
+        documento = f' ({documentos[error.fila]})' if documentos else ''
+        lineas.append(f'Fila {error.fila + 1}{documento} - {error.campo}: {error.mensaje}')
+    if len(errores) > limite:
+        lineas.append(f'... y {len(errores) - limite} errores más')
+    return '\n'.join(lineas)
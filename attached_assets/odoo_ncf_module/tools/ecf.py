@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+Generación de documentos XML de comprobantes fiscales electrónicos (e-CF).
+
+El formato del documento se declara una sola vez en ``ECF_LAYOUT`` y se
+compila al importar el módulo en una cadena de funciones que construyen el
+árbol ``lxml`` directamente desde un diccionario de datos, sin volver a
+interpretar plantillas por documento. Los elementos sin valor se omiten, y
+un grupo sin hijos también, de modo que el mismo formato sirve para todos
+los tipos de e-CF.
+
+El esquema XSD compilado y el certificado de firma se cachean por proceso;
+la firma es XMLDSig envuelta (C14N, RSA-SHA256), como la exige la DGII.
+
+Este módulo no depende de Odoo, así que los benchmarks lo usan directamente.
+"""
+
+import base64
+import functools
+import hashlib
+import os
+import threading
+from datetime import date, datetime
+
+from lxml import etree
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding
+from cryptography.hazmat.primitives.serialization import pkcs12
+
+ECF_VERSION = '1.0'
+# Nombre de los esquemas publicados por la DGII, por tipo de e-CF
+XSD_FILENAME = 'e-CF %s v.1.0.xsd'
+
+DS_NS = 'http://www.w3.org/2000/09/xmldsig#'
+C14N_ALGORITHM = 'http://www.w3.org/TR/2001/REC-xml-c14n-20010315'
+SIGNATURE_ALGORITHM = 'http://www.w3.org/2001/04/xmldsig-more#rsa-sha256'
+DIGEST_ALGORITHM = 'http://www.w3.org/2001/04/xmlenc#sha256'
+ENVELOPED_TRANSFORM = 'http://www.w3.org/2000/09/xmldsig#enveloped-signature'
+
+
+class Repeat:
+    """Elemento que se repite por cada diccionario de la lista ``data[key]``"""
+
+    def __init__(self, key, children):
+        self.key = key
+        self.children = children
+
+
+# Formato del e-CF: (etiqueta, clave del diccionario | lista de hijos | Repeat)
+ECF_LAYOUT = ('ECF', [
+    ('Encabezado', [
+        ('Version', 'version'),
+        ('IdDoc', [
+            ('TipoeCF', 'tipo_ecf'),
+            ('eNCF', 'encf'),
+            ('FechaVencimientoSecuencia', 'fecha_vencimiento_secuencia'),
+            ('IndicadorMontoGravado', 'indicador_monto_gravado'),
+            ('TipoIngresos', 'tipo_ingresos'),
+            ('TipoPago', 'tipo_pago'),
+        ]),
+        ('Emisor', [
+            ('RNCEmisor', 'rnc_emisor'),
+            ('RazonSocialEmisor', 'razon_social_emisor'),
+            ('DireccionEmisor', 'direccion_emisor'),
+            ('FechaEmision', 'fecha_emision'),
+        ]),
+        ('Comprador', [
+            ('RNCComprador', 'rnc_comprador'),
+            ('RazonSocialComprador', 'razon_social_comprador'),
+        ]),
+        ('Totales', [
+            ('MontoGravadoTotal', 'monto_gravado_total'),
+            ('MontoExento', 'monto_exento'),
+            ('TotalITBIS', 'total_itbis'),
+            ('MontoTotal', 'monto_total'),
+        ]),
+    ]),
+    ('DetallesItems', [
+        ('Item', Repeat('items', [
+            ('NumeroLinea', 'numero_linea'),
+            ('IndicadorFacturacion', 'indicador_facturacion'),
+            ('NombreItem', 'nombre_item'),
+            ('IndicadorBienoServicio', 'indicador_bien_servicio'),
+            ('CantidadItem', 'cantidad_item'),
+            ('PrecioUnitarioItem', 'precio_unitario_item'),
+            ('MontoItem', 'monto_item'),
+        ])),
+    ]),
+    ('InformacionReferencia', [
+        ('NCFModificado', 'ncf_modificado'),
+        ('FechaNCFModificado', 'fecha_ncf_modificado'),
+        ('CodigoModificacion', 'codigo_modificacion'),
+    ]),
+    ('FechaHoraFirma', 'fecha_hora_firma'),
+])
+
+
+def _format_value(value):
+    """Formato DGII: montos con 2 decimales y fechas dd-mm-aaaa"""
+    if isinstance(value, float):
+        return '%.2f' % value
+    if isinstance(value, datetime):
+        return value.strftime('%d-%m-%Y %H:%M:%S')
+    if isinstance(value, date):
+        return value.strftime('%d-%m-%Y')
+    return str(value)
+
+
+def _compile_children(children):
+    compiled = [_compile(child) for child in children]
+
+    def render(parent, data):
+        for child in compiled:
+            child(parent, data)
+    return render
+
+
+def _compile(spec):
+    """Convierte un nodo de ``ECF_LAYOUT`` en una función ``render(parent, data)``"""
+    tag, content = spec
+    if isinstance(content, str):
+        def render_leaf(parent, data):
+            value = data.get(content)
+            if value is not None and value != '' and value is not False:
+                etree.SubElement(parent, tag).text = _format_value(value)
+        return render_leaf
+
+    if isinstance(content, Repeat):
+        render_item = _compile_children(content.children)
+        key = content.key
+
+        def render_repeat(parent, data):
+            for item in data.get(key) or ():
+                render_item(etree.SubElement(parent, tag), item)
+        return render_repeat
+
+    render_children = _compile_children(content)
+
+    def render_group(parent, data):
+        element = etree.SubElement(parent, tag)
+        render_children(element, data)
+        if not len(element):
+            parent.remove(element)
+    return render_group
+
+
+_ROOT_TAG = ECF_LAYOUT[0]
+_render_root = _compile_children(ECF_LAYOUT[1])
+
+
+def render(data):
+    """Construye el árbol XML de un e-CF a partir de su diccionario de datos"""
+    root = etree.Element(_ROOT_TAG)
+    _render_root(root, dict(data, version=data.get('version', ECF_VERSION)))
+    return root
+
+
+def is_ecf(ncf):
+    """Indica si el NCF es de la serie electrónica (E + tipo + 10 dígitos)"""
+    return bool(ncf) and len(ncf) == 13 and ncf[0] == 'E'
+
+
+@functools.lru_cache(maxsize=32)
+def _load_schema(path, mtime):
+    return etree.XMLSchema(etree.parse(path))
+
+
+def get_schema(directory, tipo_ecf):
+    """Esquema XSD compilado del tipo de e-CF, o ``None`` si no se configuró directorio
+
+    El esquema se compila una sola vez por proceso; si el archivo cambia en
+    disco se vuelve a compilar.
+    """
+    if not directory:
+        return None
+    path = os.path.join(directory, XSD_FILENAME % tipo_ecf)
+    if not os.path.isfile(path):
+        raise FileNotFoundError(path)
+    return _load_schema(path, os.path.getmtime(path))
+
+
+def validate(root, schema):
+    """Valida el documento contra el esquema y retorna la lista de errores"""
+    if schema is None or schema.validate(root):
+        return []
+    return [error.message for error in schema.error_log]
+
+
+class Signer:
+    """Clave privada y certificado X.509 para firmar e-CF"""
+
+    def __init__(self, private_key, certificate):
+        self.private_key = private_key
+        self.certificate_b64 = base64.b64encode(
+            certificate.public_bytes(serialization.Encoding.DER)
+        ).decode()
+
+    def sign(self, root):
+        """Agrega una firma XMLDSig envuelta sobre todo el documento"""
+        digest = hashlib.sha256(etree.tostring(root, method='c14n')).digest()
+
+        signature = etree.SubElement(root, '{%s}Signature' % DS_NS, nsmap={None: DS_NS})
+        signed_info = etree.SubElement(signature, '{%s}SignedInfo' % DS_NS)
+        etree.SubElement(signed_info, '{%s}CanonicalizationMethod' % DS_NS, Algorithm=C14N_ALGORITHM)
+        etree.SubElement(signed_info, '{%s}SignatureMethod' % DS_NS, Algorithm=SIGNATURE_ALGORITHM)
+        reference = etree.SubElement(signed_info, '{%s}Reference' % DS_NS, URI='')
+        transforms = etree.SubElement(reference, '{%s}Transforms' % DS_NS)
+        etree.SubElement(transforms, '{%s}Transform' % DS_NS, Algorithm=ENVELOPED_TRANSFORM)
+        etree.SubElement(reference, '{%s}DigestMethod' % DS_NS, Algorithm=DIGEST_ALGORITHM)
+        etree.SubElement(reference, '{%s}DigestValue' % DS_NS).text = base64.b64encode(digest).decode()
+
+        # SignedInfo se canoniza en su contexto (hereda el espacio de nombres de Signature)
+        signature_value = self.private_key.sign(
+            etree.tostring(signed_info, method='c14n'), padding.PKCS1v15(), hashes.SHA256()
+        )
+        etree.SubElement(signature, '{%s}SignatureValue' % DS_NS).text = base64.b64encode(signature_value).decode()
+        key_info = etree.SubElement(signature, '{%s}KeyInfo' % DS_NS)
+        x509_data = etree.SubElement(key_info, '{%s}X509Data' % DS_NS)
+        etree.SubElement(x509_data, '{%s}X509Certificate' % DS_NS).text = self.certificate_b64
+        return root
+
+
+_SIGNERS = {}
+_SIGNERS_LOCK = threading.Lock()
+
+
+def load_signer(p12_data, password=None):
+    """Carga (una vez por proceso) el certificado PKCS#12 de la empresa"""
+    key = (hashlib.sha256(p12_data).hexdigest(), password)
+    signer = _SIGNERS.get(key)
+    if signer is None:
+        private_key, certificate, _chain = pkcs12.load_key_and_certificates(
+            p12_data, password.encode() if password else None
+        )
+        signer = Signer(private_key, certificate)
+        with _SIGNERS_LOCK:
+            _SIGNERS[key] = signer
+    return signer
+
+
+def build_document(data, signer=None, xsd_directory=None):
+    """Renderiza, valida y firma un e-CF; retorna ``(xml_bytes, errores)``"""
+    root = render(data)
+    try:
+        errors = validate(root, get_schema(xsd_directory, data.get('tipo_ecf')))
+    except FileNotFoundError as e:
+        return None, ['No se encontró el esquema XSD: %s' % e]
+    if errors:
+        return None, errors
+    if signer is not None:
+        signer.sign(root)
+    return etree.tostring(root, xml_declaration=True, encoding='UTF-8'), []
+
+
+def build_batch(documents, signer=None, xsd_directory=None):
+    """Genera un lote de e-CF; retorna ``[(xml_bytes, errores), ...]`` en el mismo orden"""
+    return [build_document(data, signer, xsd_directory) for data in documents]
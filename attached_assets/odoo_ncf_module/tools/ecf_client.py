@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Cliente HTTP de los servicios de recepción de e-CF de la DGII.
+
+Un ``EcfClient`` por empresa y URL se mantiene vivo por proceso: su
+``requests.Session`` conserva un pool de conexiones (keep-alive) del tamaño
+de la concurrencia configurada y el token de autenticación se reutiliza
+hasta que vence. Los envíos y las consultas de estado de un lote se hacen
+en paralelo con un ``ThreadPoolExecutor`` acotado; los hilos solo hacen
+E/S, el resultado se escribe en la base de datos desde el hilo del cron.
+
+Los errores se clasifican para la cola de envíos:
+
+- ``EcfTransientError``: red, tiempo de espera, 429 o 5xx. Se reintenta con
+  espera exponencial (``backoff_delay``).
+- ``EcfRejectedError``: 4xx. El documento no se reintenta.
+
+Una respuesta que no se puede leer (cuerpo que no es JSON, semilla que no es
+XML, autenticación sin token) es un ``EcfTransientError``: nunca sale una
+excepción del lote que interrumpa la cola.
+
+Como ``tools/ecf.py``, este módulo no depende de Odoo.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from lxml import etree
+
+# Rutas relativas a la URL base del ambiente (TesteCF, CerteCF o eCF)
+PATH_SEMILLA = 'autenticacion/api/autenticacion/semilla'
+PATH_VALIDAR_SEMILLA = 'autenticacion/api/autenticacion/validarsemilla'
+PATH_RECEPCION = 'recepcion/api/facturaselectronicas'
+PATH_ESTADO = 'consultaresultado/api/consultas/estado'
+
+# El token se renueva un poco antes de su vencimiento
+TOKEN_MARGIN = 60
+DEFAULT_TOKEN_TTL = 3600
+
+
+class EcfError(Exception):
+    """Error de comunicación con el servicio de e-CF"""
+
+
+class EcfTransientError(EcfError):
+    """Error temporal: el envío se puede reintentar"""
+
+
+class EcfRejectedError(EcfError):
+    """El servicio rechazó la petición: reintentar no cambia el resultado"""
+
+
+def backoff_delay(attempt, base=30, maximum=3600):
+    """Segundos de espera antes del reintento ``attempt`` (1, 2, ...)
+
+    Exponencial con *full jitter*: distribuye en el tiempo los reintentos de
+    muchos documentos que fallaron juntos (por ejemplo, una caída del servicio).
+    """
+    return random.uniform(base / 2, min(maximum, base * 2 ** (attempt - 1)))
+
+
+class EcfClient:
+    """Sesión autenticada y con pool de conexiones contra un ambiente de la DGII"""
+
+    def __init__(self, base_url, signer, concurrency=8, timeout=30):
+        self.base_url = base_url.rstrip('/') + '/'
+        self.signer = signer
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.concurrency, max_retries=0
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._token = None
+        self._token_expires = 0.0
+        self._token_lock = threading.Lock()
+
+    def _request(self, method, path, authenticated=True, **kwargs):
+        headers = kwargs.pop('headers', {})
+        if authenticated:
+            headers['Authorization'] = 'Bearer %s' % self._get_token()
+        try:
+            response = self.session.request(
+                method, self.base_url + path, headers=headers, timeout=self.timeout, **kwargs
+            )
+        except requests.RequestException as e:
+            raise EcfTransientError(str(e)) from e
+        if response.status_code == 401 and authenticated:
+            # Token revocado o vencido antes de tiempo: se pide otro en el próximo intento
+            self._token = None
+            raise EcfTransientError('Token de autenticación rechazado')
+        if response.status_code == 429 or response.status_code >= 500:
+            raise EcfTransientError('HTTP %s: %s' % (response.status_code, response.text[:200]))
+        if response.status_code >= 400:
+            raise EcfRejectedError('HTTP %s: %s' % (response.status_code, response.text[:500]))
+        return response
+
+    @staticmethod
+    def _json(response):
+        """Cuerpo JSON de la respuesta; un cuerpo ilegible es un error temporal
+
+        Un proxy o una página de mantenimiento pueden responder 200 con HTML.
+        """
+        try:
+            data = response.json()
+        except ValueError as e:
+            raise EcfTransientError('Respuesta no es JSON: %s' % response.text[:200]) from e
+        if not isinstance(data, dict):
+            raise EcfTransientError('Respuesta JSON inesperada: %s' % response.text[:200])
+        return data
+
+    def _get_token(self):
+        """Token vigente; si no hay, firma una semilla nueva (una sola vez entre hilos)"""
+        if self._token and time.monotonic() < self._token_expires:
+            return self._token
+        with self._token_lock:
+            if self._token and time.monotonic() < self._token_expires:
+                return self._token
+            respuesta = self._request('GET', PATH_SEMILLA, authenticated=False)
+            try:
+                semilla = etree.fromstring(respuesta.content)
+            except etree.XMLSyntaxError as e:
+                raise EcfTransientError('Semilla de autenticación no es XML válido: %s' % e) from e
+            self.signer.sign(semilla)
+            data = self._json(self._request(
+                'POST', PATH_VALIDAR_SEMILLA, authenticated=False,
+                files={'xml': ('semilla.xml', etree.tostring(semilla, xml_declaration=True, encoding='UTF-8'), 'text/xml')}
+            ))
+            if not data.get('token'):
+                raise EcfTransientError(data.get('mensaje') or 'Respuesta de autenticación sin token')
+            ttl = data.get('expiraEn') or DEFAULT_TOKEN_TTL
+            self._token = data['token']
+            self._token_expires = time.monotonic() + max(0, ttl - TOKEN_MARGIN)
+            return self._token
+
+    def submit(self, xml, filename):
+        """Envía un e-CF firmado y retorna la respuesta (incluye ``trackId``)"""
+        data = self._json(self._request(
+            'POST', PATH_RECEPCION, files={'xml': (filename, xml, 'text/xml')}
+        ))
+        if not data.get('trackId'):
+            raise EcfRejectedError(data.get('mensaje') or data.get('error') or 'Respuesta sin trackId')
+        return data
+
+    def status(self, track_id):
+        """Consulta el estado de un e-CF enviado (``Aceptado``, ``Rechazado``, ``En Proceso``...)"""
+        return self._json(self._request('GET', PATH_ESTADO, params={'trackid': track_id}))
+
+    def _map(self, func, items):
+        """Aplica ``func`` en paralelo; retorna ``[(resultado, error), ...]`` en orden"""
+        def call(item):
+            try:
+                return func(*item), None
+            except EcfError as e:
+                return None, e
+
+        if len(items) <= 1:
+            return [call(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(items))) as executor:
+            return list(executor.map(call, items))
+
+    def submit_many(self, documents):
+        """Envía ``[(xml, filename), ...]`` con la concurrencia del cliente"""
+        return self._map(self.submit, documents)
+
+    def status_many(self, track_ids):
+        """Consulta el estado de varios ``trackId`` con la concurrencia del cliente"""
+        return self._map(self.status, [(track_id,) for track_id in track_ids])
+
+    def close(self):
+        self.session.close()
+
+
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_client(base_url, signer, concurrency=8, timeout=30):
+    """Cliente compartido por proceso para ``(base_url, firmante, concurrencia)``
+
+    Reutilizarlo entre ejecuciones del cron conserva las conexiones abiertas
+    y el token de autenticación.
+    """
+    key = (base_url, id(signer), concurrency, timeout)
+    client = _CLIENTS.get(key)
+    if client is None:
+        with _CLIENTS_LOCK:
+            client = _CLIENTS.get(key)
+            if client is None:
+                client = _CLIENTS[key] = EcfClient(base_url, signer, concurrency, timeout)
+    return client
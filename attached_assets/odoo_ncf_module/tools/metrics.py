@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Métricas ligeras para las rutas fiscales críticas (asignación de NCF,
+búsqueda de secuencias, contabilización de facturas y reportes 606/607).
+
+Las métricas se guardan en memoria de cada proceso: con workers, cada worker
+acumula y expone las suyas. Se activan con la opción ``ncf_metrics = True``
+del archivo de configuración de Odoo o la variable de entorno
+``ODOO_NCF_METRICS=1``; desactivadas, ``timer``, ``timed`` e ``incr``
+retornan sin registrar nada.
+
+Salidas disponibles:
+
+- Formato de texto de Prometheus en ``/odoo_ncf/metrics`` (ver
+  ``controllers/metrics.py``).
+- Instantáneas JSON en el log cada ``ncf_metrics_log_interval`` segundos.
+"""
+
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+from odoo.tools import config
+
+_logger = logging.getLogger(__name__)
+
+# Límites superiores (segundos) de los buckets de los histogramas de latencia
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Timer:
+    """Context manager que registra la duración del bloque en un histograma"""
+    __slots__ = ('registry', 'name', 'labels', 'start')
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class MetricsRegistry:
+    """Contadores e histogramas etiquetados, seguros entre hilos"""
+
+    def __init__(self, enabled=False, log_interval=0):
+        self.enabled = enabled
+        self.log_interval = log_interval
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._last_log = time.monotonic()
+
+    def incr(self, name, amount=1, **labels):
+        """Incrementa el contador ``name`` con las etiquetas dadas"""
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+        self._maybe_log()
+
+    def observe(self, name, seconds, **labels):
+        """Registra una duración en el histograma ``name``"""
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram()
+            histogram.observe(seconds)
+        self._maybe_log()
+
+    def timer(self, name, **labels):
+        """Context manager que mide la duración del bloque"""
+        if not self.enabled:
+            return _NOOP_TIMER
+        return _Timer(self, name, labels)
+
+    def timed(self, name, **labels):
+        """Decorador que mide la duración de cada llamada a la función"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Timer(self, name, labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self):
+        """Copia serializable del estado actual de las métricas"""
+        with self._lock:
+            counters = [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            histograms = [
+                {'name': name, 'labels': dict(labels), 'count': h.count,
+                 'sum': round(h.sum, 6), 'buckets': list(h.counts)}
+                for (name, labels), h in sorted(self._histograms.items())
+            ]
+        return {'pid': os.getpid(), 'counters': counters, 'histograms': histograms}
+
+    def render_prometheus(self):
+        """Estado actual en el formato de texto de exposición de Prometheus"""
+        def fmt_labels(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            return '{%s}' % ','.join('%s="%s"' % (k, v.replace('\\', '\\\\').replace('"', '\\"'))
+                                     for k, v in pairs)
+
+        lines = []
+        with self._lock:
+            seen = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                if name not in seen:
+                    lines.append('# TYPE %s counter' % name)
+                    seen.add(name)
+                lines.append('%s%s %s' % (name, fmt_labels(labels), value))
+            for (name, labels), h in sorted(self._histograms.items()):
+                if name not in seen:
+                    lines.append('# TYPE %s histogram' % name)
+                    seen.add(name)
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ('+Inf',), h.counts):
+                    cumulative += count
+                    lines.append('%s_bucket%s %d' % (name, fmt_labels(labels, [('le', str(bound))]), cumulative))
+                lines.append('%s_sum%s %.6f' % (name, fmt_labels(labels), h.sum))
+                lines.append('%s_count%s %d' % (name, fmt_labels(labels), h.count))
+        return '\n'.join(lines) + '\n'
+
+    def _maybe_log(self):
+        if not self.log_interval:
+            return
+        now = time.monotonic()
+        if now - self._last_log < self.log_interval:
+            return
+        self._last_log = now
+        _logger.info('ncf_metrics %s', json.dumps(self.snapshot(), separators=(',', ':')))
+
+
+def _config_enabled():
+    value = os.environ.get('ODOO_NCF_METRICS') or config.get('ncf_metrics')
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
+REGISTRY = MetricsRegistry(
+    enabled=_config_enabled(),
+    log_interval=int(config.get('ncf_metrics_log_interval') or 0),
+)
+
+incr = REGISTRY.incr
+observe = REGISTRY.observe
+timer = REGISTRY.timer
+timed = REGISTRY.timed
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Conversión HTML → PDF en paralelo con un número acotado de procesos
+``wkhtmltopdf``.
+
+Odoo convierte cada reporte con un único proceso ``wkhtmltopdf``; para
+imprimir miles de facturas el HTML se renderiza por bloques en el hilo del
+servidor (que tiene el cursor) y cada bloque se convierte en un proceso
+aparte, con como máximo ``workers`` procesos vivos a la vez. Los hilos del
+pool solo esperan al proceso externo, así que no compiten por el GIL ni
+tocan la base de datos.
+
+Este módulo no depende de Odoo: recibe la ruta del binario y los argumentos
+ya calculados por ``ir.actions.report``.
+"""
+
+import os
+import subprocess
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _write(path, content):
+    with open(path, 'wb') as f:
+        f.write(content.encode('utf-8') if isinstance(content, str) else content)
+
+
+def html_to_pdf(wkhtmltopdf_bin, command_args, bodies, header=None, footer=None, timeout=None):
+    """Convierte un bloque de documentos HTML en un solo PDF"""
+    with tempfile.TemporaryDirectory(prefix='ncf_pdf_') as tmpdir:
+        args = list(command_args)
+        if header:
+            header_path = os.path.join(tmpdir, 'header.html')
+            _write(header_path, header)
+            args += ['--header-html', header_path]
+        if footer:
+            footer_path = os.path.join(tmpdir, 'footer.html')
+            _write(footer_path, footer)
+            args += ['--footer-html', footer_path]
+        body_paths = []
+        for i, body in enumerate(bodies):
+            body_path = os.path.join(tmpdir, 'body_%05d.html' % i)
+            _write(body_path, body)
+            body_paths.append(body_path)
+        output = os.path.join(tmpdir, 'report.pdf')
+        process = subprocess.run(
+            [wkhtmltopdf_bin] + args + body_paths + [output],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout
+        )
+        if process.returncode not in (0, 1) or not os.path.exists(output):
+            raise RuntimeError(
+                'wkhtmltopdf terminó con código %s: %s'
+                % (process.returncode, process.stderr.decode('utf-8', 'replace')[-1000:])
+            )
+        with open(output, 'rb') as f:
+            return f.read()
+
+
+class PdfPool:
+    """Pool acotado de conversiones; ``submit`` bloquea si hay demasiados bloques en curso
+
+    Con el límite de bloques pendientes (``2 * workers``) el HTML renderizado
+    que espera conversión no crece sin control cuando el renderizado es más
+    rápido que ``wkhtmltopdf``. Los resultados se retornan en el orden de envío.
+    """
+
+    def __init__(self, wkhtmltopdf_bin, workers=2, timeout=None):
+        self.wkhtmltopdf_bin = wkhtmltopdf_bin
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ncf_pdf')
+        self._pending = deque()
+        self._results = []
+
+    def submit(self, command_args, bodies, header=None, footer=None):
+        while len(self._pending) >= 2 * self.workers:
+            self._results.append(self._pending.popleft().result())
+        self._pending.append(self._executor.submit(
+            html_to_pdf, self.wkhtmltopdf_bin, command_args, bodies, header, footer, self.timeout
+        ))
+
+    def results(self):
+        """Espera los bloques restantes y retorna todos los PDF en orden"""
+        while self._pending:
+            self._results.append(self._pending.popleft().result())
+        return self._results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        for future in self._pending:
+            future.cancel()
+        self._executor.shutdown(wait=True)
@@ -1,3 +1,6 @@
 # -*- coding: utf-8 -*-
 from . import reporte_606_wizard
 from . import reporte_607_wizard
+from . import reporte_608_wizard
+from . import ncf_anulacion_wizard
+from . import ncf_impresion_masiva_wizard
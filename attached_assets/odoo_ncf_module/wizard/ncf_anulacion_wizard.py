@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, _
+from odoo.exceptions import ValidationError
+
+from ..models.account_move import TIPOS_ANULACION
+
+
+class NCFAnulacionWizard(models.TransientModel):
+    _name = 'ncf.anulacion.wizard'
+    _description = 'Asistente de Anulación de NCF'
+
+    move_ids = fields.Many2many(
+        'account.move',
+        string='Comprobantes',
+        required=True,
+        default=lambda self: self._default_move_ids()
+    )
+    cantidad = fields.Integer(
+        string='Cantidad',
+        compute='_compute_cantidad'
+    )
+    tipo_anulacion = fields.Selection(
+        TIPOS_ANULACION,
+        string='Tipo de Anulación',
+        required=True,
+        default='04'
+    )
+    motivo = fields.Text(
+        string='Motivo',
+        required=True
+    )
+    fecha_anulacion = fields.Datetime(
+        string='Fecha de Anulación',
+        required=True,
+        default=fields.Datetime.now
+    )
+
+    @api.model
+    def _default_move_ids(self):
+        if self.env.context.get('active_model') == 'account.move':
+            return [(6, 0, self.env.context.get('active_ids') or [])]
+        return []
+
+    @api.depends('move_ids')
+    def _compute_cantidad(self):
+        for wizard in self:
+            wizard.cantidad = len(wizard.move_ids)
+
+    def action_anular(self):
+        """Anula todos los comprobantes seleccionados en una sola operación"""
+        self.ensure_one()
+        if not self.move_ids:
+            raise ValidationError(_('Debe seleccionar al menos un comprobante'))
+        self.move_ids._anular_ncf(self.tipo_anulacion, self.motivo, self.fecha_anulacion)
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('NCF Anulados'),
+                'message': _('Se anularon %d comprobantes') % len(self.move_ids),
+                'type': 'success',
+                'sticky': False,
+                'next': {'type': 'ir.actions.act_window_close'},
+            }
+        }
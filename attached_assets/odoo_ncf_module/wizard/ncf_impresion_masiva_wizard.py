@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, _
+from odoo.exceptions import ValidationError
+from odoo.addons.base.models.ir_actions_report import _get_wkhtmltopdf_bin
+from odoo.tools import split_every
+from odoo.tools.pdf import merge_pdf
+import base64
+import os
+
+from ..tools import metrics, pdf_pool
+
+
+class NCFImpresionMasivaWizard(models.TransientModel):
+    _name = 'ncf.impresion.masiva.wizard'
+    _description = 'Asistente de Impresión Masiva de Facturas Fiscales'
+
+    move_ids = fields.Many2many(
+        'account.move',
+        string='Facturas',
+        default=lambda self: self._default_move_ids(),
+        help='Si está vacío se imprimen las facturas con NCF del período'
+    )
+    company_id = fields.Many2one(
+        'res.company',
+        string='Empresa',
+        required=True,
+        default=lambda self: self.env.company
+    )
+    fecha_desde = fields.Date(
+        string='Fecha Desde',
+        default=lambda self: fields.Date.context_today(self).replace(day=1)
+    )
+    fecha_hasta = fields.Date(
+        string='Fecha Hasta',
+        default=fields.Date.context_today
+    )
+    tipo_comprobante_id = fields.Many2one(
+        'tipo.comprobante',
+        string='Tipo de Comprobante'
+    )
+    bloque = fields.Integer(
+        string='Facturas por Bloque',
+        default=100,
+        help='Facturas renderizadas juntas y convertidas por un mismo proceso wkhtmltopdf'
+    )
+    procesos = fields.Integer(
+        string='Procesos de Conversión',
+        default=lambda self: min(4, os.cpu_count() or 1),
+        help='Procesos wkhtmltopdf simultáneos'
+    )
+    cantidad = fields.Integer(
+        string='Facturas Impresas',
+        readonly=True
+    )
+    
+    # Campos de resultados
+    archivo_reporte = fields.Binary(
+        string='Archivo PDF',
+        attachment=True,
+        readonly=True
+    )
+    nombre_archivo = fields.Char(
+        string='Nombre del Archivo',
+        readonly=True
+    )
+
+    @api.model
+    def _default_move_ids(self):
+        if self.env.context.get('active_model') == 'account.move':
+            return [(6, 0, self.env.context.get('active_ids') or [])]
+        return []
+
+    @api.constrains('bloque', 'procesos')
+    def _check_bloque_procesos(self):
+        for record in self:
+            if record.bloque < 1 or record.procesos < 1:
+                raise ValidationError(_('El tamaño de bloque y los procesos deben ser mayores que cero'))
+
+    def _get_facturas(self):
+        """Facturas seleccionadas o, si no hay, las facturas con NCF del período"""
+        if self.move_ids:
+            return self.move_ids.filtered(lambda m: m.state == 'posted' and m.ncf).sorted(
+                lambda m: (m.invoice_date or m.date, m.name)
+            )
+        if not (self.fecha_desde and self.fecha_hasta):
+            raise ValidationError(_('Debe indicar el período a imprimir'))
+        domain = [
+            ('company_id', '=', self.company_id.id),
+            ('state', '=', 'posted'),
+            ('ncf', '!=', False),
+            ('invoice_date', '>=', self.fecha_desde),
+            ('invoice_date', '<=', self.fecha_hasta),
+        ]
+        if self.tipo_comprobante_id:
+            domain.append(('tipo_comprobante_id', '=', self.tipo_comprobante_id.id))
+        return self.env['account.move'].search(domain, order='invoice_date, name')
+
+    def _render_pdf(self, moves):
+        """Renderiza el HTML por bloques y lo convierte en paralelo; retorna el PDF unido
+
+        El HTML necesita el cursor, así que se genera en este hilo; cada
+        bloque pasa luego a un proceso ``wkhtmltopdf`` del pool mientras se
+        renderiza el siguiente. La caché ORM se libera entre bloques.
+        """
+        report = self.env.ref('account.account_invoices').sudo()
+        paperformat = report.get_paperformat()
+        command_args = None
+        with pdf_pool.PdfPool(_get_wkhtmltopdf_bin(), self.procesos) as pool:
+            for chunk_ids in split_every(self.bloque, moves.ids):
+                html = report._render_qweb_html(report.report_name, list(chunk_ids))[0]
+                bodies, _res_ids, header, footer, specific_args = report._prepare_html(
+                    html, report_model=report.model
+                )
+                if command_args is None:
+                    command_args = report._build_wkhtmltopdf_args(
+                        paperformat, False, specific_paperformat_args=specific_args
+                    )
+                pool.submit(command_args, bodies, header, footer)
+                self.env.invalidate_all()
+            pdfs = pool.results()
+        return merge_pdf(pdfs) if len(pdfs) > 1 else pdfs[0]
+
+    def action_imprimir(self):
+        """Genera un único PDF con todas las facturas fiscales"""
+        self.ensure_one()
+        moves = self._get_facturas()
+        if not moves:
+            raise ValidationError(_('No se encontraron facturas para imprimir'))
+        
+        with metrics.timer('ncf_bulk_print_seconds'):
+            pdf = self._render_pdf(moves)
+        metrics.incr('ncf_bulk_print_documents_total', amount=len(moves))
+        self.env['ncf.audit.event']._log_documents('impresion', moves, detalle=_('Impresión masiva'))
+        
+        nombre = f"facturas_{self.fecha_desde or ''}_{self.fecha_hasta or ''}.pdf" if not self.move_ids else 'facturas.pdf'
+        self.write({
+            'cantidad': len(moves),
+            'archivo_reporte': base64.b64encode(pdf),
+            'nombre_archivo': nombre
+        })
+        
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': 'ncf.impresion.masiva.wizard',
+            'view_mode': 'form',
+            'res_id': self.id,
+            'target': 'new',
+        }
+
+    def action_descargar_archivo(self):
+        """Acción para descargar el archivo generado"""
+        self.ensure_one()
+        
+        if not self.archivo_reporte:
+            raise ValidationError(_('No hay archivo para descargar'))
+        
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f'/web/content?model=ncf.impresion.masiva.wizard&id={self.id}&field=archivo_reporte&download=true&filename={self.nombre_archivo}',
+            'target': 'self',
+        }
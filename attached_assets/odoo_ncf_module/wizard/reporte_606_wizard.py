@@ -6,11 +6,24 @@ import xlsxwriter
 from io import BytesIO
 from datetime import datetime
 
+from ..tools import dgii_txt, dgii_validacion, metrics
+
+MIMETYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'txt': 'text/plain',
+}
+
 
 class Reporte606Wizard(models.TransientModel):
     _name = 'reporte.606.wizard'
     _description = 'Asistente para Reporte 606 (Ventas)'
 
+    company_id = fields.Many2one(
+        'res.company',
+        string='Empresa',
+        required=True,
+        default=lambda self: self.env.company
+    )
     fecha_desde = fields.Date(
         string='Fecha Desde',
         required=True,
@@ -30,6 +43,12 @@ class Reporte606Wizard(models.TransientModel):
         ('xlsx', 'Excel (.xlsx)'),
         ('txt', 'Texto (.txt)'),
     ], string='Formato', default='xlsx', required=True)
+    rectificacion = fields.Boolean(
+        string='Rectificación',
+        default=False,
+        help='Compara el reporte con el último envío registrado del período y '
+             'muestra las filas agregadas, eliminadas y modificadas'
+    )
     
     # Campos de resultados
     archivo_reporte = fields.Binary(
@@ -40,6 +59,18 @@ class Reporte606Wizard(models.TransientModel):
         string='Nombre del Archivo',
         readonly=True
     )
+    huella_registros = fields.Char(
+        string='Huella de los Registros',
+        readonly=True
+    )
+    resumen_cambios = fields.Text(
+        string='Resumen de Cambios',
+        readonly=True
+    )
+    resultado_validacion = fields.Text(
+        string='Resultado de la Validación',
+        readonly=True
+    )
 
     @api.constrains('fecha_desde', 'fecha_hasta')
     def _check_fechas(self):
@@ -54,24 +85,63 @@ class Reporte606Wizard(models.TransientModel):
         """Genera el reporte 606"""
         self.ensure_one()
         
-        # Obtener facturas
-        facturas = self._get_facturas_606()
-        
-        if not facturas:
-            raise ValidationError(
-                _('No se encontraron facturas para el período seleccionado')
+        with metrics.timer('ncf_report_generation_seconds', reporte='606', formato=self.formato_reporte):
+            # Archivo en caché si los registros del período no cambiaron
+            registro = self.env['ncf.reporte.linea']
+            clave = self._get_clave_cache()
+            huella = registro._get_huella(
+                self.company_id, '606', self.fecha_desde, self.fecha_hasta, self.incluir_anulados
             )
+            archivo = self.env['ncf.reporte.archivo']._get_archivo(self.company_id, clave, huella)
+            if archivo:
+                metrics.incr('ncf_report_cache_hits_total', reporte='606')
+                nombre = self._get_nombre_archivo()
+            else:
+                # Obtener registros fiscales del período
+                lineas = self._get_lineas_606()
+                
+                if not lineas:
+                    raise ValidationError(
+                        _('No se encontraron facturas para el período seleccionado')
+                    )
+                
+                # La DGII rechaza el archivo completo si una fila tiene errores
+                if self.formato_reporte == 'txt':
+                    errores = lineas._validar_envio(
+                        self.company_id, '606', self.fecha_desde, self.fecha_hasta, self.incluir_anulados
+                    )
+                    if errores:
+                        return self._mostrar_validacion(lineas, errores)
+                
+                # Generar archivo según formato
+                if self.formato_reporte == 'xlsx':
+                    archivo, nombre = self._generar_excel_606(lineas)
+                else:
+                    archivo, nombre = self._generar_txt_606(lineas)
+                self.env['ncf.reporte.archivo']._set_archivo(
+                    self.company_id, clave, huella, archivo, MIMETYPES[self.formato_reporte]
+                )
         
-        # Generar archivo según formato
-        if self.formato_reporte == 'xlsx':
-            archivo, nombre = self._generar_excel_606(facturas)
-        else:
-            archivo, nombre = self._generar_txt_606(facturas)
+        # Cambios contra el último envío del período
+        resumen = False
+        if self.rectificacion:
+            Envio = self.env['ncf.reporte.envio']
+            envio = Envio._get_ultimo(
+                self.company_id, '606', self.fecha_desde, self.fecha_hasta, self.incluir_anulados
+            )
+            if not envio:
+                raise ValidationError(
+                    _('No hay un envío registrado del reporte 606 para este período')
+                )
+            resumen = Envio._format_resumen(envio._get_cambios(), envio)
         
         # Guardar archivo
         self.write({
             'archivo_reporte': archivo,
-            'nombre_archivo': nombre
+            'nombre_archivo': nombre,
+            'huella_registros': huella,
+            'resumen_cambios': resumen,
+            'resultado_validacion': False,
         })
         
         # Retornar acción para descargar
@@ -84,22 +154,24 @@ class Reporte606Wizard(models.TransientModel):
             'context': {'step': 'download'}
         }
 
-    def _get_facturas_606(self):
-        """Obtiene las facturas para el reporte 606"""
-        domain = [
-            ('move_type', 'in', ['out_invoice', 'out_refund']),
-            ('state', '=', 'posted'),
-            ('invoice_date', '>=', self.fecha_desde),
-            ('invoice_date', '<=', self.fecha_hasta),
-            ('es_fiscal', '=', True)
-        ]
-        
-        if not self.incluir_anulados:
-            domain.append(('anulado', '=', False))
-        
-        return self.env['account.move'].search(domain, order='invoice_date, name')
+    def _get_clave_cache(self):
+        """Clave del archivo en caché: empresa, reporte, período y formato"""
+        anulados = 'con_anulados' if self.incluir_anulados else 'vigentes'
+        return (f"ncf_reporte_606_{self.company_id.id}_{self.fecha_desde}_{self.fecha_hasta}"
+                f"_{anulados}.{self.formato_reporte}")
+
+    def _get_nombre_archivo(self):
+        if self.formato_reporte == 'xlsx':
+            return f"reporte_606_{self.fecha_desde}_{self.fecha_hasta}.xlsx"
+        return f"606_{self.fecha_desde.strftime('%m%Y')}.txt"
 
-    def _generar_excel_606(self, facturas):
+    def _get_lineas_606(self):
+        """Registros fiscales de ventas del período (ver ``ncf.reporte.linea``)"""
+        return self.env['ncf.reporte.linea']._get_lineas(
+            self.company_id, '606', self.fecha_desde, self.fecha_hasta, self.incluir_anulados
+        )
+
+    def _generar_excel_606(self, lineas):
         """Genera reporte 606 en formato Excel"""
         output = BytesIO()
         workbook = xlsxwriter.Workbook(output)
@@ -134,34 +206,30 @@ class Reporte606Wizard(models.TransientModel):
         total_facturado = 0
         total_itbis = 0
         
-        for factura in facturas:
-            # RNC/Cédula
-            rnc_cedula = factura.partner_id.rnc or factura.partner_id.vat or ''
-            tipo_id = '1' if factura.partner_id.tipo_rnc == 'rnc' else '2'
-            
+        for linea in lineas:
             # Montos
-            monto_facturado = factura.get_total_amount()
-            itbis_facturado = factura.get_itbis_amount()
+            monto_facturado = linea.monto_facturado
+            itbis_facturado = linea.itbis_facturado
             
             # Datos de la fila
             row_data = [
-                rnc_cedula,  # RNC/Cédula
-                tipo_id,  # Tipo ID
-                factura.ncf or '',  # Número Comprobante
-                factura.ncf_modificado or '',  # NCF Modificado
-                factura.tipo_comprobante_id.codigo if factura.tipo_comprobante_id else '',  # Tipo Comprobante
-                factura.invoice_date,  # Fecha Comprobante
-                factura.invoice_date_due or factura.invoice_date,  # Fecha Vencimiento
+                linea.rnc or '',  # RNC/Cédula
+                linea.tipo_id,  # Tipo ID
+                linea.ncf or '',  # Número Comprobante
+                linea.ncf_modificado or '',  # NCF Modificado
+                linea.tipo_comprobante or '',  # Tipo Comprobante
+                linea.fecha_comprobante,  # Fecha Comprobante
+                linea.fecha_pago,  # Fecha Vencimiento
                 monto_facturado,  # Monto Facturado
                 itbis_facturado,  # ITBIS Facturado
-                0,  # ITBIS Retenido
-                0,  # ITBIS Percibido
-                0,  # Retención Renta
-                0,  # ISR Percibido
-                0,  # Impuesto Selectivo Consumo
-                0,  # Otros Impuestos/Tasas
-                0,  # Monto Propina Legal
-                '01'  # Forma de Pago (Efectivo por defecto)
+                linea.itbis_retenido,  # ITBIS Retenido
+                linea.itbis_percibido,  # ITBIS Percibido
+                linea.retencion_renta,  # Retención Renta
+                linea.isr_percibido,  # ISR Percibido
+                linea.impuesto_selectivo,  # Impuesto Selectivo Consumo
+                linea.otros_impuestos,  # Otros Impuestos/Tasas
+                linea.propina_legal,  # Monto Propina Legal
+                linea.forma_pago,  # Forma de Pago
             ]
             
             # Escribir fila
@@ -187,42 +255,99 @@ class Reporte606Wizard(models.TransientModel):
         
         # Codificar en base64
         archivo_b64 = base64.b64encode(output.read())
-        nombre_archivo = f"reporte_606_{self.fecha_desde}_{self.fecha_hasta}.xlsx"
+        nombre_archivo = self._get_nombre_archivo()
         
         return archivo_b64, nombre_archivo
 
-    def _generar_txt_606(self, facturas):
-        """Genera reporte 606 en formato texto para DGII"""
-        lineas = []
-        
-        for factura in facturas:
-            # Formatear datos según especificaciones DGII
-            rnc_cedula = (factura.partner_id.rnc or factura.partner_id.vat or '').replace('-', '')
-            tipo_id = '1' if factura.partner_id.tipo_rnc == 'rnc' else '2'
-            
-            # Montos en centavos
-            monto_facturado = int(factura.get_total_amount() * 100)
-            itbis_facturado = int(factura.get_itbis_amount() * 100)
-            
-            # Formatear línea según estructura DGII
-            linea = (
-                f"{rnc_cedula:<11}"  # RNC/Cédula
-                f"{tipo_id:<1}"  # Tipo ID
-                f"{factura.ncf or '':<11}"  # NCF
-                f"{factura.ncf_modificado or '':<11}"  # NCF Modificado
-                f"{factura.tipo_comprobante_id.codigo if factura.tipo_comprobante_id else '':<2}"  # Tipo Comprobante
-                f"{factura.invoice_date.strftime('%d%m%Y')}"  # Fecha
-                f"{monto_facturado:>12}"  # Monto Facturado
-                f"{itbis_facturado:>12}"  # ITBIS
+    def _generar_txt_606(self, lineas):
+        """Genera reporte 606 en formato texto para DGII (ver ``tools/dgii_txt.py``)"""
+        # Filas en el orden del formato; los montos se escriben en centavos
+        registros = [
+            (
+                (linea.rnc or '').replace('-', ''),  # RNC/Cédula
+                linea.tipo_id,  # Tipo ID
+                linea.ncf,  # NCF
+                linea.ncf_modificado,  # NCF Modificado
+                linea.tipo_comprobante,  # Tipo Comprobante
+                linea.fecha_comprobante,  # Fecha
+                linea.monto_facturado,  # Monto Facturado
+                linea.itbis_facturado,  # ITBIS
             )
-            lineas.append(linea)
+            for linea in lineas
+        ]
         
-        contenido = '\n'.join(lineas)
-        archivo_b64 = base64.b64encode(contenido.encode('utf-8'))
-        nombre_archivo = f"606_{self.fecha_desde.strftime('%m%Y')}.txt"
+        # NCF de 11 posiciones, o de 13 si el período tiene e-NCF
+        layout = dgii_txt.get_layout('606', lineas.mapped('ncf') + lineas.mapped('ncf_modificado'))
+        try:
+            contenido = layout.encode(registros)
+        except dgii_txt.LayoutError as error:
+            documento = lineas[error.row].move_name if error.row is not None else ''
+            raise ValidationError(
+                _('No se puede generar el reporte 606 (%(documento)s): %(error)s',
+                  error=error, documento=documento)
+            ) from None
+        archivo_b64 = base64.b64encode(contenido)
+        nombre_archivo = self._get_nombre_archivo()
         
         return archivo_b64, nombre_archivo
 
+    def action_validar_reporte(self):
+        """Valida las filas del período sin generar el archivo"""
+        self.ensure_one()
+        
+        lineas = self._get_lineas_606()
+        if not lineas:
+            raise ValidationError(
+                _('No se encontraron facturas para el período seleccionado')
+            )
+        errores = lineas._validar_envio(
+            self.company_id, '606', self.fecha_desde, self.fecha_hasta, self.incluir_anulados
+        )
+        return self._mostrar_validacion(lineas, errores)
+
+    def _mostrar_validacion(self, lineas, errores):
+        """Muestra en el asistente el reporte de errores de la validación"""
+        if errores:
+            resultado = dgii_validacion.resumen(errores, lineas.mapped('move_name'))
+        else:
+            resultado = _('Sin errores: %s filas listas para enviar.', len(lineas))
+        self.write({
+            'archivo_reporte': False,
+            'resultado_validacion': resultado,
+        })
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': 'reporte.606.wizard',
+            'view_mode': 'form',
+            'res_id': self.id,
+            'target': 'new',
+        }
+
+    def action_registrar_envio(self):
+        """Registra el archivo generado como enviado a la DGII"""
+        self.ensure_one()
+        
+        if not self.archivo_reporte or self.formato_reporte != 'txt':
+            raise ValidationError(_('Solo se puede registrar el envío de un reporte en formato texto'))
+        huella = self.env['ncf.reporte.linea']._get_huella(
+            self.company_id, '606', self.fecha_desde, self.fecha_hasta, self.incluir_anulados
+        )
+        if huella != self.huella_registros:
+            raise ValidationError(
+                _('Los documentos del período cambiaron después de generar el reporte. '
+                  'Genérelo de nuevo antes de registrar el envío.')
+            )
+        envio = self.env['ncf.reporte.envio']._registrar(
+            self.company_id, '606', self.fecha_desde, self.fecha_hasta, self.incluir_anulados,
+            self.archivo_reporte, self.nombre_archivo
+        )
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': 'ncf.reporte.envio',
+            'view_mode': 'form',
+            'res_id': envio.id,
+        }
+
     def action_descargar_archivo(self):
         """Acción para descargar el archivo generado"""
         self.ensure_one()
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, _
+from odoo.exceptions import ValidationError
+import base64
+import tempfile
+from datetime import datetime, time, timedelta
+
+from ..tools import dgii_txt, metrics
+
+# Filas leídas por consulta al recorrer el índice de anulados
+LOTE_608 = 10000
+
+
+class Reporte608Wizard(models.TransientModel):
+    _name = 'reporte.608.wizard'
+    _description = 'Asistente para Reporte 608 (Comprobantes Anulados)'
+
+    company_id = fields.Many2one(
+        'res.company',
+        string='Empresa',
+        required=True,
+        default=lambda self: self.env.company
+    )
+    fecha_desde = fields.Date(
+        string='Fecha Desde',
+        required=True,
+        default=lambda self: fields.Date.context_today(self).replace(day=1)
+    )
+    fecha_hasta = fields.Date(
+        string='Fecha Hasta',
+        required=True,
+        default=fields.Date.context_today
+    )
+    cantidad_registros = fields.Integer(
+        string='Registros',
+        readonly=True
+    )
+    
+    # Campos de resultados
+    archivo_reporte = fields.Binary(
+        string='Archivo de Reporte',
+        readonly=True
+    )
+    nombre_archivo = fields.Char(
+        string='Nombre del Archivo',
+        readonly=True
+    )
+
+    @api.constrains('fecha_desde', 'fecha_hasta')
+    def _check_fechas(self):
+        """Valida las fechas del reporte"""
+        for record in self:
+            if record.fecha_desde > record.fecha_hasta:
+                raise ValidationError(
+                    _('La fecha desde debe ser anterior a la fecha hasta')
+                )
+
+    def _get_rango(self):
+        """Límites de ``fecha_anulacion`` del período: ``[desde, hasta)``"""
+        return (
+            datetime.combine(self.fecha_desde, time.min),
+            datetime.combine(self.fecha_hasta + timedelta(days=1), time.min),
+        )
+
+    def _contar_anulados(self):
+        desde, hasta = self._get_rango()
+        self.env.flush_all()
+        self.env.cr.execute("""
+            SELECT COUNT(*) FROM account_move
+             WHERE company_id = %s AND anulado = TRUE
+               AND fecha_anulacion >= %s AND fecha_anulacion < %s
+               AND ncf IS NOT NULL
+        """, (self.company_id.id, desde, hasta))
+        return self.env.cr.fetchone()[0]
+
+    def _iter_anulados(self):
+        """Recorre los anulados del período por el índice, de a ``LOTE_608`` filas
+
+        Paginación por clave ``(fecha_anulacion, id)``: cada consulta continúa
+        donde terminó la anterior, así que el costo por lote es constante y
+        nunca se cargan registros ORM.
+        """
+        desde, hasta = self._get_rango()
+        ultima_fecha, ultimo_id = desde, 0
+        while True:
+            self.env.cr.execute("""
+                SELECT id, ncf, invoice_date, fecha_anulacion, tipo_anulacion
+                  FROM account_move
+                 WHERE company_id = %(company)s AND anulado = TRUE
+                   AND fecha_anulacion >= %(desde)s AND fecha_anulacion < %(hasta)s
+                   AND ncf IS NOT NULL
+                   AND (fecha_anulacion, id) > (%(fecha)s, %(id)s)
+                 ORDER BY fecha_anulacion, id
+                 LIMIT %(limit)s
+            """, {
+                'company': self.company_id.id, 'desde': desde, 'hasta': hasta,
+                'fecha': ultima_fecha, 'id': ultimo_id, 'limit': LOTE_608,
+            })
+            rows = self.env.cr.fetchall()
+            if not rows:
+                return
+            yield from rows
+            ultimo_id, _ncf, _fecha, ultima_fecha, _tipo = rows[-1]
+
+    def _escribir_txt_608(self, archivo, cantidad):
+        """Escribe el formato TXT de la DGII: encabezado y una línea por NCF anulado"""
+        rnc = (self.company_id.vat or '').replace('-', '')
+        archivo.write(f"608|{rnc}|{self.fecha_hasta.strftime('%Y%m')}|{cantidad}\n".encode('utf-8'))
+        registros = []
+        for _id, ncf, invoice_date, fecha_anulacion, tipo_anulacion in self._iter_anulados():
+            registros.append((ncf, invoice_date or fecha_anulacion.date(), tipo_anulacion or '04'))
+            if len(registros) >= LOTE_608:
+                self._escribir_lote_608(archivo, registros)
+                registros = []
+        if registros:
+            self._escribir_lote_608(archivo, registros)
+
+    def _escribir_lote_608(self, archivo, registros):
+        try:
+            archivo.write(dgii_txt.TXT_608.encode(registros) + b'\n')
+        except dgii_txt.LayoutError as error:
+            raise ValidationError(_('No se puede generar el reporte 608: %s', error)) from None
+
+    def action_generar_reporte(self):
+        """Genera el reporte 608"""
+        self.ensure_one()
+        
+        with metrics.timer('ncf_report_generation_seconds', reporte='608', formato='txt'):
+            cantidad = self._contar_anulados()
+            if not cantidad:
+                raise ValidationError(
+                    _('No se encontraron comprobantes anulados para el período seleccionado')
+                )
+            
+            # El archivo se arma en disco; en memoria solo queda un lote de líneas
+            with tempfile.TemporaryFile() as archivo:
+                self._escribir_txt_608(archivo, cantidad)
+                archivo.seek(0)
+                contenido = base64.b64encode(archivo.read())
+        
+        self.write({
+            'cantidad_registros': cantidad,
+            'archivo_reporte': contenido,
+            'nombre_archivo': f"608_{self.fecha_hasta.strftime('%m%Y')}.txt"
+        })
+        
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': 'reporte.608.wizard',
+            'view_mode': 'form',
+            'res_id': self.id,
+            'target': 'new',
+            'context': {'step': 'download'}
+        }
+
+    def action_descargar_archivo(self):
+        """Acción para descargar el archivo generado"""
+        self.ensure_one()
+        
+        if not self.archivo_reporte:
+            raise ValidationError(_('No hay archivo para descargar'))
+        
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f'/web/content?model=reporte.608.wizard&id={self.id}&field=archivo_reporte&download=true&filename={self.nombre_archivo}',
+            'target': 'self',
+        }
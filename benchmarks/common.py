@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Utilidades compartidas por los benchmarks del módulo fiscal.
+
+Los benchmarks se ejecutan contra una base de datos Odoo de prueba con los
+módulos ``odoo_ncf_module`` y ``odoo_ncf_pos`` instalados, por ejemplo:
+
+    python -m benchmarks.pos_session_load -d ncf_bench -c odoo.conf
+"""
+
+import argparse
+import contextlib
+import json
+import time
+
+
+def build_parser(description):
+    """Parser de argumentos común a todos los benchmarks"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('-d', '--database', required=True,
+                        help='Base de datos Odoo de prueba')
+    parser.add_argument('-c', '--config', default=None,
+                        help='Archivo de configuración de Odoo (addons_path, db_host, ...)')
+    return parser
+
+
+@contextlib.contextmanager
+def odoo_env(database, config_file=None, commit=False):
+    """Abre un entorno Odoo como superusuario sobre ``database``
+
+    Por defecto se hace rollback al salir, de modo que los NCF consumidos
+    durante la medición no alteran la base de datos de prueba.
+    """
+    import odoo
+    from odoo import api, SUPERUSER_ID
+
+    args = ['-d', database]
+    if config_file:
+        args += ['-c', config_file]
+    odoo.tools.config.parse_config(args)
+    registry = odoo.modules.registry.Registry(database)
+    with registry.cursor() as cr:
+        env = api.Environment(cr, SUPERUSER_ID, {})
+        try:
+            yield env
+        finally:
+            if commit:
+                cr.commit()
+            else:
+                cr.rollback()
+
+
+def timed(func, *args, **kwargs):
+    """Ejecuta ``func`` y retorna ``(resultado, segundos)``"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def percentiles(samples, points=(50, 95, 99)):
+    """Percentiles (por rango más cercano) de una lista de duraciones"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {p: 0.0 for p in points}
+    return {
+        p: ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+        for p in points
+    }
+
+
+def payload_size(data):
+    """Tamaño en bytes de ``data`` serializado como JSON (como viaja al POS)"""
+    return len(json.dumps(data, default=str, separators=(',', ':')).encode('utf-8'))
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+Generador de datos sintéticos para los benchmarks fiscales.
+
+Crea, en la empresa actual de la base de datos de prueba, clientes con
+RNC/cédula, secuencias NCF vigentes para cada tipo fiscal, facturas de
+venta y de compra, y una sesión POS abierta para sincronizar órdenes. Los
+datos se confirman en la base (usar solo con bases de datos desechables).
+
+    python -m benchmarks.datagen -d ncf_bench --partners 1000 --invoices 5000 --purchases 1000
+"""
+
+import random
+from datetime import date, timedelta
+
+from .common import build_parser, odoo_env
+
+BATCH = 500
+
+
+def _digits(n):
+    return ''.join(random.choice('0123456789') for _i in range(n))
+
+
+def _identifier(tipo):
+    """RNC o cédula aleatorio con dígito verificador válido"""
+    from odoo.addons.odoo_ncf_module.tools import rnc
+
+    return rnc.complete(_digits(8 if tipo == 'rnc' else 10), tipo)
+
+
+def generate_partners(env, count):
+    """Clientes con RNC (contribuyentes) y cédula (consumidores) en proporción 1:3"""
+    partners = env['res.partner']
+    for start in range(0, count, BATCH):
+        vals_list = []
+        for i in range(start, min(start + BATCH, count)):
+            if i % 4 == 0:
+                vals_list.append({
+                    'name': f'Empresa Bench {i}',
+                    'is_company': True,
+                    'tipo_rnc': 'rnc',
+                    'rnc': _identifier('rnc'),
+                    'es_contribuyente': True,
+                })
+            else:
+                vals_list.append({
+                    'name': f'Cliente Bench {i}',
+                    'tipo_rnc': 'cedula',
+                    'rnc': _identifier('cedula'),
+                })
+        partners |= partners.create(vals_list)
+        env.cr.commit()
+    return partners
+
+
+def ensure_sequences(env, size):
+    """Una secuencia vigente de ``size`` números por cada tipo fiscal"""
+    today = date.today()
+    tipos = env['tipo.comprobante'].search([('es_fiscal', '=', True)])
+    existing = env['ncf.sequence'].get_active_sequences_for_types(tipos.ids, env.company.id)
+    vals_list = [{
+        'name': f'Bench {tipo.codigo}',
+        'company_id': env.company.id,
+        'tipo_comprobante_id': tipo.id,
+        'serie': 'B',
+        'secuencia_desde': 1,
+        'secuencia_hasta': size,
+        'fecha_inicio': today - timedelta(days=30),
+        'fecha_fin': today + timedelta(days=365),
+    } for tipo in tipos if tipo.id not in existing]
+    if vals_list:
+        env['ncf.sequence'].create(vals_list)
+    env.cr.commit()
+
+
+def _bench_product(env):
+    product = env['product.product'].search([('default_code', '=', 'NCF-BENCH')], limit=1)
+    if not product:
+        itbis = env['account.tax'].search([
+            ('company_id', '=', env.company.id),
+            ('type_tax_use', '=', 'sale'),
+            ('name', 'ilike', 'ITBIS'),
+        ], limit=1)
+        product = env['product.product'].create({
+            'name': 'Producto Bench NCF',
+            'default_code': 'NCF-BENCH',
+            'list_price': 100.0,
+            'available_in_pos': True,
+            'taxes_id': [(6, 0, itbis.ids)],
+        })
+    return product
+
+
+def generate_invoices(env, partners, count, move_type='out_invoice', post=False, days=28, commit=True):
+    """Facturas con 1-5 líneas repartidas en los últimos ``days`` días"""
+    product = _bench_product(env)
+    tipos = {t.codigo: t for t in env['tipo.comprobante'].search([])}
+    today = date.today()
+    moves = env['account.move']
+    for start in range(0, count, BATCH):
+        vals_list = []
+        for i in range(start, min(start + BATCH, count)):
+            partner = random.choice(partners)
+            vals = {
+                'move_type': move_type,
+                'partner_id': partner.id,
+                'invoice_date': today - timedelta(days=random.randrange(days)),
+                'invoice_line_ids': [(0, 0, {
+                    'product_id': product.id,
+                    'quantity': random.randint(1, 10),
+                    'price_unit': round(random.uniform(10, 5000), 2),
+                }) for _l in range(random.randint(1, 5))],
+            }
+            if move_type == 'out_invoice':
+                vals['tipo_comprobante_id'] = tipos['01' if partner.es_contribuyente else '02'].id
+                vals['rnc'] = partner.rnc
+                vals['tipo_rnc'] = partner.tipo_rnc
+                vals['es_contribuyente'] = partner.es_contribuyente
+            else:
+                vals['ref'] = f'B01{i + 1:08d}'
+            vals_list.append(vals)
+        batch = moves.create(vals_list)
+        if post:
+            batch.action_post()
+        moves |= batch
+        if commit:
+            env.cr.commit()
+    return moves
+
+
+def ensure_pos_session(env):
+    """Sesión POS abierta sobre la primera configuración de la empresa"""
+    config = env['pos.config'].search([('company_id', '=', env.company.id)], limit=1)
+    if not config.current_session_id:
+        session = env['pos.session'].create({'config_id': config.id, 'user_id': env.uid})
+        session.action_pos_session_open()
+    return config.current_session_id
+
+
+def build_ui_orders(env, session, partners, count):
+    """Órdenes en el formato que envía el POS a ``create_from_ui``"""
+    product = _bench_product(env)
+    payment_method = session.payment_method_ids[:1]
+    tipos = {t.codigo: t for t in env['tipo.comprobante'].search([])}
+    orders = []
+    for i in range(count):
+        partner = random.choice(partners)
+        qty = random.randint(1, 5)
+        price = product.lst_price
+        total = qty * price
+        uid = f'{session.id:05d}-bench-{i:06d}'
+        orders.append({
+            'id': uid,
+            'to_invoice': False,
+            'data': {
+                'name': f'Order {uid}',
+                'uid': uid,
+                'sequence_number': i + 1,
+                'creation_date': str(date.today()),
+                'pos_session_id': session.id,
+                'pricelist_id': session.config_id.pricelist_id.id,
+                'partner_id': partner.id,
+                'user_id': env.uid,
+                'fiscal_position_id': False,
+                'amount_paid': total,
+                'amount_total': total,
+                'amount_tax': 0.0,
+                'amount_return': 0.0,
+                'lines': [[0, 0, {
+                    'product_id': product.id,
+                    'qty': qty,
+                    'price_unit': price,
+                    'price_subtotal': total,
+                    'price_subtotal_incl': total,
+                    'discount': 0,
+                    'tax_ids': [[6, False, []]],
+                }]],
+                'statement_ids': [[0, 0, {
+                    'payment_method_id': payment_method.id,
+                    'amount': total,
+                    'name': str(date.today()),
+                }]],
+                'tipo_comprobante_id': tipos['01' if partner.es_contribuyente else '02'].id,
+                'ncf': '',
+                'es_fiscal': True,
+            },
+        })
+    return orders
+
+
+def main():
+    parser = build_parser(__doc__)
+    parser.add_argument('--partners', type=int, default=1000)
+    parser.add_argument('--invoices', type=int, default=2000,
+                        help='Facturas de venta confirmadas (606)')
+    parser.add_argument('--purchases', type=int, default=500,
+                        help='Facturas de compra confirmadas (607)')
+    parser.add_argument('--sequence-size', type=int, default=10 ** 7)
+    parser.add_argument('--seed', type=int, default=17)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    with odoo_env(args.database, args.config, commit=True) as env:
+        ensure_sequences(env, args.sequence_size)
+        partners = generate_partners(env, args.partners)
+        generate_invoices(env, partners, args.invoices, 'out_invoice', post=True)
+        generate_invoices(env, partners, args.purchases, 'in_invoice', post=True)
+        print(f'{len(partners)} clientes, {args.invoices} ventas, {args.purchases} compras')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Throughput de las APIs de ``demo_app.py``: individual, por lote y NDJSON.
+
+Usa el cliente de pruebas de Flask (sin red), así que mide el costo de la
+aplicación y del almacén de secuencias, no el del servidor HTTP:
+
+    python -m benchmarks.demo_api_bench --count 20000
+    python -m benchmarks.demo_api_bench --backend sqlite --batch-size 500
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+TIPO_ID = 2
+
+
+def _bench(name, total, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"  {name:<28} {total:>8} NCF en {elapsed:7.3f}s  {total / elapsed:>10.0f} NCF/s")
+    return total / elapsed
+
+
+def run(args):
+    import demo_app
+    from demo_store import create_store
+
+    path = os.path.join(tempfile.mkdtemp(prefix='ncf_demo_api_'), 'demo_ncf.sqlite3')
+    demo_app.STORE = create_store(
+        {TIPO_ID: {"serie": "B", "codigo": "02", "actual": 0, "limite": 99999999}},
+        backend=args.backend, path=path
+    )
+    client = demo_app.app.test_client()
+    count, size = args.count, args.batch_size
+    lotes = max(1, count // size)
+    ncfs = [f"B02{str(n).zfill(8)}" for n in range(1, count + 1)]
+
+    def generate_single():
+        for _i in range(count):
+            client.post('/api/generate_ncf', json={'tipo_comprobante_id': TIPO_ID})
+
+    def generate_batch():
+        for _i in range(lotes):
+            client.post('/api/generate_ncf/batch',
+                        json={'items': [{'tipo_comprobante_id': TIPO_ID, 'cantidad': size}]})
+
+    def generate_stream():
+        for _i in range(lotes):
+            response = client.post('/api/generate_ncf/stream',
+                                   json={'items': [{'tipo_comprobante_id': TIPO_ID, 'cantidad': size}]})
+            for _line in response.response:
+                pass
+
+    def validate_single():
+        for ncf in ncfs:
+            client.post('/api/validate_ncf', json={'ncf': ncf})
+
+    def validate_batch():
+        for i in range(0, count, size):
+            client.post('/api/validate_ncf/batch', json={'ncfs': ncfs[i:i + size]})
+
+    def validate_stream():
+        body = '\n'.join(json.dumps(ncf) for ncf in ncfs)
+        response = client.post('/api/validate_ncf/stream', data=body,
+                               content_type='application/x-ndjson')
+        for _line in response.response:
+            pass
+
+    print(f"backend={args.backend} count={count} batch_size={size}")
+    _bench('generate_ncf', count, generate_single)
+    _bench('generate_ncf/batch', lotes * size, generate_batch)
+    _bench('generate_ncf/stream', lotes * size, generate_stream)
+    _bench('validate_ncf', count, validate_single)
+    _bench('validate_ncf/batch', count, validate_batch)
+    _bench('validate_ncf/stream', count, validate_stream)
+    demo_app.STORE.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--backend', choices=['memory', 'sqlite'], default='memory')
+    parser.add_argument('--count', type=int, default=10000, help='NCF por escenario')
+    parser.add_argument('--batch-size', type=int, default=1000, help='NCF por petición de lote')
+    run(parser.parse_args())
+
+
+if __name__ == '__main__':
+    main()
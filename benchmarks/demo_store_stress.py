@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Prueba de estrés de los almacenes de secuencias de ``demo_app.py``.
+
+Lanza varios procesos con varios hilos cada uno que asignan NCF del mismo
+tipo sobre un archivo SQLite temporal y verifica que no haya duplicados ni
+huecos. No requiere Odoo:
+
+    python -m benchmarks.demo_store_stress --processes 4 --threads 8 --ops 2000
+    python -m benchmarks.demo_store_stress --backend memory --threads 16
+    python -m benchmarks.demo_store_stress --http --threads 8
+
+Con ``--http`` las peticiones pasan por la ruta ``/api/generate_ncf`` con
+el cliente de pruebas de Flask (un solo proceso). El proceso termina con
+código 1 si se detecta algún NCF repetido o faltante.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from .common import percentiles
+
+TIPO_ID = 1
+INICIO = 1000
+
+
+def _secuencias(total):
+    return {TIPO_ID: {"serie": "B", "codigo": "01", "actual": INICIO, "limite": INICIO + total}}
+
+
+def _run_threads(worker, threads):
+    """Ejecuta ``worker()`` en ``threads`` hilos y junta sus resultados"""
+    results = [None] * threads
+
+    def target(index):
+        results[index] = worker()
+
+    pool = [threading.Thread(target=target, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return [item for result in results for item in result]
+
+
+def _store_worker(store, ops):
+    """Asigna ``ops`` NCF y retorna ``[(ncf, segundos), ...]``"""
+    samples = []
+    for _i in range(ops):
+        start = time.perf_counter()
+        ncf = store.next_ncf(TIPO_ID)
+        samples.append((ncf, time.perf_counter() - start))
+    return samples
+
+
+def _http_worker(app, ops):
+    """Asigna ``ops`` NCF a través de la ruta de la API"""
+    client = app.test_client()
+    samples = []
+    for _i in range(ops):
+        start = time.perf_counter()
+        data = client.post('/api/generate_ncf', json={'tipo_comprobante_id': TIPO_ID}).get_json()
+        samples.append((data.get('ncf'), time.perf_counter() - start))
+    return samples
+
+
+def _process_main(path, total, threads, ops, queue):
+    """Punto de entrada de cada proceso: abre su propio almacén sobre el mismo archivo"""
+    from demo_store import SQLiteSequenceStore
+
+    store = SQLiteSequenceStore(path, _secuencias(total))
+    try:
+        queue.put(_run_threads(lambda: _store_worker(store, ops), threads))
+    finally:
+        store.close()
+
+
+def run(args):
+    total = args.processes * args.threads * args.ops
+    tmpdir = tempfile.mkdtemp(prefix='ncf_demo_stress_')
+    path = os.path.join(tmpdir, 'demo_ncf.sqlite3')
+
+    start = time.perf_counter()
+    if args.http:
+        import demo_app
+        from demo_store import create_store
+
+        demo_app.STORE = create_store(_secuencias(total), backend=args.backend, path=path)
+        samples = _run_threads(lambda: _http_worker(demo_app.app, args.ops), args.threads)
+    elif args.backend == 'memory' or args.processes == 1:
+        from demo_store import create_store
+
+        store = create_store(_secuencias(total), backend=args.backend, path=path)
+        samples = _run_threads(lambda: _store_worker(store, args.ops), args.threads)
+        store.close()
+    else:
+        # El esquema se crea antes de lanzar los procesos
+        from demo_store import SQLiteSequenceStore
+        SQLiteSequenceStore(path, _secuencias(total)).close()
+
+        ctx = multiprocessing.get_context('spawn')
+        queue = ctx.Queue()
+        procs = [
+            ctx.Process(target=_process_main, args=(path, total, args.threads, args.ops, queue))
+            for _i in range(args.processes)
+        ]
+        for proc in procs:
+            proc.start()
+        samples = [item for _proc in procs for item in queue.get()]
+        for proc in procs:
+            proc.join()
+    elapsed = time.perf_counter() - start
+
+    ncfs = [ncf for ncf, _seconds in samples]
+    duplicados = [ncf for ncf, count in Counter(ncfs).items() if count > 1]
+    numeros = {int(ncf[-8:]) for ncf in ncfs if ncf}
+    faltantes = sorted(set(range(INICIO + 1, INICIO + total + 1)) - numeros)
+    pct = percentiles([seconds for _ncf, seconds in samples])
+
+    print(f"backend={args.backend} http={args.http} procesos={args.processes} hilos={args.threads}")
+    print(f"  NCF asignados: {len(ncfs)} en {elapsed:.2f}s ({len(ncfs) / elapsed:.0f} req/s)")
+    print(f"  latencia p50={pct[50] * 1000:.3f}ms p95={pct[95] * 1000:.3f}ms p99={pct[99] * 1000:.3f}ms")
+    print(f"  duplicados: {len(duplicados)}  faltantes: {len(faltantes)}")
+    if duplicados or faltantes or len(ncfs) != total:
+        print(f"  ERROR: ejemplos duplicados={duplicados[:5]} faltantes={faltantes[:5]}")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--backend', choices=['sqlite', 'memory'], default='sqlite')
+    parser.add_argument('--processes', type=int, default=4,
+                        help='Procesos concurrentes (solo SQLite y sin --http)')
+    parser.add_argument('--threads', type=int, default=8, help='Hilos por proceso')
+    parser.add_argument('--ops', type=int, default=1000, help='NCF asignados por hilo')
+    parser.add_argument('--http', action='store_true',
+                        help='Pasar por la ruta /api/generate_ncf de demo_app')
+    args = parser.parse_args()
+    if args.http or args.backend == 'memory':
+        args.processes = 1
+    sys.exit(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Escritura y lectura de los TXT 606/607/608 con el códec de ``tools/dgii_txt.py``.
+
+Genera ``--rows`` filas sintéticas por formato (serie B, y serie E para los
+formatos e-CF), las codifica, lee el archivo resultante y verifica la ida y
+vuelta. Para el 606 también mide la construcción anterior con f-strings fila
+por fila, tal como estaba en el asistente, y cuenta las filas que difieren:
+solo deben ser las de montos que ``int`` truncaba un centavo. Las pruebas de
+formato están en ``tests/test_dgii_txt.py`` del módulo.
+
+    python -m benchmarks.dgii_txt_codec --rows 1000000
+"""
+
+import argparse
+import importlib.util
+import os
+import random
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CODEC_PATH = os.path.join(ROOT, 'attached_assets', 'odoo_ncf_module', 'tools', 'dgii_txt.py')
+
+
+def load_codec():
+    """Importa ``tools/dgii_txt.py`` sin pasar por el paquete (que requiere Odoo)"""
+    spec = importlib.util.spec_from_file_location('ncf_dgii_txt', CODEC_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _ncf(prefix, i):
+    return f"{prefix}{i % 10 ** 8:08d}" if prefix[0] == 'B' else f"{prefix}{i % 10 ** 10:010d}"
+
+
+def make_rows(codigo, count, series=('B01', 'B02')):
+    """Filas sintéticas de un mes en el orden del formato ``codigo``"""
+    inicio = date(2026, 1, 1)
+    fechas = [inicio + timedelta(days=d) for d in range(31)]
+    rows = []
+    for i in range(count):
+        ncf = _ncf(random.choice(series), i)
+        fecha = fechas[i % 31]
+        monto = round(random.uniform(1, 500000), 2)
+        itbis = round(monto * 0.18, 2)
+        rnc = f"{random.randrange(10 ** 8, 10 ** 9)}" if i % 4 else f"{random.randrange(10 ** 10, 10 ** 11):011d}"
+        tipo_id = '1' if len(rnc) == 9 else '2'
+        if codigo == '606':
+            modificado = _ncf(series[0], i + 1) if i % 50 == 0 else ''
+            rows.append((rnc, tipo_id, ncf, modificado, ncf[1:3], fecha, monto, itbis))
+        elif codigo == '607':
+            rows.append((rnc, tipo_id, '01', ncf, ncf[1:3], fecha, monto, itbis))
+        else:
+            rows.append((ncf, fecha, f"{i % 10 + 1:02d}"))
+    return rows
+
+
+def encode_fstrings_606(rows):
+    """Construcción anterior del TXT 606: f-strings por fila, sin validación"""
+    registros = []
+    for rnc, tipo_id, ncf, modificado, tipo, fecha, monto, itbis in rows:
+        monto_facturado = int(monto * 100)
+        itbis_facturado = int(itbis * 100)
+        registros.append(
+            f"{rnc:<11}"
+            f"{tipo_id:<1}"
+            f"{ncf or '':<11}"
+            f"{modificado or '':<11}"
+            f"{tipo or '':<2}"
+            f"{fecha.strftime('%d%m%Y')}"
+            f"{monto_facturado:>12}"
+            f"{itbis_facturado:>12}"
+        )
+    return '\n'.join(registros).encode('utf-8')
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--rows', type=int, default=1000000, help='Filas por formato')
+    args = parser.parse_args()
+
+    codec = load_codec()
+    ok = True
+    formatos = [(codigo, layout, ('B01', 'B02')) for codigo, layout in codec.LAYOUTS.items()]
+    formatos += [(f"{codigo}e", layout, ('E31', 'E32')) for codigo, layout in codec.LAYOUTS_ECF.items()]
+    for codigo, layout, series in formatos:
+        rows = make_rows(layout.code, args.rows, series)
+        data, encode_time = timed(layout.encode, rows)
+        parsed, parse_time = timed(layout.parse, data)
+        roundtrip = parsed == rows
+        ok = ok and roundtrip
+        print(f"{codigo:<4} escritura {args.rows / encode_time:>12,.0f} filas/s  "
+              f"lectura {args.rows / parse_time:>12,.0f} filas/s  "
+              f"{len(data) / 2 ** 20:.1f} MiB  ida y vuelta={'ok' if roundtrip else 'ERROR'}")
+        if codigo == '606':
+            legacy, legacy_time = timed(encode_fstrings_606, rows)
+            distintas = sum(a != b for a, b in zip(legacy.split(b'\n'), data.split(b'\n')))
+            print(f"606  f-strings {args.rows / legacy_time:>12,.0f} filas/s  "
+                  f"({legacy_time / encode_time:.1f}x)  filas distintas={distintas} (centavos truncados)")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Validación previa al envío de los reportes 606/607 sobre columnas completas.
+
+Genera ``--rows`` filas válidas de un período, inserta errores conocidos
+(RNC sin dígito verificador correcto, Tipo ID cambiado, NCF vacío o con
+formato inválido, NCF repetido, montos negativos) en ``--error-rate`` de las
+filas y mide ``tools/dgii_validacion.validar``. Termina con código 1 si la
+validación no detecta todos los errores insertados o reporta filas válidas.
+
+    python -m benchmarks.dgii_validation --rows 500000
+"""
+
+import argparse
+import importlib
+import os
+import random
+import sys
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOLS_DIR = os.path.join(ROOT, 'attached_assets', 'odoo_ncf_module', 'tools')
+
+
+def load_tools():
+    """Importa ``tools/dgii_validacion.py`` y ``tools/rnc.py`` sin el paquete (que requiere Odoo)"""
+    package = types.ModuleType('ncf_tools')
+    package.__path__ = [TOOLS_DIR]
+    sys.modules.setdefault('ncf_tools', package)
+    return importlib.import_module('ncf_tools.dgii_validacion'), importlib.import_module('ncf_tools.rnc')
+
+
+def make_columns(rnc, reporte, count):
+    columnas = {campo: [] for campo in ('rnc', 'tipo_id', 'ncf', 'ncf_modificado', 'tipo_comprobante',
+                                        'monto_facturado', 'itbis_facturado')}
+    for i in range(count):
+        if i % 4 == 0:
+            identificador, tipo_id = rnc.complete(f"{random.randrange(10 ** 7, 10 ** 8)}", 'rnc'), '1'
+        else:
+            identificador, tipo_id = rnc.complete(f"{random.randrange(10 ** 10):010d}", 'cedula'), '2'
+        tipo = '04' if reporte == '606' and i % 40 == 0 else '01'
+        monto = round(random.uniform(1, 500000), 2)
+        columnas['rnc'].append(identificador)
+        columnas['tipo_id'].append(tipo_id)
+        columnas['ncf'].append(f"B{tipo}{i:08d}")
+        columnas['ncf_modificado'].append(f"B01{i + 1:08d}" if tipo == '04' else False)
+        columnas['tipo_comprobante'].append(tipo)
+        columnas['monto_facturado'].append(monto)
+        columnas['itbis_facturado'].append(round(monto * 0.18, 2))
+    return columnas
+
+
+def inject_errors(columnas, rate):
+    """Inserta errores en filas al azar; retorna ``{(fila, codigo)}``"""
+    count = len(columnas['ncf'])
+    filas = random.sample(range(1, count), int(count * rate))
+    esperados = set()
+    for n, fila in enumerate(filas):
+        tipo = n % 6
+        if tipo == 0:
+            valor = columnas['rnc'][fila]
+            columnas['rnc'][fila] = valor[:-1] + str((int(valor[-1]) + 1) % 10)
+            esperados.add((fila, 'rnc_digito'))
+        elif tipo == 1:
+            columnas['tipo_id'][fila] = '2' if columnas['tipo_id'][fila] == '1' else '1'
+            esperados.add((fila, 'tipo_id'))
+        elif tipo == 2:
+            columnas['ncf'][fila] = False
+            esperados.add((fila, 'ncf_requerido'))
+        elif tipo == 3:
+            columnas['ncf'][fila] = columnas['ncf'][fila][:-2]
+            esperados.add((fila, 'ncf_formato'))
+        elif tipo == 4:
+            for campo in ('rnc', 'tipo_id', 'ncf', 'ncf_modificado', 'tipo_comprobante'):
+                columnas[campo][fila] = columnas[campo][fila - 1]
+            esperados.add((fila, 'ncf_duplicado'))
+        else:
+            columnas['monto_facturado'][fila] = -columnas['monto_facturado'][fila]
+            esperados.add((fila, 'monto_negativo'))
+    return esperados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--error-rate', type=float, default=0.001)
+    args = parser.parse_args()
+
+    validacion, rnc = load_tools()
+    ok = True
+    for reporte in ('606', '607'):
+        random.seed(reporte)
+        columnas = make_columns(rnc, reporte, args.rows)
+        esperados = inject_errors(columnas, args.error_rate)
+        start = time.perf_counter()
+        errores = validacion.validar(columnas, reporte)
+        elapsed = time.perf_counter() - start
+        encontrados = {(error.fila, error.codigo) for error in errores}
+        faltantes = esperados - encontrados
+        # Un NCF duplicado o cambiado también puede romper otras reglas de la misma fila
+        sobrantes = {fila for fila, _codigo in encontrados} - {fila for fila, _codigo in esperados}
+        print(f"{reporte}  {args.rows / elapsed:>12,.0f} filas/s  {elapsed:.2f} s  "
+              f"errores={len(errores)} insertados={len(esperados)} "
+              f"no detectados={len(faltantes)} filas válidas reportadas={len(sobrantes)}")
+        ok = ok and not faltantes and not sobrantes
+    if not ok:
+        print('ERROR: la validación no coincide con los errores insertados')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de generación de e-CF (renderizado, validación XSD y firma).
+
+Usa ``tools/ecf.py`` del módulo fiscal directamente, sin Odoo, con
+documentos sintéticos y un certificado autofirmado generado al vuelo:
+
+    python -m benchmarks.ecf_generation --docs 2000 --items 10
+    python -m benchmarks.ecf_generation --xsd-dir /ruta/xsd_dgii
+
+Sin ``--xsd-dir`` se omite la validación (la DGII no permite redistribuir
+sus esquemas). Reporta documentos por minuto de cada etapa por separado y
+del proceso completo de ``build_batch``.
+"""
+
+import argparse
+import datetime
+import importlib.util
+import os
+import time
+
+from .common import percentiles
+
+ECF_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'attached_assets', 'odoo_ncf_module', 'tools', 'ecf.py'
+)
+
+
+def load_ecf():
+    """Importa ``tools/ecf.py`` sin pasar por el paquete (que requiere Odoo)"""
+    spec = importlib.util.spec_from_file_location('ncf_ecf', ECF_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def self_signed_p12(password='bench'):
+    """Certificado PKCS#12 autofirmado para medir la firma"""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.hazmat.primitives.serialization import BestAvailableEncryption, pkcs12
+    from cryptography.x509.oid import NameOID
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'Benchmark e-CF')])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now)
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    return pkcs12.serialize_key_and_certificates(
+        b'bench', key, cert, None, BestAvailableEncryption(password.encode())
+    ), password
+
+
+def make_documents(count, items):
+    """Documentos e-CF 31 sintéticos con ``items`` líneas gravadas cada uno"""
+    fecha = datetime.date.today()
+    documents = []
+    for i in range(count):
+        lines = [{
+            'numero_linea': n,
+            'indicador_facturacion': 1,
+            'nombre_item': f'Producto {n}',
+            'indicador_bien_servicio': 1,
+            'cantidad_item': 1.0,
+            'precio_unitario_item': 100.0,
+            'monto_item': 100.0,
+        } for n in range(1, items + 1)]
+        documents.append({
+            'tipo_ecf': '31',
+            'encf': f'E31{i + 1:010d}',
+            'fecha_vencimiento_secuencia': datetime.date(fecha.year + 1, 12, 31),
+            'tipo_ingresos': '01',
+            'tipo_pago': 1,
+            'rnc_emisor': '131000000',
+            'razon_social_emisor': 'Empresa de Prueba SRL',
+            'direccion_emisor': 'Santo Domingo',
+            'fecha_emision': fecha,
+            'rnc_comprador': '101000000',
+            'razon_social_comprador': 'Cliente de Prueba SRL',
+            'monto_gravado_total': 100.0 * items,
+            'total_itbis': 18.0 * items,
+            'monto_total': 118.0 * items,
+            'items': lines,
+            'fecha_hora_firma': datetime.datetime.now(),
+        })
+    return documents
+
+
+def _stage(name, func, inputs):
+    """Ejecuta ``func`` sobre cada entrada midiendo cada llamada"""
+    samples = []
+    results = []
+    start = time.perf_counter()
+    for item in inputs:
+        t0 = time.perf_counter()
+        results.append(func(item))
+        samples.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    pct = percentiles(samples)
+    print(f"  {name:<10} {len(inputs) / elapsed * 60:>12,.0f} docs/min  "
+          f"p50={pct[50] * 1000:.3f}ms p99={pct[99] * 1000:.3f}ms")
+    return results
+
+
+def run(args):
+    ecf = load_ecf()
+    p12, password = self_signed_p12()
+    signer = ecf.load_signer(p12, password)
+    documents = make_documents(args.docs, args.items)
+    schema = ecf.get_schema(args.xsd_dir, '31') if args.xsd_dir else None
+
+    print(f"docs={args.docs} items={args.items} xsd={'sí' if schema is not None else 'no'}")
+    roots = _stage('render', ecf.render, documents)
+    if schema is not None:
+        errors = _stage('validar', lambda root: ecf.validate(root, schema), roots)
+        invalid = sum(1 for e in errors if e)
+        if invalid:
+            print(f"  documentos inválidos: {invalid} (ej.: {next(e for e in errors if e)[:2]})")
+    _stage('firmar', signer.sign, roots)
+
+    start = time.perf_counter()
+    results = ecf.build_batch(documents, signer, args.xsd_dir)
+    elapsed = time.perf_counter() - start
+    size = sum(len(xml) for xml, _errors in results if xml)
+    print(f"  {'completo':<10} {len(documents) / elapsed * 60:>12,.0f} docs/min  "
+          f"({size / max(1, len(results)) / 1024:.1f} KiB/doc)")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--docs', type=int, default=1000, help='Documentos a generar')
+    parser.add_argument('--items', type=int, default=10, help='Líneas por documento')
+    parser.add_argument('--xsd-dir', default=None,
+                        help='Directorio con los XSD de la DGII (e-CF 31 v.1.0.xsd)')
+    return run(parser.parse_args())
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark del envío de e-CF contra el receptor local ``ecf_mock_receiver.py``.
+
+Levanta el receptor simulado en un hilo, firma documentos sintéticos y los
+envía con ``tools/ecf_client.py`` en lotes, como lo hace la cola del módulo
+fiscal: envío en paralelo, reintento de los fallos temporales y consulta de
+estado por lotes hasta que todos tienen resultado. No requiere Odoo:
+
+    python -m benchmarks.ecf_submission --docs 2000 --concurrency 1,8,32
+    python -m benchmarks.ecf_submission --latency 0.05 --fail-rate 0.1
+
+Con ``--url`` se usa un receptor ya levantado en lugar del interno.
+"""
+
+import argparse
+import importlib.util
+import logging
+import os
+import threading
+import time
+
+from .ecf_generation import load_ecf, make_documents, self_signed_p12
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLIENT_PATH = os.path.join(ROOT, 'attached_assets', 'odoo_ncf_module', 'tools', 'ecf_client.py')
+BATCH = 50
+
+
+def load_client_module():
+    """Importa ``tools/ecf_client.py`` sin pasar por el paquete (que requiere Odoo)"""
+    spec = importlib.util.spec_from_file_location('ncf_ecf_client', CLIENT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def start_receiver(args):
+    """Levanta ``ecf_mock_receiver`` en un hilo y retorna su URL"""
+    from werkzeug.serving import make_server
+    import ecf_mock_receiver
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    ecf_mock_receiver.CONFIG.update(latency=args.latency, fail_rate=args.fail_rate,
+                                    reject_rate=args.reject_rate, processing_polls=1)
+    server = make_server('127.0.0.1', 0, ecf_mock_receiver.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return 'http://127.0.0.1:%s/' % server.server_port
+
+
+def run_queue(client_module, client, documents):
+    """Simula la cola: envía con reintentos y consulta por lotes hasta terminar"""
+    pendientes = list(documents)
+    enviados = []
+    reintentos = 0
+    start = time.perf_counter()
+    while pendientes:
+        lote, pendientes = pendientes[:BATCH], pendientes[BATCH:]
+        for item, (data, error) in zip(lote, client.submit_many(lote)):
+            if error is None:
+                enviados.append(data['trackId'])
+            elif isinstance(error, client_module.EcfTransientError):
+                reintentos += 1
+                pendientes.append(item)
+    envio = time.perf_counter() - start
+
+    resultados = {}
+    start = time.perf_counter()
+    while enviados:
+        lote, enviados = enviados[:BATCH], enviados[BATCH:]
+        for track_id, (data, error) in zip(lote, client.status_many(lote)):
+            if data and data['estado'] in ('Aceptado', 'Rechazado', 'Aceptado Condicional'):
+                resultados[track_id] = data['estado']
+            else:
+                reintentos += 1 if error else 0
+                enviados.append(track_id)
+    consulta = time.perf_counter() - start
+    return envio, consulta, reintentos, resultados
+
+
+def run(args):
+    ecf = load_ecf()
+    client_module = load_client_module()
+    p12, password = self_signed_p12()
+    signer = ecf.load_signer(p12, password)
+    url = args.url or start_receiver(args)
+
+    for concurrency in [int(c) for c in args.concurrency.split(',')]:
+        # Cada ronda usa e-NCF nuevos para que el receptor no los marque duplicados
+        datas = make_documents(args.docs, args.items)
+        documents = []
+        for i, data in enumerate(datas):
+            data['encf'] = 'E31%010d' % (concurrency * 10 ** 6 + i + 1)
+            xml, _errors = ecf.build_document(data, signer)
+            documents.append((xml, '%s.xml' % data['encf']))
+
+        client = client_module.EcfClient(url, signer, concurrency=concurrency)
+        envio, consulta, reintentos, resultados = run_queue(client_module, client, documents)
+        client.close()
+        aceptados = sum(1 for estado in resultados.values() if estado != 'Rechazado')
+        print(f"concurrencia={concurrency:<3} envío {len(documents) / envio:>8,.0f} docs/s  "
+              f"consulta {len(resultados) / consulta:>8,.0f} docs/s  "
+              f"aceptados={aceptados} rechazados={len(resultados) - aceptados} reintentos={reintentos}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--docs', type=int, default=1000, help='Documentos a enviar')
+    parser.add_argument('--items', type=int, default=5, help='Líneas por documento')
+    parser.add_argument('--concurrency', default='1,8,32', help='Concurrencias a comparar')
+    parser.add_argument('--url', default=None, help='URL de un receptor ya levantado')
+    parser.add_argument('--latency', type=float, default=0.01, help='Latencia simulada por petición')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Fracción de respuestas 503')
+    parser.add_argument('--reject-rate', type=float, default=0.0, help='Fracción de e-CF rechazados')
+    return run(parser.parse_args())
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,376 @@
+# -*- coding: utf-8 -*-
+"""
+Generador de carga que simula una flota de terminales POS.
+
+Cada terminal repite el guion de un cobro: abre el popup NCF, consulta los
+tipos de comprobante, elige un tipo fiscal, genera el NCF y finaliza la
+venta, con pausas entre pasos. Al terminar se reportan throughput,
+latencias p50/p95/p99 por paso, tasa de errores y NCF duplicados o con
+huecos entre los emitidos.
+
+Contra la aplicación de demostración:
+
+    python -m benchmarks.pos_load --target demo --url http://localhost:5000 --terminals 50
+
+Contra una instancia Odoo local (JSON-RPC, una sesión por terminal):
+
+    python -m benchmarks.pos_load --target odoo --url http://localhost:8069 \\
+        -d ncf_bench --login admin --password admin --config-ids 1,2,3 --terminals 20
+
+Solo usa la biblioteca estándar (``asyncio``): cada terminal mantiene su
+propia conexión HTTP/1.1 persistente.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from .common import percentiles
+
+PASOS = ('tipos', 'generar', 'finalizar', 'cobro')
+
+
+def _ncf_digits(serie):
+    """Dígitos del número: 10 en la serie electrónica (e-CF), 8 en las demás"""
+    return 10 if serie == 'E' else 8
+
+
+class HttpError(Exception):
+    """Respuesta HTTP o JSON-RPC con error"""
+
+
+class HttpClient:
+    """Cliente HTTP/1.1 mínimo con conexión persistente y cookies de sesión"""
+
+    def __init__(self, base_url, timeout=30.0):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.ssl = parts.scheme == 'https'
+        self.timeout = timeout
+        self.cookies = {}
+        self._reader = self._writer = None
+
+    async def _connect(self):
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except OSError:
+                pass
+            self._reader = self._writer = None
+
+    async def request(self, method, path, payload=None):
+        """Envía la petición y retorna ``(status, cuerpo JSON)``; reintenta una vez si el servidor cerró la conexión"""
+        for intento in range(2):
+            try:
+                return await asyncio.wait_for(self._request(method, path, payload), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                await self.close()
+                if intento:
+                    raise
+
+    async def _request(self, method, path, payload):
+        await self._connect()
+        body = json.dumps(payload).encode() if payload is not None else b''
+        headers = [
+            f'{method} {path} HTTP/1.1',
+            f'Host: {self.host}:{self.port}',
+            'Connection: keep-alive',
+            'Accept: application/json',
+            f'Content-Length: {len(body)}',
+        ]
+        if payload is not None:
+            headers.append('Content-Type: application/json')
+        if self.cookies:
+            headers.append('Cookie: ' + '; '.join(f'{k}={v}' for k, v in self.cookies.items()))
+        self._writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode() + body)
+        await self._writer.drain()
+
+        status_line = await self._reader.readuntil(b'\r\n')
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await self._reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _sep, value = line.decode('latin-1').partition(':')
+            name, value = name.strip().lower(), value.strip()
+            if name == 'set-cookie':
+                cookie = value.split(';', 1)[0]
+                key, _sep, val = cookie.partition('=')
+                self.cookies[key] = val
+            response_headers[name] = value
+
+        if response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self._reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                if not size:
+                    await self._reader.readuntil(b'\r\n')
+                    break
+                chunks.append(await self._reader.readexactly(size))
+                await self._reader.readexactly(2)
+            data = b''.join(chunks)
+        else:
+            data = await self._reader.readexactly(int(response_headers.get('content-length', 0)))
+
+        if response_headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, json.loads(data) if data else None
+
+
+class DemoTarget:
+    """APIs de ``demo_app.py``"""
+
+    def __init__(self, args):
+        self.args = args
+
+    async def login(self, client, terminal):
+        pass
+
+    async def fetch_tipos(self, client, terminal):
+        status, data = await client.request('GET', '/api/tipos_comprobante')
+        if status != 200:
+            raise HttpError(f'HTTP {status}')
+        return data['tipos']
+
+    async def generate(self, client, terminal, tipo):
+        status, data = await client.request('POST', '/api/generate_ncf', {'tipo_comprobante_id': tipo['id']})
+        if status != 200 or not data.get('success'):
+            raise HttpError(data.get('error') if data else f'HTTP {status}')
+        return data.get('ncf')
+
+    async def finalize(self, client, terminal, ncf):
+        status, data = await client.request('POST', '/api/validate_ncf', {'ncf': ncf})
+        if status != 200 or not data.get('valid'):
+            raise HttpError(data.get('error') if data else f'HTTP {status}')
+
+
+class OdooTarget:
+    """JSON-RPC de Odoo (``get_tipos_comprobante_for_pos`` y ``generate_ncf_for_pos``)"""
+
+    def __init__(self, args):
+        self.args = args
+        self._ids = itertools.count(1)
+
+    async def _call(self, client, path, params):
+        status, data = await client.request('POST', path, {
+            'jsonrpc': '2.0', 'method': 'call', 'id': next(self._ids), 'params': params,
+        })
+        if status != 200:
+            raise HttpError(f'HTTP {status}')
+        if data.get('error'):
+            raise HttpError(data['error'].get('data', {}).get('message') or data['error'].get('message'))
+        return data['result']
+
+    async def call_kw(self, client, model, method, args):
+        return await self._call(client, f'/web/dataset/call_kw/{model}/{method}', {
+            'model': model, 'method': method, 'args': args, 'kwargs': {},
+        })
+
+    async def login(self, client, terminal):
+        await self._call(client, '/web/session/authenticate', {
+            'db': self.args.database, 'login': self.args.login, 'password': self.args.password,
+        })
+
+    async def fetch_tipos(self, client, terminal):
+        return await self.call_kw(client, 'pos.order', 'get_tipos_comprobante_for_pos', [terminal.config_id])
+
+    async def generate(self, client, terminal, tipo):
+        result = await self.call_kw(client, 'pos.order', 'generate_ncf_for_pos', [tipo['id'], terminal.config_id])
+        if not result.get('success'):
+            raise HttpError(result.get('error') or result.get('message'))
+        return result.get('ncf')
+
+    async def finalize(self, client, terminal, ncf):
+        # La orden se sincroniza con el resto de la venta; aquí solo se simula el tiempo de cobro
+        pass
+
+
+class Terminal:
+    """Estado de un terminal simulado"""
+
+    def __init__(self, index, config_id):
+        self.index = index
+        self.config_id = config_id
+
+
+class Stats:
+    """Latencias por paso, errores y NCF emitidos"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.ncfs = []
+        self.checkouts = 0
+
+    def report(self, elapsed):
+        result = {
+            'segundos': round(elapsed, 3),
+            'cobros': self.checkouts,
+            'cobros_por_segundo': round(self.checkouts / elapsed, 2) if elapsed else 0.0,
+            'pasos': {},
+        }
+        for paso in PASOS:
+            samples = self.samples.get(paso, [])
+            errores = self.errors.get(paso, 0)
+            total = len(samples) + errores
+            pct = percentiles(samples)
+            result['pasos'][paso] = {
+                'ok': len(samples),
+                'errores': errores,
+                'tasa_error': round(errores / total, 4) if total else 0.0,
+                'p50_ms': round(pct[50] * 1000, 3),
+                'p95_ms': round(pct[95] * 1000, 3),
+                'p99_ms': round(pct[99] * 1000, 3),
+            }
+        result['ncf'] = self.check_ncfs()
+        return result
+
+    def check_ncfs(self):
+        """Duplicados entre todos los terminales y huecos por rango emisor
+
+        Con ``--config-ids`` cada terminal asigna de la sub-secuencia de su
+        configuración, así que los huecos se cuentan por (configuración,
+        serie + tipo): el espacio entre las sub-secuencias no es un hueco.
+        """
+        vistos = set()
+        duplicados = []
+        por_rango = defaultdict(list)
+        for config_id, ncf in self.ncfs:
+            if ncf in vistos:
+                duplicados.append(ncf)
+            vistos.add(ncf)
+            digitos = _ncf_digits(ncf[:1])
+            por_rango[config_id, ncf[:-digitos]].append(int(ncf[-digitos:]))
+        huecos = {}
+        for (config_id, prefijo), numeros in por_rango.items():
+            faltantes = (max(numeros) - min(numeros) + 1) - len(set(numeros))
+            if faltantes:
+                huecos[prefijo if config_id is None else f'{prefijo} (config {config_id})'] = faltantes
+        return {
+            'emitidos': len(self.ncfs),
+            'duplicados': len(duplicados),
+            'ejemplos_duplicados': duplicados[:5],
+            'huecos': huecos,
+        }
+
+
+async def _timed(stats, paso, coro):
+    start = time.perf_counter()
+    try:
+        result = await coro
+    except Exception:
+        stats.errors[paso] += 1
+        raise
+    stats.samples[paso].append(time.perf_counter() - start)
+    return result
+
+
+async def _pause(args):
+    if args.think_time:
+        await asyncio.sleep(random.uniform(0, 2 * args.think_time))
+
+
+def _pick_tipo(tipos, rnd):
+    """Elige un tipo fiscal: mayormente consumidor final, a veces crédito fiscal"""
+    fiscales = [t for t in tipos if t.get('es_fiscal')]
+    consumo = [t for t in fiscales if not t.get('requiere_rnc')]
+    credito = [t for t in fiscales if t.get('requiere_rnc')]
+    if consumo and (not credito or rnd.random() < 0.8):
+        return rnd.choice(consumo)
+    return rnd.choice(credito or fiscales)
+
+
+async def run_terminal(target, terminal, args, stats, deadline):
+    client = HttpClient(args.url, timeout=args.timeout)
+    rnd = random.Random(args.seed + terminal.index)
+    try:
+        await target.login(client, terminal)
+        done = 0
+        while (args.checkouts is None or done < args.checkouts) and time.perf_counter() < deadline:
+            done += 1
+            start = time.perf_counter()
+            try:
+                await _pause(args)  # abrir el popup
+                tipos = await _timed(stats, 'tipos', target.fetch_tipos(client, terminal))
+                await _pause(args)  # elegir el tipo
+                tipo = _pick_tipo(tipos, rnd)
+                ncf = await _timed(stats, 'generar', target.generate(client, terminal, tipo))
+                if ncf:
+                    stats.ncfs.append((terminal.config_id, ncf))
+                await _timed(stats, 'finalizar', target.finalize(client, terminal, ncf))
+            except Exception:
+                stats.errors['cobro'] += 1
+                continue
+            stats.samples['cobro'].append(time.perf_counter() - start)
+            stats.checkouts += 1
+    finally:
+        await client.close()
+
+
+async def run(args):
+    target = OdooTarget(args) if args.target == 'odoo' else DemoTarget(args)
+    config_ids = args.config_ids or [None]
+    terminals = [Terminal(i, config_ids[i % len(config_ids)]) for i in range(args.terminals)]
+    stats = Stats()
+    start = time.perf_counter()
+    deadline = start + args.duration if args.duration else float('inf')
+    await asyncio.gather(*(run_terminal(target, t, args, stats, deadline) for t in terminals))
+    return stats.report(time.perf_counter() - start)
+
+
+def _print_report(result):
+    print(f"{result['cobros']} cobros en {result['segundos']}s ({result['cobros_por_segundo']} cobros/s)")
+    for paso, data in result['pasos'].items():
+        print(f"  {paso:<10} ok={data['ok']:<7} errores={data['errores']:<5} "
+              f"p50={data['p50_ms']:.1f}ms p95={data['p95_ms']:.1f}ms p99={data['p99_ms']:.1f}ms")
+    ncf = result['ncf']
+    print(f"  NCF emitidos={ncf['emitidos']} duplicados={ncf['duplicados']} huecos={ncf['huecos'] or 0}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--target', choices=['demo', 'odoo'], default='demo')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--terminals', type=int, default=10, help='Terminales simulados')
+    parser.add_argument('--checkouts', type=int, default=None, help='Cobros por terminal')
+    parser.add_argument('--duration', type=float, default=None, help='Duración máxima en segundos')
+    parser.add_argument('--think-time', type=float, default=0.0,
+                        help='Pausa media entre pasos en segundos (0 = carga máxima)')
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', dest='json_output', default=None, help='Guardar el reporte como JSON')
+    parser.add_argument('-d', '--database', help='Base de datos Odoo (--target odoo)')
+    parser.add_argument('--login', default='admin')
+    parser.add_argument('--password', default='admin')
+    parser.add_argument('--config-ids', default='',
+                        help='IDs de pos.config separados por coma; los terminales se reparten entre ellos')
+    args = parser.parse_args()
+    args.config_ids = [int(c) for c in args.config_ids.split(',') if c]
+    if args.checkouts is None and args.duration is None:
+        args.checkouts = 100
+    if args.target == 'odoo' and not args.database:
+        parser.error('--database es requerido con --target odoo')
+
+    result = asyncio.run(run(args))
+    _print_report(result)
+    if args.json_output:
+        with open(args.json_output, 'w') as f:
+            json.dump(result, f, indent=2)
+    sys.exit(1 if result['ncf']['duplicados'] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Mide el tamaño y el tiempo de carga de los datos NCF en una sesión POS.
+
+Compara la especificación anterior de ``_load_pos_data_models`` (todas las
+secuencias activas de la empresa, con contadores) con la actual (solo las
+secuencias vigentes aplicables al terminal, campos mínimos).
+
+    python -m benchmarks.pos_session_load -d ncf_bench --config-id 1
+"""
+
+from .common import build_parser, odoo_env, payload_size, timed
+
+NCF_MODELS = ('tipo.comprobante', 'ncf.sequence')
+
+
+def legacy_spec(env):
+    """Especificación de carga previa a la carga diferida"""
+    return {
+        'tipo.comprobante': {
+            'domain': [('para_venta', '=', True), ('activo', '=', True)],
+            'fields': ['name', 'codigo', 'es_fiscal', 'para_venta', 'requiere_rnc', 'activo'],
+        },
+        'ncf.sequence': {
+            'domain': [('activa', '=', True), ('company_id', '=', env.company.id)],
+            'fields': ['name', 'tipo_comprobante_id', 'serie', 'secuencia_actual',
+                       'secuencia_hasta', 'disponibles'],
+        },
+    }
+
+
+def current_spec(env, config_id):
+    """Especificación que usa hoy el POS para el terminal indicado"""
+    spec = env['pos.order']._load_pos_data_models(config_id)
+    return {model: spec[model] for model in NCF_MODELS}
+
+
+def measure(env, spec, repeat):
+    """Carga cada modelo ``repeat`` veces; retorna filas, bytes y mejor tiempo"""
+    result = {}
+    for model, params in spec.items():
+        best = None
+        for _i in range(repeat):
+            env.invalidate_all()
+            records, elapsed = timed(
+                env[model].search_read, params['domain'], params['fields']
+            )
+            best = elapsed if best is None else min(best, elapsed)
+        result[model] = {
+            'rows': len(records),
+            'bytes': payload_size(records),
+            'ms': best * 1000,
+        }
+    return result
+
+
+def main():
+    parser = build_parser(__doc__)
+    parser.add_argument('--config-id', type=int, required=True,
+                        help='ID del pos.config cuya sesión se mide')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with odoo_env(args.database, args.config) as env:
+        config = env['pos.config'].browse(args.config_id)
+        env = env(context=dict(env.context, allowed_company_ids=config.company_id.ids))
+        before = measure(env, legacy_spec(env), args.repeat)
+        after = measure(env, current_spec(env, args.config_id), args.repeat)
+
+    print(f"{'modelo':<20}{'filas':>14}{'bytes':>20}{'ms':>20}")
+    for model in NCF_MODELS:
+        b, a = before[model], after[model]
+        print(f"{model:<20}"
+              f"{b['rows']:>6} -> {a['rows']:<6}"
+              f"{b['bytes']:>9} -> {a['bytes']:<9}"
+              f"{b['ms']:>8.2f} -> {a['ms']:<8.2f}")
+
+
+if __name__ == '__main__':
+    main()
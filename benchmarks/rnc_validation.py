@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Validación de RNC/cédulas en importaciones masivas de contactos.
+
+Compara la validación por lotes de ``tools/rnc.py`` (longitud y dígito
+verificador) con la validación registro por registro con expresiones
+regulares. Con ``-d`` también mide la creación de contactos en lotes
+(``res.partner.create``), que valida formato y unicidad de todo el lote con
+una consulta; los contactos se revierten al terminar.
+
+    python -m benchmarks.rnc_validation --count 100000
+    python -m benchmarks.rnc_validation --count 100000 -d ncf_bench --batch 1000
+"""
+
+import argparse
+import importlib.util
+import os
+import random
+import re
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RNC_PATH = os.path.join(ROOT, 'attached_assets', 'odoo_ncf_module', 'tools', 'rnc.py')
+
+
+def load_rnc():
+    """Importa ``tools/rnc.py`` sin pasar por el paquete (que requiere Odoo)"""
+    spec = importlib.util.spec_from_file_location('ncf_rnc', RNC_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_identifiers(rnc, count, invalid_rate=0.01):
+    """Identificadores formateados (1:3 RNC/cédula), con una fracción inválida"""
+    values, tipos = [], []
+    for i in range(count):
+        tipo = 'rnc' if i % 4 == 0 else 'cedula'
+        prefix = ''.join(random.choice('0123456789') for _i in range(8 if tipo == 'rnc' else 10))
+        digits = rnc.complete(prefix, tipo)
+        if random.random() < invalid_rate:
+            digits = digits[:-1] + str((int(digits[-1]) + 1) % 10)
+        values.append(rnc.format_identifier(digits, tipo))
+        tipos.append(tipo)
+    return values, tipos
+
+
+def validate_per_record(values, tipos):
+    """Validación registro por registro, como la hacía el constraint original"""
+    errors = []
+    for value, tipo in zip(values, tipos):
+        digits = re.sub(r'[^0-9]', '', value)
+        if tipo == 'rnc':
+            if len(digits) != 9:
+                errors.append('longitud')
+                continue
+            total = sum(int(d) * w for d, w in zip(digits, (7, 9, 8, 6, 5, 4, 3, 2)))
+            expected = {0: 2, 1: 1}.get(total % 11, 11 - total % 11)
+        else:
+            if len(digits) != 11:
+                errors.append('longitud')
+                continue
+            total = 0
+            for i, d in enumerate(digits[:10]):
+                product = int(d) * (1 if i % 2 == 0 else 2)
+                total += product // 10 + product % 10
+            expected = (10 - total % 10) % 10
+        errors.append(None if int(digits[-1]) == expected else 'digito_verificador')
+    return errors
+
+
+def bench_create(args, values, tipos):
+    from .common import odoo_env
+
+    with odoo_env(args.database, args.config) as env:
+        errors = load_rnc().validate_many(values, tipos)
+        vals_list = [
+            {'name': f'Importado {i}', 'rnc': value, 'tipo_rnc': tipo}
+            for i, (value, tipo, error) in enumerate(zip(values, tipos, errors)) if not error
+        ]
+        queries = env.cr.sql_log_count
+        start = time.perf_counter()
+        for i in range(0, len(vals_list), args.batch):
+            env['res.partner'].create(vals_list[i:i + args.batch])
+            env.flush_all()
+        elapsed = time.perf_counter() - start
+        queries = env.cr.sql_log_count - queries
+        print(f"create     {len(vals_list) / elapsed:>12,.0f} contactos/s  "
+              f"lotes de {args.batch}  consultas={queries}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--count', type=int, default=100000, help='Identificadores a validar')
+    parser.add_argument('--invalid-rate', type=float, default=0.01)
+    parser.add_argument('-d', '--database', default=None,
+                        help='Base de datos Odoo de prueba para medir res.partner.create')
+    parser.add_argument('-c', '--config', default=None)
+    parser.add_argument('--batch', type=int, default=1000, help='Contactos por create')
+    args = parser.parse_args()
+
+    rnc = load_rnc()
+    values, tipos = make_identifiers(rnc, args.count, args.invalid_rate)
+    start = time.perf_counter()
+    baseline = validate_per_record(values, tipos)
+    per_record = time.perf_counter() - start
+    start = time.perf_counter()
+    batch = rnc.validate_many(values, tipos)
+    batched = time.perf_counter() - start
+    if baseline != batch:
+        print('ERROR: los resultados de las dos validaciones no coinciden')
+        return 1
+    invalid = sum(1 for error in batch if error)
+    print(f"registro   {args.count / per_record:>12,.0f} ids/s")
+    print(f"lote       {args.count / batched:>12,.0f} ids/s  ({per_record / batched:.1f}x)  inválidos={invalid}")
+    if args.database:
+        bench_create(args, values, tipos)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+Suite de benchmarks de las rutas fiscales críticas.
+
+Cada benchmark corre en su propia transacción, que se revierte al terminar,
+de modo que la misma base de datos (preparada con ``benchmarks.datagen``)
+sirve para comparar varias versiones del código. Los resultados se guardan
+en ``benchmarks/results/<commit>.json``; con ``--compare`` se comparan contra
+una ejecución anterior y el proceso termina con código 1 si algún benchmark
+empeora más allá del umbral.
+
+    python -m benchmarks.run -d ncf_bench
+    python -m benchmarks.run -d ncf_bench --only ncf_allocation,invoice_post
+    python -m benchmarks.run -d ncf_bench --compare benchmarks/results/abc1234.json
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+
+from . import datagen
+from .common import build_parser, odoo_env, percentiles, timed
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+
+def bench_ncf_allocation(env, args):
+    """Asignación de NCF consecutivos sobre la secuencia de consumo"""
+    tipo = env['tipo.comprobante'].search([('codigo', '=', '02')], limit=1)
+    sequence = env['ncf.sequence'].get_active_sequence_for_type(tipo.id, env.company.id)
+    samples = []
+    for _i in range(args.ops):
+        start = time.perf_counter()
+        sequence.get_next_ncf()
+        env.flush_all()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_pos_order_sync(env, args):
+    """Sincronización de órdenes POS fiscales (una orden por llamada)"""
+    session = datagen.ensure_pos_session(env)
+    partners = env['res.partner'].search([('rnc', '!=', False)], limit=200)
+    samples = []
+    for order in datagen.build_ui_orders(env, session, partners, args.ops):
+        _res, elapsed = timed(env['pos.order'].create_from_ui, [order])
+        samples.append(elapsed)
+    return samples
+
+
+def bench_invoice_post(env, args):
+    """Confirmación de facturas de venta fiscales con asignación de NCF"""
+    partners = env['res.partner'].search([('rnc', '!=', False)], limit=200)
+    moves = datagen.generate_invoices(env, partners, args.ops, commit=False)
+    env.flush_all()
+    samples = []
+    for move in moves:
+        _res, elapsed = timed(move.action_post)
+        samples.append(elapsed)
+    return samples
+
+
+def _bench_report(wizard_model, formato, cache=False):
+    def bench(env, args):
+        today = date.today()
+        wizard = env[wizard_model].create({
+            'fecha_desde': today - timedelta(days=args.report_days),
+            'fecha_hasta': today,
+            'formato_reporte': formato,
+        })
+        if cache:
+            wizard.action_generar_reporte()
+        samples = []
+        for _i in range(args.report_repeat):
+            if not cache:
+                # Sin el archivo guardado, cada repetición genera el reporte
+                env['ncf.reporte.archivo'].search([('clave', '=', wizard._get_clave_cache())]).unlink()
+            env.invalidate_all()
+            _res, elapsed = timed(wizard.action_generar_reporte)
+            samples.append(elapsed)
+        return samples
+    if cache:
+        bench.__doc__ = f'Descarga del {wizard_model} en formato {formato} sin cambios (caché)'
+    else:
+        bench.__doc__ = f'Generación del {wizard_model} en formato {formato}'
+    return bench
+
+
+BENCHMARKS = {
+    'ncf_allocation': bench_ncf_allocation,
+    'pos_order_sync': bench_pos_order_sync,
+    'invoice_post': bench_invoice_post,
+    'report_606_txt': _bench_report('reporte.606.wizard', 'txt'),
+    'report_606_xlsx': _bench_report('reporte.606.wizard', 'xlsx'),
+    'report_607_txt': _bench_report('reporte.607.wizard', 'txt'),
+    'report_607_xlsx': _bench_report('reporte.607.wizard', 'xlsx'),
+    'report_606_cached': _bench_report('reporte.606.wizard', 'txt', cache=True),
+    'report_607_cached': _bench_report('reporte.607.wizard', 'txt', cache=True),
+}
+
+
+def summarize(samples):
+    """Throughput y percentiles (ms) de una lista de duraciones en segundos"""
+    total = sum(samples)
+    p = percentiles([s * 1000 for s in samples])
+    return {
+        'ops': len(samples),
+        'seconds': round(total, 4),
+        'throughput': round(len(samples) / total, 2) if total else 0.0,
+        'p50_ms': round(p[50], 3),
+        'p95_ms': round(p[95], 3),
+        'p99_ms': round(p[99], 3),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(__file__), stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(current, baseline, threshold):
+    """Imprime la variación contra ``baseline``; retorna los benchmarks que empeoran"""
+    regressions = []
+    print(f"\n{'benchmark':<18}{'p95 base':>10}{'p95 actual':>12}{'Δ p95':>9}{'Δ ops/s':>10}")
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if not base:
+            continue
+        delta_p95 = (result['p95_ms'] - base['p95_ms']) / base['p95_ms'] * 100 if base['p95_ms'] else 0.0
+        delta_tp = (result['throughput'] - base['throughput']) / base['throughput'] * 100 if base['throughput'] else 0.0
+        flag = ''
+        if delta_p95 > threshold or delta_tp < -threshold:
+            regressions.append(name)
+            flag = '  REGRESIÓN'
+        print(f"{name:<18}{base['p95_ms']:>10.2f}{result['p95_ms']:>12.2f}{delta_p95:>8.1f}%{delta_tp:>9.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = build_parser(__doc__)
+    parser.add_argument('--only', help='Benchmarks a ejecutar, separados por coma')
+    parser.add_argument('--ops', type=int, default=200,
+                        help='Operaciones por benchmark de asignación/sincronización/confirmación')
+    parser.add_argument('--report-days', type=int, default=28)
+    parser.add_argument('--report-repeat', type=int, default=5)
+    parser.add_argument('--compare', help='Archivo de resultados contra el cual comparar')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='Porcentaje de empeoramiento tolerado antes de marcar regresión')
+    parser.add_argument('--output', help='Archivo de resultados (por defecto results/<commit>.json)')
+    args = parser.parse_args()
+
+    names = args.only.split(',') if args.only else list(BENCHMARKS)
+    commit = git_commit()
+    current = {
+        'commit': commit,
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'database': args.database,
+        'ops': args.ops,
+        'results': {},
+    }
+
+    print(f"{'benchmark':<18}{'ops':>6}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name in names:
+        with odoo_env(args.database, args.config) as env:
+            result = summarize(BENCHMARKS[name](env, args))
+        current['results'][name] = result
+        print(f"{name:<18}{result['ops']:>6}{result['throughput']:>10.1f}"
+              f"{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f'{commit}.json')
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(current, f, indent=2)
+    print(f'\nResultados guardados en {output}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(current, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
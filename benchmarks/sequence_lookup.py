@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Latencia de búsqueda de secuencias NCF al crecer empresas e historial.
+
+Crea empresas y secuencias históricas (vencidas o inactivas) de forma
+incremental y en cada escala mide ``get_active_sequence_for_type`` para
+pares (empresa, tipo) aleatorios. Con los índices compuestos por empresa la
+latencia debe mantenerse estable. Todo se revierte al terminar.
+
+    python -m benchmarks.sequence_lookup -d ncf_bench --companies 1,10,40 --history 10,100,500
+"""
+
+import random
+from datetime import date, timedelta
+
+from .common import build_parser, odoo_env, percentiles, timed
+
+
+def ensure_companies(env, count):
+    """Retorna ``count`` empresas, creando las que falten"""
+    companies = env['res.company'].search([], order='id')
+    missing = count - len(companies)
+    if missing > 0:
+        companies |= env['res.company'].create([
+            {'name': f'Bench NCF {len(companies) + i}'} for i in range(missing)
+        ])
+    return companies[:count]
+
+
+def ensure_sequences(env, companies, tipos, history):
+    """Garantiza una secuencia vigente y ``history`` históricas por empresa y tipo"""
+    today = date.today()
+    vals_list = []
+    for company in companies:
+        existing = env['ncf.sequence'].search_count([('company_id', '=', company.id)])
+        wanted = len(tipos) * (history + 1)
+        for i in range(existing, wanted):
+            tipo = tipos[i % len(tipos)]
+            vigente = i < len(tipos)
+            year = 0 if vigente else 1 + i // len(tipos)
+            vals_list.append({
+                'name': f'Bench {tipo.codigo}-{i}',
+                'company_id': company.id,
+                'tipo_comprobante_id': tipo.id,
+                'serie': 'B',
+                'secuencia_desde': 1,
+                'secuencia_hasta': 10 ** 7,
+                'fecha_inicio': today - timedelta(days=365 * (year + 1)),
+                'fecha_fin': today + timedelta(days=365) if vigente else today - timedelta(days=365 * year),
+                'activa': vigente or i % 2 == 0,
+            })
+    if vals_list:
+        env['ncf.sequence'].create(vals_list)
+        env.flush_all()
+
+
+def main():
+    parser = build_parser(__doc__)
+    parser.add_argument('--companies', default='1,10,40',
+                        help='Escalas de cantidad de empresas, separadas por coma')
+    parser.add_argument('--history', default='10,100',
+                        help='Secuencias históricas por empresa y tipo, separadas por coma')
+    parser.add_argument('--lookups', type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{'empresas':>9}{'historial':>10}{'secuencias':>12}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    with odoo_env(args.database, args.config) as env:
+        tipos = env['tipo.comprobante'].search([('es_fiscal', '=', True), ('para_venta', '=', True)])
+        for history in map(int, args.history.split(',')):
+            for count in map(int, args.companies.split(',')):
+                companies = ensure_companies(env, count)
+                ensure_sequences(env, companies, tipos, history)
+                env.cr.execute('ANALYZE ncf_sequence')
+                samples = []
+                for _i in range(args.lookups):
+                    company, tipo = random.choice(companies), random.choice(tipos)
+                    env.invalidate_all()
+                    _seq, elapsed = timed(
+                        env['ncf.sequence'].get_active_sequence_for_type, tipo.id, company.id
+                    )
+                    samples.append(elapsed * 1000)
+                p = percentiles(samples)
+                total = env['ncf.sequence'].search_count([])
+                print(f"{count:>9}{history:>10}{total:>12}{p[50]:>9.3f}{p[95]:>9.3f}{p[99]:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,12 +4,28 @@ Demostración Web del Módulo POS NCF Integration para Odoo 17
 Esta aplicación simula la funcionalidad del módulo NCF en un entorno de demostración
 """
 
-from flask import Flask, render_template_string, jsonify, request
+from flask import Flask, jsonify, request, Response, stream_with_context
+import hashlib
 import json
+import os
 import random
 from datetime import datetime
 
-app = Flask(__name__)
+from demo_store import create_store, format_ncf, SecuenciaError
+
+# Los recursos de terceros se sirven desde demo_static/vendor (sin CDN). Sus
+# rutas incluyen la versión, así que se pueden cachear por un año.
+app = Flask(
+    __name__,
+    static_folder=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'demo_static'),
+    static_url_path='/static'
+)
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 365 * 24 * 3600
+
+# Límites de las APIs por lote (el tamaño del cuerpo aplica también al streaming)
+app.config['MAX_CONTENT_LENGTH'] = 8 * 1024 * 1024
+MAX_NCF_POR_LOTE = 5000
+MAX_VALIDACIONES_POR_LOTE = 20000
 
 # Datos de demostración que simularían los datos de Odoo
 TIPOS_COMPROBANTE = [
@@ -27,10 +43,122 @@ SECUENCIAS_NCF = {
     4: {"serie": "B", "codigo": "04", "actual": 50, "limite": 999},
 }
 
+TIPOS_POR_ID = {t["id"]: t for t in TIPOS_COMPROBANTE}
+
+# Almacén de secuencias (memoria o SQLite, ver demo_store.create_store)
+STORE = create_store(SECUENCIAS_NCF)
+
+
+class LoteInvalido(Exception):
+    """Petición por lote mal formada o que excede los límites"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+@app.errorhandler(LoteInvalido)
+def lote_invalido(e):
+    return jsonify({"success": False, "error": str(e)}), e.status
+
+
+@app.errorhandler(413)
+def peticion_demasiado_grande(e):
+    return jsonify({"success": False, "error": "La petición excede el tamaño máximo permitido"}), 413
+
+
+def _parse_items_generacion(data):
+    """Valida ``{"items": [{"tipo_comprobante_id": 1, "cantidad": 10}, ...]}``"""
+    items = (data or {}).get('items')
+    if not isinstance(items, list) or not items:
+        raise LoteInvalido("Se requiere una lista de items")
+    parsed = []
+    for item in items:
+        try:
+            parsed.append((int(item['tipo_comprobante_id']), int(item.get('cantidad', 1))))
+        except (KeyError, TypeError, ValueError):
+            raise LoteInvalido("Cada item requiere tipo_comprobante_id y una cantidad numérica")
+    if any(cantidad < 1 for _tipo, cantidad in parsed):
+        raise LoteInvalido("La cantidad debe ser mayor que cero")
+    if sum(cantidad for _tipo, cantidad in parsed) > MAX_NCF_POR_LOTE:
+        raise LoteInvalido(f"El lote excede el máximo de {MAX_NCF_POR_LOTE} NCF", status=413)
+    return parsed
+
+
+def _reservar(tipo_id, cantidad):
+    """Reserva un bloque de NCF de un tipo en una sola operación del almacén"""
+    tipo_comprobante = TIPOS_POR_ID.get(tipo_id)
+    if not tipo_comprobante:
+        return {"tipo_comprobante_id": tipo_id, "success": False, "error": "Tipo de comprobante no encontrado"}
+    if not tipo_comprobante["es_fiscal"]:
+        return {"tipo_comprobante_id": tipo_id, "success": True, "es_fiscal": False, "ncfs": []}
+    try:
+        serie, codigo, primero, ultimo = STORE.reserve(tipo_id, cantidad)
+    except SecuenciaError as e:
+        return {"tipo_comprobante_id": tipo_id, "success": False, "error": str(e)}
+    return {
+        "tipo_comprobante_id": tipo_id,
+        "success": True,
+        "es_fiscal": True,
+        "ncfs": [format_ncf(serie, codigo, numero) for numero in range(primero, ultimo + 1)],
+    }
+
+
+def _validar_ncf(ncf):
+    """Valida el formato de un NCF y retorna el resultado como diccionario"""
+    ncf = (ncf or '').strip()
+    
+    if not ncf:
+        return {"valid": False, "error": "NCF es requerido"}
+    
+    if len(ncf) != 11:
+        return {"valid": False, "error": "NCF debe tener 11 caracteres"}
+    
+    if not ncf.isalnum():
+        return {"valid": False, "error": "NCF solo puede contener letras y números"}
+    
+    # Simular validación adicional
+    if ncf.startswith('B'):
+        return {"valid": True, "message": "NCF válido"}
+    return {"valid": False, "error": "NCF debe comenzar con la serie correcta"}
+
+# Página principal renderizada: {versión del catálogo: (html, etag)}
+_PAGE_CACHE = {}
+
+
+def _catalog_version():
+    """Huella del catálogo de tipos; cambia si se modifica TIPOS_COMPROBANTE"""
+    return hashlib.sha1(json.dumps(TIPOS_COMPROBANTE, sort_keys=True).encode()).hexdigest()
+
+
+def _render_index():
+    """Página principal de la versión actual del catálogo, renderizada una sola vez"""
+    version = _catalog_version()
+    page = _PAGE_CACHE.get(version)
+    if page is None:
+        html = INDEX_PAGE.render(tipos_comprobante=TIPOS_COMPROBANTE)
+        page = (html, hashlib.sha1(html.encode('utf-8')).hexdigest())
+        _PAGE_CACHE.clear()
+        _PAGE_CACHE[version] = page
+    return page
+
+
 @app.route('/')
 def index():
-    """Página principal que simula la interfaz POS con NCF"""
-    return render_template_string(INDEX_TEMPLATE, tipos_comprobante=TIPOS_COMPROBANTE)
+    """Página principal que simula la interfaz POS con NCF
+
+    Responde 304 si el navegador ya tiene la versión actual (``If-None-Match``).
+    """
+    html, etag = _render_index()
+    response = Response(html, mimetype='text/html')
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@app.route('/api/tipos_comprobante')
+def tipos_comprobante():
+    """API que simula la consulta de tipos de comprobante del POS"""
+    return jsonify({"tipos": TIPOS_COMPROBANTE})
 
 @app.route('/api/generate_ncf', methods=['POST'])
 def generate_ncf():
@@ -52,19 +180,17 @@ def generate_ncf():
             return jsonify({"success": True, "ncf": "", "es_fiscal": False})
         
         # Simular generación de NCF
-        if tipo_id in SECUENCIAS_NCF:
-            seq = SECUENCIAS_NCF[tipo_id]
-            seq["actual"] += 1
-            ncf = f"{seq['serie']}{seq['codigo']}{str(seq['actual']).zfill(8)}"
-            
-            return jsonify({
-                "success": True,
-                "ncf": ncf,
-                "es_fiscal": True,
-                "message": "NCF generado exitosamente"
-            })
-        else:
-            return jsonify({"success": False, "error": "No hay secuencia configurada para este tipo"})
+        try:
+            ncf = STORE.next_ncf(tipo_id)
+        except SecuenciaError as e:
+            return jsonify({"success": False, "error": str(e)})
+        
+        return jsonify({
+            "success": True,
+            "ncf": ncf,
+            "es_fiscal": True,
+            "message": "NCF generado exitosamente"
+        })
             
     except Exception as e:
         return jsonify({"success": False, "error": str(e)})
@@ -74,26 +200,81 @@ def validate_ncf():
     """API que simula la validación de NCF"""
     try:
         data = request.get_json()
-        ncf = data.get('ncf', '').strip()
-        
-        if not ncf:
-            return jsonify({"valid": False, "error": "NCF es requerido"})
-        
-        if len(ncf) != 11:
-            return jsonify({"valid": False, "error": "NCF debe tener 11 caracteres"})
-        
-        if not ncf.isalnum():
-            return jsonify({"valid": False, "error": "NCF solo puede contener letras y números"})
-        
-        # Simular validación adicional
-        if ncf.startswith('B'):
-            return jsonify({"valid": True, "message": "NCF válido"})
-        else:
-            return jsonify({"valid": False, "error": "NCF debe comenzar con la serie correcta"})
-            
+        return jsonify(_validar_ncf(data.get('ncf', '')))
     except Exception as e:
         return jsonify({"valid": False, "error": str(e)})
 
+@app.route('/api/generate_ncf/batch', methods=['POST'])
+def generate_ncf_batch():
+    """Reserva varios NCF de uno o más tipos en una sola llamada
+
+    Cuerpo: ``{"items": [{"tipo_comprobante_id": 1, "cantidad": 10}, ...]}``
+    """
+    items = _parse_items_generacion(request.get_json(silent=True))
+    results = [_reservar(tipo_id, cantidad) for tipo_id, cantidad in items]
+    return jsonify({"success": all(r["success"] for r in results), "results": results})
+
+@app.route('/api/generate_ncf/stream', methods=['POST'])
+def generate_ncf_stream():
+    """Igual que ``/api/generate_ncf/batch`` pero responde una línea NDJSON por NCF"""
+    items = _parse_items_generacion(request.get_json(silent=True))
+
+    def generate():
+        for tipo_id, cantidad in items:
+            result = _reservar(tipo_id, cantidad)
+            if not result["success"] or not result["es_fiscal"]:
+                yield json.dumps(result, ensure_ascii=False) + '\n'
+                continue
+            for ncf in result["ncfs"]:
+                yield json.dumps({"tipo_comprobante_id": tipo_id, "ncf": ncf}) + '\n'
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/api/validate_ncf/batch', methods=['POST'])
+def validate_ncf_batch():
+    """Valida una lista de NCF: ``{"ncfs": ["B0100000001", ...]}``"""
+    ncfs = (request.get_json(silent=True) or {}).get('ncfs')
+    if not isinstance(ncfs, list):
+        raise LoteInvalido("Se requiere una lista de NCF")
+    if len(ncfs) > MAX_VALIDACIONES_POR_LOTE:
+        raise LoteInvalido(f"El lote excede el máximo de {MAX_VALIDACIONES_POR_LOTE} NCF", status=413)
+    
+    results = []
+    validos = 0
+    for ncf in ncfs:
+        result = _validar_ncf(ncf if isinstance(ncf, str) else None)
+        result["ncf"] = ncf
+        validos += result["valid"]
+        results.append(result)
+    return jsonify({"results": results, "validos": validos, "invalidos": len(results) - validos})
+
+@app.route('/api/validate_ncf/stream', methods=['POST'])
+def validate_ncf_stream():
+    """Valida NCF leídos como NDJSON (un NCF o ``{"ncf": ...}`` por línea)
+
+    La respuesta se emite línea a línea mientras se lee el cuerpo, de modo
+    que la memoria no crece con el tamaño del lote. El cuerpo completo está
+    limitado por ``MAX_CONTENT_LENGTH``.
+    """
+    # Abrir el cuerpo aquí para que el 413 se responda antes de empezar a emitir
+    body = request.stream
+
+    def generate():
+        for line in body:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                value = json.loads(line)
+            except ValueError:
+                value = None
+            ncf = value.get('ncf') if isinstance(value, dict) else value
+            result = _validar_ncf(ncf if isinstance(ncf, str) else None)
+            result["ncf"] = ncf
+            yield json.dumps(result, ensure_ascii=False) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 # Template HTML para la demostración
 INDEX_TEMPLATE = '''
 <!DOCTYPE html>
@@ -102,8 +283,8 @@ INDEX_TEMPLATE = '''
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Demostración - Módulo POS NCF Integration para Odoo 17</title>
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet">
-    <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css" rel="stylesheet">
+    <link href="/static/vendor/bootstrap-5.3.2/css/bootstrap.min.css" rel="stylesheet">
+    <link href="/static/vendor/fontawesome-6.0.0/css/all.min.css" rel="stylesheet">
     <style>
         .pos-container { max-width: 1200px; margin: 0 auto; }
         .pos-header { background: linear-gradient(135deg, #007bff, #0056b3); color: white; }
@@ -363,7 +544,7 @@ INDEX_TEMPLATE = '''
         </div>
     </div>
 
-    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js"></script>
+    <script src="/static/vendor/bootstrap-5.3.2/js/bootstrap.min.js"></script>
     <script>
         let currentOrder = {
             tipo_comprobante_id: null,
@@ -479,5 +660,8 @@ INDEX_TEMPLATE = '''
 </html>
 '''
 
+# La plantilla se compila una sola vez al iniciar
+INDEX_PAGE = app.jinja_env.from_string(INDEX_TEMPLATE)
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Almacenes de secuencias NCF para la aplicación de demostración.
+
+``demo_app.py`` sirve como sustituto local de Odoo para las pruebas de
+integración de los clientes POS, por lo que la asignación de números debe
+ser correcta con servidores multihilo y con varios procesos:
+
+- ``MemorySequenceStore``: en memoria, protegido con un ``threading.Lock``.
+  Se pierde al reiniciar y no se comparte entre procesos.
+- ``SQLiteSequenceStore``: persistente en SQLite (modo WAL). Cada reserva es
+  un único ``UPDATE ... RETURNING``, atómico entre hilos y procesos.
+
+El almacén se elige con variables de entorno (ver ``create_store``):
+
+    NCF_DEMO_BACKEND=sqlite NCF_DEMO_DB=demo_ncf.sqlite3 python demo_app.py
+"""
+
+import os
+import sqlite3
+import threading
+
+
+class SecuenciaError(Exception):
+    """Error de asignación de NCF"""
+
+
+class SecuenciaNoConfigurada(SecuenciaError):
+    """No hay secuencia para el tipo de comprobante"""
+
+
+class SecuenciaAgotada(SecuenciaError):
+    """La secuencia no tiene suficientes números disponibles"""
+
+
+def format_ncf(serie, codigo, numero):
+    """Formatea el NCF (Serie + Código + Número con 8 dígitos)"""
+    return f"{serie}{codigo}{str(numero).zfill(8)}"
+
+
+class MemorySequenceStore:
+    """Secuencias en memoria protegidas por un candado"""
+
+    def __init__(self, secuencias):
+        self._secuencias = {tipo_id: dict(seq) for tipo_id, seq in secuencias.items()}
+        self._lock = threading.Lock()
+
+    def reserve(self, tipo_id, cantidad=1):
+        """Reserva ``cantidad`` números consecutivos y retorna ``(serie, codigo, primero, ultimo)``"""
+        with self._lock:
+            seq = self._secuencias.get(tipo_id)
+            if seq is None:
+                raise SecuenciaNoConfigurada("No hay secuencia configurada para este tipo")
+            if seq["actual"] + cantidad > seq["limite"]:
+                raise SecuenciaAgotada("La secuencia NCF está agotada")
+            primero = seq["actual"] + 1
+            seq["actual"] += cantidad
+            return seq["serie"], seq["codigo"], primero, seq["actual"]
+
+    def next_ncf(self, tipo_id):
+        """Asigna el siguiente NCF del tipo"""
+        serie, codigo, numero, _ultimo = self.reserve(tipo_id)
+        return format_ncf(serie, codigo, numero)
+
+    def snapshot(self):
+        """Estado actual de las secuencias ``{tipo_id: {...}}``"""
+        with self._lock:
+            return {tipo_id: dict(seq) for tipo_id, seq in self._secuencias.items()}
+
+    def close(self):
+        pass
+
+
+class SQLiteSequenceStore:
+    """Secuencias persistentes en SQLite compartidas entre hilos y procesos
+
+    Cada hilo usa su propia conexión en modo autocommit; la reserva es una
+    sola sentencia, así que SQLite la serializa con el candado de escritura
+    de la base de datos sin necesidad de transacciones explícitas. Los
+    valores iniciales solo se insertan si el tipo no existe todavía, de modo
+    que el contador sobrevive a los reinicios.
+    """
+
+    def __init__(self, path, secuencias, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        conn = self._connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS secuencias (
+                tipo_id INTEGER PRIMARY KEY,
+                serie TEXT NOT NULL,
+                codigo TEXT NOT NULL,
+                actual INTEGER NOT NULL,
+                limite INTEGER NOT NULL
+            )
+        """)
+        conn.executemany(
+            "INSERT OR IGNORE INTO secuencias (tipo_id, serie, codigo, actual, limite) VALUES (?, ?, ?, ?, ?)",
+            [(tipo_id, seq["serie"], seq["codigo"], seq["actual"], seq["limite"]) for tipo_id, seq in secuencias.items()]
+        )
+
+    def _connection(self):
+        """Conexión del hilo actual (``sqlite3`` no permite compartirlas entre hilos)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def reserve(self, tipo_id, cantidad=1):
+        """Reserva ``cantidad`` números consecutivos y retorna ``(serie, codigo, primero, ultimo)``"""
+        conn = self._connection()
+        row = conn.execute(
+            "UPDATE secuencias SET actual = actual + ? WHERE tipo_id = ? AND actual + ? <= limite "
+            "RETURNING serie, codigo, actual",
+            (cantidad, tipo_id, cantidad)
+        ).fetchone()
+        if row is None:
+            exists = conn.execute("SELECT 1 FROM secuencias WHERE tipo_id = ?", (tipo_id,)).fetchone()
+            if exists is None:
+                raise SecuenciaNoConfigurada("No hay secuencia configurada para este tipo")
+            raise SecuenciaAgotada("La secuencia NCF está agotada")
+        serie, codigo, ultimo = row
+        return serie, codigo, ultimo - cantidad + 1, ultimo
+
+    def next_ncf(self, tipo_id):
+        """Asigna el siguiente NCF del tipo"""
+        serie, codigo, numero, _ultimo = self.reserve(tipo_id)
+        return format_ncf(serie, codigo, numero)
+
+    def snapshot(self):
+        """Estado actual de las secuencias ``{tipo_id: {...}}``"""
+        rows = self._connection().execute(
+            "SELECT tipo_id, serie, codigo, actual, limite FROM secuencias"
+        ).fetchall()
+        return {
+            tipo_id: {"serie": serie, "codigo": codigo, "actual": actual, "limite": limite}
+            for tipo_id, serie, codigo, actual, limite in rows
+        }
+
+    def close(self):
+        """Cierra las conexiones de todos los hilos"""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+def create_store(secuencias, backend=None, path=None):
+    """Crea el almacén indicado o el configurado en el entorno
+
+    ``NCF_DEMO_BACKEND``: ``memory`` (predeterminado) o ``sqlite``.
+    ``NCF_DEMO_DB``: archivo SQLite (predeterminado ``demo_ncf.sqlite3``).
+    """
+    backend = backend or os.environ.get("NCF_DEMO_BACKEND", "memory")
+    if backend == "memory":
+        return MemorySequenceStore(secuencias)
+    if backend == "sqlite":
+        return SQLiteSequenceStore(path or os.environ.get("NCF_DEMO_DB", "demo_ncf.sqlite3"), secuencias)
+    raise ValueError(f"Backend de demostración desconocido: {backend}")
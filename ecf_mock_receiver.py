@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+Receptor local que simula los servicios de e-CF de la DGII.
+
+Permite probar sin conexión toda la cola de envío del módulo fiscal
+(autenticación con semilla firmada, recepción y consulta de estado).
+Configurar en la empresa la URL ``http://localhost:5001/`` y ejecutar:
+
+    python ecf_mock_receiver.py --port 5001
+    python ecf_mock_receiver.py --latency 0.2 --fail-rate 0.1 --reject-rate 0.05
+
+Cada e-CF recibido queda *En Proceso* durante ``--processing-polls``
+consultas y luego pasa a *Aceptado* (o *Rechazado* según ``--reject-rate``
+o si el e-NCF ya se había recibido). Con ``--fail-rate`` una fracción de
+las peticiones responde 503 para ejercitar los reintentos.
+"""
+
+import argparse
+import random
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from flask import Flask, jsonify, request, Response
+from lxml import etree
+
+app = Flask(__name__)
+
+CONFIG = {
+    'latency': 0.0,
+    'fail_rate': 0.0,
+    'reject_rate': 0.0,
+    'processing_polls': 1,
+    'token_ttl': 3600,
+}
+
+DS_NS = 'http://www.w3.org/2000/09/xmldsig#'
+
+_lock = threading.Lock()
+_semillas = set()
+_tokens = {}
+_recibidos = {}      # trackId -> datos del e-CF
+_encf_recibidos = {}  # e-NCF -> trackId
+
+
+def _simular_red():
+    """Latencia y fallas temporales configuradas; retorna una respuesta 503 o ``None``"""
+    if CONFIG['latency']:
+        time.sleep(CONFIG['latency'])
+    if CONFIG['fail_rate'] and random.random() < CONFIG['fail_rate']:
+        return jsonify({'error': 'Servicio no disponible'}), 503
+    return None
+
+
+def _xml_recibido():
+    """XML del archivo ``xml`` de la petición multipart"""
+    archivo = request.files.get('xml')
+    if archivo is None:
+        return None
+    try:
+        return etree.fromstring(archivo.read())
+    except etree.XMLSyntaxError:
+        return None
+
+
+def _autorizado():
+    token = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    with _lock:
+        expira = _tokens.get(token)
+    return expira is not None and expira > time.time()
+
+
+@app.route('/autenticacion/api/autenticacion/semilla')
+def semilla():
+    fallo = _simular_red()
+    if fallo:
+        return fallo
+    valor = uuid.uuid4().hex
+    with _lock:
+        _semillas.add(valor)
+    root = etree.Element('SemillaModel')
+    etree.SubElement(root, 'valor').text = valor
+    etree.SubElement(root, 'fecha').text = datetime.now().isoformat()
+    return Response(etree.tostring(root, xml_declaration=True, encoding='UTF-8'), mimetype='text/xml')
+
+
+@app.route('/autenticacion/api/autenticacion/validarsemilla', methods=['POST'])
+def validar_semilla():
+    fallo = _simular_red()
+    if fallo:
+        return fallo
+    root = _xml_recibido()
+    if root is None or root.find('{%s}Signature' % DS_NS) is None:
+        return jsonify({'error': 'Semilla sin firma'}), 400
+    valor = root.findtext('valor')
+    with _lock:
+        if valor not in _semillas:
+            return jsonify({'error': 'Semilla desconocida o ya utilizada'}), 400
+        _semillas.discard(valor)
+        token = uuid.uuid4().hex
+        _tokens[token] = time.time() + CONFIG['token_ttl']
+    return jsonify({'token': token, 'expiraEn': CONFIG['token_ttl'], 'expedido': datetime.now().isoformat()})
+
+
+@app.route('/recepcion/api/facturaselectronicas', methods=['POST'])
+def recepcion():
+    fallo = _simular_red()
+    if fallo:
+        return fallo
+    if not _autorizado():
+        return jsonify({'error': 'Token inválido'}), 401
+    root = _xml_recibido()
+    if root is None:
+        return jsonify({'error': 'XML inválido'}), 400
+    encf = root.findtext('Encabezado/IdDoc/eNCF')
+    if not encf:
+        return jsonify({'error': 'El documento no tiene eNCF'}), 400
+
+    track_id = str(uuid.uuid4())
+    with _lock:
+        duplicado = encf in _encf_recibidos
+        _encf_recibidos.setdefault(encf, track_id)
+        _recibidos[track_id] = {
+            'encf': encf,
+            'rnc': root.findtext('Encabezado/Emisor/RNCEmisor'),
+            'firmado': root.find('{%s}Signature' % DS_NS) is not None,
+            'duplicado': duplicado,
+            'consultas': 0,
+            'fecha': datetime.now().isoformat(),
+        }
+    return jsonify({'trackId': track_id, 'error': None, 'mensaje': None})
+
+
+@app.route('/consultaresultado/api/consultas/estado')
+def estado():
+    fallo = _simular_red()
+    if fallo:
+        return fallo
+    if not _autorizado():
+        return jsonify({'error': 'Token inválido'}), 401
+    track_id = request.args.get('trackid', '')
+    with _lock:
+        doc = _recibidos.get(track_id)
+        if doc is None:
+            return jsonify({'error': 'TrackId no encontrado'}), 404
+        doc['consultas'] += 1
+        if 'estado' not in doc and doc['consultas'] > CONFIG['processing_polls']:
+            mensajes = []
+            if doc['duplicado']:
+                mensajes.append({'valor': 'e-NCF ya fue recibido', 'codigo': 2})
+            if not doc['firmado']:
+                mensajes.append({'valor': 'El documento no está firmado', 'codigo': 3})
+            if not mensajes and random.random() < CONFIG['reject_rate']:
+                mensajes.append({'valor': 'Rechazo simulado', 'codigo': 99})
+            doc['estado'] = 'Rechazado' if mensajes else 'Aceptado'
+            doc['mensajes'] = mensajes
+        return jsonify({
+            'trackId': track_id,
+            'codigo': {'Aceptado': 1, 'Rechazado': 2}.get(doc.get('estado'), 3),
+            'estado': doc.get('estado', 'En Proceso'),
+            'rnc': doc['rnc'],
+            'encf': doc['encf'],
+            'secuenciaUtilizada': doc.get('estado') == 'Aceptado',
+            'fechaRecepcion': doc['fecha'],
+            'mensajes': doc.get('mensajes', []),
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--latency', type=float, default=0.0, help='Segundos de espera por petición')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Fracción de respuestas 503')
+    parser.add_argument('--reject-rate', type=float, default=0.0, help='Fracción de e-CF rechazados')
+    parser.add_argument('--processing-polls', type=int, default=1,
+                        help='Consultas que responden "En Proceso" antes del resultado')
+    args = parser.parse_args()
+    CONFIG.update(latency=args.latency, fail_rate=args.fail_rate,
+                  reject_rate=args.reject_rate, processing_polls=args.processing_polls)
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
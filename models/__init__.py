@@ -1,2 +1,4 @@
 # -*- coding: utf-8 -*-
+from . import ncf_sequence
 from . import pos_order
+from . import res_partner
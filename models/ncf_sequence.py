@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, _
+from odoo.exceptions import ValidationError
+
+
+class NCFSequence(models.Model):
+    _inherit = 'ncf.sequence'
+
+    pos_config_id = fields.Many2one(
+        'pos.config',
+        string='Terminal POS',
+        index=True,
+        help='Terminal al que está reservado este rango. Si está vacío, el rango '
+             'es de uso general de la empresa y sirve de respaldo a los terminales.'
+    )
+    parent_id = fields.Many2one(
+        'ncf.sequence',
+        string='Rango Autorizado',
+        readonly=True,
+        ondelete='restrict',
+        help='Secuencia de la que se tomó este sub-rango'
+    )
+
+    @api.model
+    def _get_active_sequence_domain(self, tipo_comprobante_ids, company_id):
+        """Restringe la búsqueda a los rangos del terminal en contexto
+
+        Sin ``ncf_pos_config_id`` en el contexto solo se consideran los rangos
+        generales de la empresa, de modo que facturas y otros terminales nunca
+        consumen un rango reservado.
+        """
+        domain = super()._get_active_sequence_domain(tipo_comprobante_ids, company_id)
+        return domain + [('pos_config_id', '=', self.env.context.get('ncf_pos_config_id') or False)]
+
+    @api.model
+    def get_active_sequence_for_type(self, tipo_comprobante_id, company_id=None):
+        """Prefiere el rango del terminal; si no hay, usa el de la empresa"""
+        if self.env.context.get('ncf_pos_config_id'):
+            sequence = self.get_active_sequences_for_types(
+                [tipo_comprobante_id], company_id
+            ).get(tipo_comprobante_id)
+            if sequence:
+                return sequence
+        return super(NCFSequence, self.with_context(ncf_pos_config_id=False)).get_active_sequence_for_type(
+            tipo_comprobante_id, company_id
+        )
+
+    @api.model
+    def get_active_sequences_for_types(self, tipo_comprobante_ids, company_id=None):
+        """Igual que el método base, completando con rangos de la empresa"""
+        result = super().get_active_sequences_for_types(tipo_comprobante_ids, company_id)
+        if self.env.context.get('ncf_pos_config_id'):
+            missing = [tipo_id for tipo_id in tipo_comprobante_ids if tipo_id not in result]
+            if missing:
+                result.update(
+                    super(NCFSequence, self.with_context(ncf_pos_config_id=False)).get_active_sequences_for_types(
+                        missing, company_id
+                    )
+                )
+        return result
+
+    def _get_used_numbers(self, desde, hasta):
+        """Incluye los NCF asignados a órdenes del POS"""
+        usados = super()._get_used_numbers(desde, hasta)
+        orders = self.env['pos.order'].search_read([
+            ('company_id', '=', self.company_id.id),
+            ('ncf', '>=', self._format_ncf(desde)),
+            ('ncf', '<=', self._format_ncf(hasta)),
+        ], ['ncf'])
+        digits = self._ncf_digits()
+        return usados | {int(order['ncf'][-digits:]) for order in orders}
+
+    @api.constrains('pos_config_id', 'company_id')
+    def _check_pos_config_company(self):
+        """El terminal debe pertenecer a la empresa de la secuencia"""
+        for record in self:
+            if record.pos_config_id and record.pos_config_id.company_id != record.company_id:
+                raise ValidationError(
+                    _('El terminal %s no pertenece a la empresa %s') %
+                    (record.pos_config_id.name, record.company_id.name)
+                )
+
+    def split_for_pos_configs(self, pos_configs, cantidad):
+        """Reserva ``cantidad`` números del final del rango para cada terminal
+
+        Los sub-rangos se toman del extremo superior, así el contador del
+        rango original no se ve afectado y cada número sigue perteneciendo a
+        una sola secuencia.
+        """
+        self.ensure_one()
+        if self.pos_config_id:
+            raise ValidationError(
+                _('La secuencia "%s" ya está reservada a un terminal') % self.display_name
+            )
+        if cantidad < 2:
+            raise ValidationError(_('Cada sub-rango debe tener al menos 2 números'))
+        
+        # Bloquea el contador antes de leer el valor actual: una asignación
+        # concurrente espera a que el rango quede reducido
+        self.env.cr.execute(
+            'SELECT valor FROM ncf_sequence_counter WHERE sequence_id = %s FOR UPDATE',
+            (self.id,)
+        )
+        actual = self.get_live_status()[self.id]['secuencia_actual']
+        ultimo_usado = max(actual, self.secuencia_desde - 1)
+        requeridos = cantidad * len(pos_configs)
+        if self.secuencia_hasta - ultimo_usado - requeridos < 1:
+            raise ValidationError(
+                _('La secuencia "%s" no tiene %d números disponibles para repartir') %
+                (self.display_name, requeridos)
+            )
+        
+        hasta = self.secuencia_hasta
+        vals_list = []
+        for config in pos_configs:
+            vals_list.append({
+                'name': f'{self.name} - {config.name}',
+                'company_id': self.company_id.id,
+                'tipo_comprobante_id': self.tipo_comprobante_id.id,
+                'serie': self.serie,
+                'secuencia_desde': hasta - cantidad + 1,
+                'secuencia_hasta': hasta,
+                'fecha_inicio': self.fecha_inicio,
+                'fecha_fin': self.fecha_fin,
+                'limite_alerta_stock': self.limite_alerta_stock,
+                'dias_alerta_vencimiento': self.dias_alerta_vencimiento,
+                'implementacion': self.implementacion,
+                'reutilizar_huecos': self.reutilizar_huecos,
+                'pos_config_id': config.id,
+                'parent_id': self.id,
+            })
+            hasta -= cantidad
+        
+        # Con implementación PostgreSQL la escritura también baja el MAXVALUE
+        # de la secuencia nativa, en esta misma transacción
+        self.secuencia_hasta = hasta
+        self.flush_recordset(['secuencia_hasta'])
+        if self.implementacion == 'postgresql':
+            # Un nextval anterior al ALTER SEQUENCE pudo pasar el nuevo límite
+            if self._get_counter_values().get(self.id, actual) > hasta:
+                raise ValidationError(
+                    _('La secuencia "%s" avanzó mientras se reservaban los sub-rangos; intente de nuevo') %
+                    self.display_name
+                )
+        else:
+            # Nueva versión de la fila del contador: una asignación que leyó
+            # el límite anterior falla por serialización y se reintenta
+            self.env.cr.execute(
+                'UPDATE ncf_sequence_counter SET valor = valor WHERE sequence_id = %s',
+                (self.id,)
+            )
+        return self.create(vals_list)
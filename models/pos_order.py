@@ -1,13 +1,17 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError, UserError
+from odoo.osv import expression
+from odoo.tools.sql import create_index
+from odoo.addons.odoo_ncf_module.tools import ecf, metrics
 import logging
 
 _logger = logging.getLogger(__name__)
 
 
 class PosOrder(models.Model):
-    _inherit = 'pos.order'
+    _inherit = ['pos.order', 'ecf.document.mixin']
+    _name = 'pos.order'
 
     tipo_comprobante_id = fields.Many2one(
         'tipo.comprobante',
@@ -16,7 +20,7 @@ class PosOrder(models.Model):
     )
     ncf = fields.Char(
         string='NCF', 
-        size=11,
+        size=13,
         help='Número de Comprobante Fiscal generado'
     )
     es_fiscal = fields.Boolean(
@@ -31,6 +35,14 @@ class PosOrder(models.Model):
         help='Indica si el NCF fue generado automáticamente'
     )
 
+    def init(self):
+        """Índice por empresa para la validación de unicidad del NCF"""
+        super().init()
+        create_index(
+            self._cr, 'pos_order_company_ncf_idx', self._table,
+            ['company_id', 'ncf'], where='ncf IS NOT NULL'
+        )
+
     @api.depends('tipo_comprobante_id')
     def _compute_es_fiscal(self):
         """Computa si la orden es fiscal basado en el tipo de comprobante"""
@@ -62,9 +74,9 @@ class PosOrder(models.Model):
         """Valida el formato del NCF"""
         for order in self:
             if order.ncf:
-                if len(order.ncf) != 11:
+                if len(order.ncf) != (13 if ecf.is_ecf(order.ncf) else 11):
                     raise ValidationError(
-                        _('El NCF debe tener exactamente 11 caracteres')
+                        _('El NCF debe tener exactamente 11 caracteres (13 en e-CF)')
                     )
                 if not order.ncf.isalnum():
                     raise ValidationError(
@@ -80,7 +92,7 @@ class PosOrder(models.Model):
                     ('ncf', '=', order.ncf),
                     ('company_id', '=', order.company_id.id),
                     ('id', '!=', order.id)
-                ])
+                ], limit=1)
                 if existing:
                     raise ValidationError(
                         _('El NCF %s ya está asignado a la orden %s') % (order.ncf, existing[0].name)
@@ -91,34 +103,46 @@ class PosOrder(models.Model):
         for order in self:
             if order.tipo_comprobante_id and order.tipo_comprobante_id.es_fiscal:
                 if order.ncf:
-                    _logger.info(f'La orden {order.name} ya tiene NCF asignado: {order.ncf}')
+                    _logger.info('La orden %s ya tiene NCF asignado: %s', order.name, order.ncf)
                     continue
                 
                 try:
-                    seq = self.env['ncf.sequence'].get_active_sequence_for_type(
+                    seq = order._get_ncf_sequence_model().get_active_sequence_for_type(
                         order.tipo_comprobante_id.id,
                         order.company_id.id
                     )
-                    ncf_val = seq.get_next_ncf()
+                    ncf_val = seq.get_next_ncf(document=order)
                     order.write({
                         'ncf': ncf_val,
                         'ncf_generado_automaticamente': True
                     })
-                    order.message_post(
-                        body=_('NCF asignado automáticamente: %s') % ncf_val,
-                        message_type='notification'
-                    )
-                    _logger.info(f'NCF {ncf_val} asignado a la orden {order.name}')
+                    # La asignación ya quedó en la bitácora fiscal
+                    if order.company_id.ncf_chatter_pos:
+                        order.message_post(
+                            body=_('NCF asignado automáticamente: %s') % ncf_val,
+                            message_type='notification'
+                        )
+                    _logger.info('NCF %s asignado a la orden %s', ncf_val, order.name)
                     
                 except Exception as e:
-                    _logger.error(f'Error al generar NCF para orden {order.name}: {str(e)}')
+                    _logger.error('Error al generar NCF para orden %s: %s', order.name, e)
                     raise UserError(
                         _('Error al generar NCF para la orden %s: %s') % (order.name, str(e))
                     )
 
+    def _get_ncf_sequence_model(self):
+        """Modelo de secuencias con el terminal de la orden en contexto"""
+        self.ensure_one()
+        return self.env['ncf.sequence'].with_context(ncf_pos_config_id=self.config_id.id)
+
     @api.model
-    def generate_ncf_for_pos(self, tipo_comprobante_id):
-        """Método llamado desde JavaScript para generar NCF"""
+    @metrics.timed('ncf_pos_generate_seconds')
+    def generate_ncf_for_pos(self, tipo_comprobante_id, config_id=None):
+        """Método llamado desde JavaScript para generar NCF
+
+        Con ``config_id`` el NCF se toma del rango reservado al terminal y,
+        si no tiene uno vigente, del rango general de su empresa.
+        """
         try:
             if not tipo_comprobante_id:
                 raise ValidationError(_('Debe seleccionar un tipo de comprobante'))
@@ -136,18 +160,15 @@ class PosOrder(models.Model):
                 }
             
             # Usar el método del módulo odoo_ncf_module para obtener secuencia activa
-            seq = self.env['ncf.sequence'].get_active_sequence_for_type(
+            company = self._get_pos_ncf_company(config_id)
+            seq = self.env['ncf.sequence'].with_context(ncf_pos_config_id=config_id).get_active_sequence_for_type(
                 tipo_comprobante_id,
-                self.env.company.id
+                company.id
             )
             
-            # Verificar que la secuencia tenga NCF disponibles
-            if seq.agotada:
-                raise ValidationError(_('La secuencia NCF está agotada'))
-            if seq.vencida:
-                raise ValidationError(_('La secuencia NCF está vencida'))
-            
+            # La asignación valida vigencia y disponibilidad contra el contador
             ncf_val = seq.get_next_ncf()
+            status = seq.get_live_status()[seq.id]
             
             return {
                 'ncf': ncf_val,
@@ -156,14 +177,17 @@ class PosOrder(models.Model):
                 'message': _('NCF generado exitosamente'),
                 'sequence_info': {
                     'serie': seq.serie,
-                    'disponibles': seq.disponibles,
-                    'alerta_stock_bajo': seq.alerta_stock_bajo,
+                    'disponibles': status['disponibles'],
+                    'alerta_stock_bajo': status['alerta_stock_bajo'],
                     'alerta_vencimiento': seq.alerta_vencimiento
                 }
             }
             
-        except Exception as e:
-            _logger.error(f'Error en generate_ncf_for_pos: {str(e)}')
+        except (UserError, ValidationError) as e:
+            # Los errores de serialización y demás OperationalError se
+            # propagan para que Odoo reintente la petición completa
+            _logger.error('Error en generate_ncf_for_pos: %s', e)
+            metrics.incr('ncf_pos_generate_failures_total')
             return {
                 'ncf': '',
                 'es_fiscal': False,
@@ -172,31 +196,20 @@ class PosOrder(models.Model):
             }
 
     @api.model
-    def get_tipos_comprobante_for_pos(self):
-        """Método para obtener tipos de comprobante para POS"""
+    def get_tipos_comprobante_for_pos(self, config_id=None, offset=0, limit=None):
+        """Método para obtener tipos de comprobante para POS (paginado)"""
         try:
             tipos = self.env['tipo.comprobante'].search([
                 ('para_venta', '=', True),
                 ('activo', '=', True)
-            ])
+            ], offset=offset, limit=limit)
+            
+            sequence_info = self.get_ncf_sequence_info_for_pos(
+                tipos.filtered('es_fiscal').ids, config_id
+            )
             
             result = []
             for tipo in tipos:
-                # Obtener información de secuencia si es fiscal
-                sequence_info = None
-                if tipo.es_fiscal:
-                    try:
-                        seq = self.env['ncf.sequence'].get_active_sequence_for_type(
-                            tipo.id, self.env.company.id
-                        )
-                        sequence_info = {
-                            'disponibles': seq.disponibles,
-                            'serie': seq.serie,
-                            'estado': seq.estado,
-                        }
-                    except:
-                        sequence_info = {'disponibles': 0, 'estado': 'sin_secuencia'}
-                
                 result.append({
                     'id': tipo.id,
                     'name': tipo.name,
@@ -205,14 +218,51 @@ class PosOrder(models.Model):
                     'para_venta': tipo.para_venta,
                     'requiere_rnc': tipo.requiere_rnc,
                     'activo': tipo.activo,
-                    'sequence_info': sequence_info
+                    'sequence_info': sequence_info.get(tipo.id) if tipo.es_fiscal else None
                 })
             
             return result
         except Exception as e:
-            _logger.error(f'Error en get_tipos_comprobante_for_pos: {str(e)}')
+            _logger.error('Error en get_tipos_comprobante_for_pos: %s', e)
             return []
 
+    @api.model
+    def get_ncf_sequence_info_for_pos(self, tipo_comprobante_ids, config_id=None):
+        """Información de disponibilidad de secuencias, consultada bajo demanda
+
+        El POS no recibe los contadores al cargar la sesión (quedarían
+        desactualizados de inmediato); el popup NCF los pide con este método
+        solo para los tipos que el cajero selecciona.
+        """
+        company = self._get_pos_ncf_company(config_id)
+        sequences = self.env['ncf.sequence'].with_context(
+            ncf_pos_config_id=config_id
+        ).get_active_sequences_for_types(tipo_comprobante_ids, company.id)
+        
+        live = self.env['ncf.sequence'].union(*sequences.values()).get_live_status()
+        
+        result = {}
+        for tipo_id in tipo_comprobante_ids:
+            seq = sequences.get(tipo_id)
+            if seq:
+                result[tipo_id] = {
+                    'disponibles': live[seq.id]['disponibles'],
+                    'serie': seq.serie,
+                    'estado': seq.estado,
+                    'alerta_stock_bajo': live[seq.id]['alerta_stock_bajo'],
+                    'alerta_vencimiento': seq.alerta_vencimiento,
+                }
+            else:
+                result[tipo_id] = {'disponibles': 0, 'estado': 'sin_secuencia'}
+        return result
+
+    @api.model
+    def _get_pos_ncf_company(self, config_id=None):
+        """Empresa fiscal del terminal; la del entorno si no se indica terminal"""
+        if config_id:
+            return self.env['pos.config'].browse(config_id).company_id
+        return self.env.company
+
     @api.model
     def _load_pos_data_fields(self, config_id):
         """Agrega campos NCF a los datos del POS"""
@@ -222,17 +272,34 @@ class PosOrder(models.Model):
 
     @api.model
     def _load_pos_data_models(self, config_id):
-        """Agrega modelos NCF a los datos del POS"""
+        """Agrega modelos NCF a los datos del POS
+
+        Solo se cargan las secuencias vigentes que aplican al terminal (las
+        reservadas a él y las generales de su empresa) y con los campos
+        mínimos para identificarlas; la disponibilidad se obtiene bajo demanda
+        con ``get_ncf_sequence_info_for_pos``.
+        """
         models = super()._load_pos_data_models(config_id)
+        company = self._get_pos_ncf_company(config_id)
+        tipos_domain = [('para_venta', '=', True), ('activo', '=', True)]
+        tipo_ids = self.env['tipo.comprobante'].search(tipos_domain).filtered('es_fiscal').ids
+        sequence_model = self.env['ncf.sequence']
         # Cargar tipos de comprobante para el POS
         models.update({
             'tipo.comprobante': {
-                'domain': [('para_venta', '=', True), ('activo', '=', True)],
-                'fields': ['name', 'codigo', 'es_fiscal', 'para_venta', 'requiere_rnc', 'activo'],
+                'domain': tipos_domain,
+                'fields': ['name', 'codigo', 'es_fiscal', 'requiere_rnc'],
             },
             'ncf.sequence': {
-                'domain': [('activa', '=', True), ('company_id', '=', self.env.company.id)],
-                'fields': ['name', 'tipo_comprobante_id', 'serie', 'secuencia_actual', 'secuencia_hasta', 'disponibles'],
+                'domain': expression.OR([
+                    sequence_model.with_context(ncf_pos_config_id=config_id)._get_active_sequence_domain(
+                        tipo_ids, company.id
+                    ),
+                    sequence_model.with_context(ncf_pos_config_id=False)._get_active_sequence_domain(
+                        tipo_ids, company.id
+                    ),
+                ]),
+                'fields': ['tipo_comprobante_id', 'serie', 'fecha_fin', 'pos_config_id'],
             }
         })
         return models
@@ -268,6 +335,69 @@ class PosOrder(models.Model):
         })
         return fields
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Encola el e-CF de las órdenes creadas con NCF electrónico"""
+        orders = super().create(vals_list)
+        orders._mark_ecf_pending()
+        return orders
+
+    def _generate_ecf(self):
+        """Las órdenes facturadas emiten el e-CF desde su factura"""
+        invoiced = self.filtered('account_move')
+        invoiced.write({'ecf_estado': False})
+        return super(PosOrder, self - invoiced)._generate_ecf()
+
+    def _prepare_ecf_data(self):
+        """Datos de las órdenes para el XML e-CF"""
+        sequences = self.env['ncf.sequence'].search([
+            ('company_id', 'in', self.company_id.ids),
+            ('serie', '=', 'E'),
+            ('tipo_comprobante_id', 'in', self.tipo_comprobante_id.ids),
+        ])
+        result = []
+        for order in self:
+            numero = int(order.ncf[3:])
+            sequence = sequences.filtered(
+                lambda s: s.company_id == order.company_id
+                and s.tipo_comprobante_id == order.tipo_comprobante_id
+                and s.secuencia_desde <= numero <= s.secuencia_hasta
+            )[:1]
+            items = []
+            monto_gravado = monto_exento = 0.0
+            for numero_linea, line in enumerate(order.lines, 1):
+                gravado = bool(line.tax_ids_after_fiscal_position)
+                if gravado:
+                    monto_gravado += line.price_subtotal
+                else:
+                    monto_exento += line.price_subtotal
+                items.append({
+                    'numero_linea': numero_linea,
+                    'indicador_facturacion': 1 if gravado else 4,
+                    'nombre_item': (line.full_product_name or line.product_id.name or '')[:80],
+                    'indicador_bien_servicio': 2 if line.product_id.type == 'service' else 1,
+                    'cantidad_item': line.qty,
+                    'precio_unitario_item': line.price_unit,
+                    'monto_item': line.price_subtotal,
+                })
+            rnc_comprador = order.partner_id.rnc or order.partner_id.vat
+            result.append({
+                'tipo_ecf': order.ncf[1:3],
+                'encf': order.ncf,
+                'fecha_vencimiento_secuencia': sequence.fecha_fin,
+                'tipo_ingresos': '01',
+                'tipo_pago': 1,
+                'fecha_emision': order.date_order.date(),
+                'rnc_comprador': rnc_comprador,
+                'razon_social_comprador': order.partner_id.name if rnc_comprador else None,
+                'monto_gravado_total': monto_gravado,
+                'monto_exento': monto_exento,
+                'total_itbis': order.amount_tax,
+                'monto_total': order.amount_total,
+                'items': items,
+            })
+        return result
+
     def write(self, vals):
         """Override write para validaciones adicionales"""
         # Auto-asignar NCF si se cambia a un tipo fiscal
@@ -278,12 +408,15 @@ class PosOrder(models.Model):
                     if tipo.es_fiscal and not order.ncf and 'ncf' not in vals:
                         # Auto-generar NCF si no se especifica uno
                         try:
-                            seq = self.env['ncf.sequence'].get_active_sequence_for_type(
+                            seq = order._get_ncf_sequence_model().get_active_sequence_for_type(
                                 tipo.id, order.company_id.id
                             )
-                            vals['ncf'] = seq.get_next_ncf()
+                            vals['ncf'] = seq.get_next_ncf(document=order)
                             vals['ncf_generado_automaticamente'] = True
                         except Exception as e:
-                            _logger.warning(f'No se pudo auto-generar NCF: {str(e)}')
+                            _logger.warning('No se pudo auto-generar NCF: %s', e)
         
-        return super().write(vals)
+        res = super().write(vals)
+        if vals.get('ncf'):
+            self._mark_ecf_pending()
+        return res
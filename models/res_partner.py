@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+from odoo import models, api
+
+
+class ResPartner(models.Model):
+    _inherit = 'res.partner'
+
+    @api.model
+    def _load_pos_data_fields(self, config_id):
+        """Envía al POS el perfil fiscal de los clientes
+
+        Con el comprobante por defecto precalculado el POS preselecciona el
+        tipo de las órdenes de clientes conocidos sin consultar al servidor.
+        """
+        fields = super()._load_pos_data_fields(config_id)
+        fields.extend(['rnc', 'tipo_rnc', 'tipo_comprobante_defecto_id'])
+        return fields
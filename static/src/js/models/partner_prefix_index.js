@@ -0,0 +1,250 @@
+/** @odoo-module */
+
+// Índice de prefijos de clientes para la búsqueda del POS.
+//
+// Guarda las claves de cada cliente en un arreglo ordenado: los dígitos del
+// RNC/cédula (sin guiones) y cada palabra del nombre normalizada (minúsculas,
+// sin acentos). Cada entrada es la cadena "clave\u0001id"; dentro de una
+// misma clave el orden de los ids no importa. Una búsqueda por prefijo es
+// una búsqueda binaria más un recorrido de las claves que comparten el
+// prefijo, así que no depende de la cantidad de clientes cargados.
+
+// Las claves nuevas se acumulan y se incorporan en la siguiente búsqueda:
+// hasta este tamaño (clientes creados o sincronizados) se insertan en su
+// posición; las cargas mayores se ordenan y se mezclan en una sola pasada.
+const BULK_THRESHOLD = 256;
+const SEPARATOR = "\u0001";
+
+// Las claves solo tienen [0-9a-z]: los primeros PREFIX_CHARS caracteres se
+// codifican en base 37 (0 = fin de clave) conservando el orden de las
+// cadenas, y junto con la posición de la entrada forman un número que se
+// ordena con el sort numérico nativo de Float64Array.
+const PREFIX_CHARS = 6;
+const POSITION_SPAN = 2 ** 21;
+
+function charCode37(entry, i) {
+    const c = entry.charCodeAt(i);
+    if (c >= 48 && c <= 57) {
+        return c - 47;
+    }
+    if (c >= 97 && c <= 122) {
+        return c - 86;
+    }
+    return 0;
+}
+
+function prefixCode(entry) {
+    let code = 0;
+    let ended = false;
+    for (let i = 0; i < PREFIX_CHARS; i++) {
+        ended = ended || entry[i] === SEPARATOR || i >= entry.length;
+        code = code * 37 + (ended ? 0 : charCode37(entry, i));
+    }
+    return code;
+}
+
+// Mezcla dos arreglos ordenados de entradas
+function mergeEntries(a, b) {
+    const merged = new Array(a.length + b.length);
+    let i = 0;
+    let j = 0;
+    let k = 0;
+    while (i < a.length && j < b.length) {
+        merged[k++] = a[i] <= b[j] ? a[i++] : b[j++];
+    }
+    while (i < a.length) {
+        merged[k++] = a[i++];
+    }
+    while (j < b.length) {
+        merged[k++] = b[j++];
+    }
+    return merged;
+}
+
+function sameKey(entries, start, end) {
+    const key = entries[start].slice(0, entries[start].indexOf(SEPARATOR) + 1);
+    for (let i = start + 1; i < end; i++) {
+        if (!entries[i].startsWith(key)) {
+            return false;
+        }
+    }
+    return true;
+}
+
+// Ordena las entradas por clave mucho más rápido que Array#sort con cadenas;
+// solo los grupos que comparten los primeros caracteres de claves más largas
+// se desempatan comparando cadenas.
+export function sortEntries(entries) {
+    if (entries.length >= POSITION_SPAN) {
+        return entries.sort();
+    }
+    const codes = new Float64Array(entries.length);
+    for (let i = 0; i < entries.length; i++) {
+        codes[i] = prefixCode(entries[i]) * POSITION_SPAN + i;
+    }
+    codes.sort();
+    const sorted = new Array(entries.length);
+    for (let i = 0; i < codes.length; i++) {
+        sorted[i] = entries[codes[i] % POSITION_SPAN];
+    }
+    let start = 0;
+    let startCode = Math.floor(codes[0] / POSITION_SPAN);
+    for (let i = 1; i <= sorted.length; i++) {
+        const code = i < sorted.length ? Math.floor(codes[i] / POSITION_SPAN) : -1;
+        if (code === startCode) {
+            continue;
+        }
+        // Claves de menos de PREFIX_CHARS caracteres ya están completas en el
+        // código, y un grupo de una sola clave no necesita desempate
+        if (i - start > 1 && sorted[start].indexOf(SEPARATOR) >= PREFIX_CHARS
+                && !sameKey(sorted, start, i)) {
+            const group = sorted.slice(start, i).sort();
+            for (let j = 0; j < group.length; j++) {
+                sorted[start + j] = group[j];
+            }
+        }
+        start = i;
+        startCode = code;
+    }
+    return sorted;
+}
+
+export function normalizeDigits(value) {
+    return (value || "").replace(/\D/g, "");
+}
+
+export function normalizeText(value) {
+    return (value || "")
+        .normalize("NFD")
+        .replace(/[\u0300-\u036f]/g, "")
+        .toLowerCase();
+}
+
+function tokenize(value) {
+    return normalizeText(value).split(/[^a-z0-9]+/).filter(Boolean);
+}
+
+export class PartnerPrefixIndex {
+    constructor() {
+        this.entries = [];
+        this.pending = [];
+        this.keysById = new Map();
+    }
+
+    get size() {
+        return this.keysById.size;
+    }
+
+    // Primera posición cuya entrada es >= value
+    _lowerBound(value) {
+        let lo = 0;
+        let hi = this.entries.length;
+        while (lo < hi) {
+            const mid = (lo + hi) >>> 1;
+            if (this.entries[mid] < value) {
+                lo = mid + 1;
+            } else {
+                hi = mid;
+            }
+        }
+        return lo;
+    }
+
+    _keysFor(partner) {
+        const keys = new Set(tokenize(partner.name));
+        const digits = normalizeDigits(partner.rnc || partner.vat);
+        if (digits) {
+            keys.add(digits);
+        }
+        return [...keys];
+    }
+
+    _remove(id) {
+        this._flush();
+        for (const key of this.keysById.get(id) || []) {
+            const entry = key + SEPARATOR + id;
+            const [start, end] = this._range(key + SEPARATOR);
+            const i = this.entries.indexOf(entry, start);
+            if (i !== -1 && i < end) {
+                this.entries.splice(i, 1);
+            }
+        }
+        this.keysById.delete(id);
+    }
+
+    // Agrega o actualiza clientes (reemplaza las claves anteriores del mismo id)
+    add(partners) {
+        for (const partner of partners) {
+            if (this.keysById.has(partner.id)) {
+                this._remove(partner.id);
+            }
+            const keys = this._keysFor(partner);
+            this.keysById.set(partner.id, keys);
+            for (const key of keys) {
+                this.pending.push(key + SEPARATOR + partner.id);
+            }
+        }
+    }
+
+    // Incorpora al arreglo ordenado las claves agregadas desde la última búsqueda
+    _flush() {
+        const pending = this.pending;
+        if (!pending.length) {
+            return;
+        }
+        this.pending = [];
+        if (pending.length <= BULK_THRESHOLD) {
+            for (const entry of pending) {
+                const key = entry.slice(0, entry.indexOf(SEPARATOR) + 1);
+                this.entries.splice(this._lowerBound(key), 0, entry);
+            }
+        } else if (!this.entries.length) {
+            this.entries = sortEntries(pending);
+        } else {
+            this.entries = mergeEntries(this.entries, sortEntries(pending));
+        }
+    }
+
+    // Rango [inicio, fin) de las entradas cuya clave empieza por prefix
+    _range(prefix) {
+        return [this._lowerBound(prefix), this._lowerBound(prefix + "\uffff")];
+    }
+
+    // Ids (sin repetir) de las entradas del rango que cumplen accept
+    _idsInRange([start, end], limit, accept = null) {
+        const ids = new Set();
+        for (let i = start; i < end && ids.size < limit; i++) {
+            const entry = this.entries[i];
+            const id = Number(entry.slice(entry.lastIndexOf(SEPARATOR) + 1));
+            if (!accept || accept(id)) {
+                ids.add(id);
+            }
+        }
+        return [...ids];
+    }
+
+    // Ids de clientes cuyo RNC empieza por los dígitos de la consulta, o cuyo
+    // nombre tiene palabras que empiezan por cada palabra de la consulta.
+    // Retorna null si la consulta no se puede resolver con el índice.
+    search(query, limit = 100) {
+        this._flush();
+        const text = (query || "").trim();
+        if (/^[\d\s-]+$/.test(text)) {
+            const digits = normalizeDigits(text);
+            return digits ? this._idsInRange(this._range(digits), limit) : null;
+        }
+        const tokens = tokenize(text);
+        if (!tokens.length) {
+            return null;
+        }
+        // Se recorre la palabra con menos coincidencias; las demás se
+        // comprueban contra las claves guardadas del cliente.
+        const ranges = tokens.map((token) => this._range(token));
+        const best = ranges.reduce((a, b) => (b[1] - b[0] < a[1] - a[0] ? b : a));
+        const rest = tokens.filter((_token, i) => ranges[i] !== best);
+        return this._idsInRange(best, limit, (id) => {
+            const keys = this.keysById.get(id);
+            return rest.every((token) => keys.some((key) => key.startsWith(token)));
+        });
+    }
+}
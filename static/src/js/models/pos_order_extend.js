@@ -33,13 +33,28 @@ patch(Order.prototype, {
         if (tipo_comprobante) {
             this.es_fiscal = tipo_comprobante.es_fiscal;
             if (this.es_fiscal && !this.ncf) {
-                // Auto-generate NCF if fiscal
-                this.generate_ncf();
+                // Auto-generate NCF if fiscal; callers may await the assignment
+                return this.generate_ncf();
             }
         } else {
             this.es_fiscal = false;
             this.ncf = null;
         }
+        return Promise.resolve();
+    },
+
+    // Tipo de comprobante por defecto del cliente (precalculado en el servidor
+    // y cargado con los datos del cliente); null si no hay cliente o el tipo
+    // no está disponible en este terminal.
+    get_default_tipo_comprobante() {
+        const partner = this.get_partner();
+        const value = partner && partner.tipo_comprobante_defecto_id;
+        const tipo_id = Array.isArray(value) ? value[0] : value;
+        if (!tipo_id) {
+            return null;
+        }
+        const tipos_comprobante = this.pos.models['tipo.comprobante'] || [];
+        return tipos_comprobante.find(t => t.id === tipo_id) || null;
     },
 
     get_tipo_comprobante() {
@@ -72,7 +87,7 @@ patch(Order.prototype, {
             const result = await this.env.services.rpc({
                 model: 'pos.order',
                 method: 'generate_ncf_for_pos',
-                args: [[], this.tipo_comprobante_id],
+                args: [this.tipo_comprobante_id, this.pos.config.id],
                 context: this.pos.user.context,
             });
             
@@ -19,11 +19,18 @@ export class NCFPopup extends AbstractAwaitablePopup {
             ncf: this.props.order?.ncf || '',
             auto_generate: true,
             loading: false,
+            sequence_info: null,
         });
         
-        // Get tipos de comprobante from loaded POS data (from odoo_ncf_module)
+        // Tipos de comprobante cargados con la sesión POS (campos mínimos);
+        // la disponibilidad de secuencias se consulta bajo demanda.
         this.tipos_comprobante = this.env.pos.models['tipo.comprobante'] || [];
-        this.loadTiposComprobante();
+        if (!this.tipos_comprobante.length) {
+            this.loadTiposComprobante();
+        }
+        if (this.state.tipo_comprobante_id) {
+            this.loadSequenceInfo(this.state.tipo_comprobante_id);
+        }
     }
 
     async loadTiposComprobante() {
@@ -31,7 +38,7 @@ export class NCFPopup extends AbstractAwaitablePopup {
             const result = await this.env.services.rpc({
                 model: 'pos.order',
                 method: 'get_tipos_comprobante_for_pos',
-                args: [],
+                args: [this.env.pos.config.id],
                 context: this.env.pos.user.context,
             });
             
@@ -43,6 +50,28 @@ export class NCFPopup extends AbstractAwaitablePopup {
         }
     }
 
+    async loadSequenceInfo(tipo_id) {
+        const tipo = this.tipos_comprobante.find(t => t.id === tipo_id);
+        if (!tipo || !tipo.es_fiscal) {
+            this.state.sequence_info = null;
+            return;
+        }
+        try {
+            const result = await this.env.services.rpc({
+                model: 'pos.order',
+                method: 'get_ncf_sequence_info_for_pos',
+                args: [[tipo_id], this.env.pos.config.id],
+                context: this.env.pos.user.context,
+            });
+            // Ignorar respuestas de un tipo que ya no está seleccionado
+            if (result && this.state.tipo_comprobante_id === tipo_id) {
+                this.state.sequence_info = result[tipo_id] || null;
+            }
+        } catch (error) {
+            console.error('Error loading sequence info:', error);
+        }
+    }
+
     get selectedTipoComprobante() {
         if (this.state.tipo_comprobante_id) {
             return this.tipos_comprobante.find(t => t.id === this.state.tipo_comprobante_id);
@@ -58,6 +87,8 @@ export class NCFPopup extends AbstractAwaitablePopup {
     onTipoComprobanteChange(ev) {
         const tipo_id = parseInt(ev.target.value);
         this.state.tipo_comprobante_id = tipo_id;
+        this.state.sequence_info = null;
+        this.loadSequenceInfo(tipo_id);
         
         // Auto-generate NCF if fiscal type is selected
         if (this.state.auto_generate && this.selectedTipoComprobante?.es_fiscal) {
@@ -88,7 +119,7 @@ export class NCFPopup extends AbstractAwaitablePopup {
             const result = await this.env.services.rpc({
                 model: 'pos.order',
                 method: 'generate_ncf_for_pos',
-                args: [[], this.state.tipo_comprobante_id],
+                args: [this.state.tipo_comprobante_id, this.env.pos.config.id],
                 context: this.env.pos.user.context,
             });
             
@@ -98,6 +129,7 @@ export class NCFPopup extends AbstractAwaitablePopup {
                 // Mostrar alertas si existen
                 if (result.sequence_info) {
                     const seq_info = result.sequence_info;
+                    this.state.sequence_info = { ...this.state.sequence_info, ...seq_info };
                     if (seq_info.alerta_stock_bajo) {
                         this.env.services.notification.add(
                             _t('⚠️ Stock bajo: Solo quedan %s NCF disponibles', seq_info.disponibles),
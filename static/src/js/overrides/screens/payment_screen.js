@@ -29,6 +29,18 @@ patch(PaymentScreen.prototype, {
         // Check if order requires NCF validation
         const order = this.currentOrder;
         
+        // Known customers use their default tipo_comprobante without the popup
+        if (!order.tipo_comprobante_id) {
+            const tipo_defecto = order.get_default_tipo_comprobante();
+            if (tipo_defecto) {
+                await order.set_tipo_comprobante(tipo_defecto.id);
+                if (order.is_fiscal() && !order.get_ncf()) {
+                    // NCF not available for the default type: let the cashier choose
+                    order.set_tipo_comprobante(null);
+                }
+            }
+        }
+
         // If no tipo_comprobante is selected, show popup
         if (!order.tipo_comprobante_id) {
             const { confirmed } = await this.showNCFPopup();
@@ -0,0 +1,30 @@
+/** @odoo-module */
+import { patch } from "@web/core/utils/patch";
+import { PosDB } from "@point_of_sale/app/store/db";
+import { PartnerPrefixIndex } from "../../models/partner_prefix_index";
+
+// Búsqueda de clientes por RNC/cédula o nombre con el índice de prefijos en
+// memoria; la búsqueda original (por subcadena en todos los campos) queda
+// como respaldo cuando el índice no encuentra coincidencias.
+patch(PosDB.prototype, {
+    get partnerPrefixIndex() {
+        if (!this._partnerPrefixIndex) {
+            this._partnerPrefixIndex = new PartnerPrefixIndex();
+        }
+        return this._partnerPrefixIndex;
+    },
+
+    add_partners(partners) {
+        const updated = super.add_partners(...arguments);
+        this.partnerPrefixIndex.add(partners);
+        return updated;
+    },
+
+    search_partner(query) {
+        const ids = this.partnerPrefixIndex.search(query, this.limit);
+        if (!ids || !ids.length) {
+            return super.search_partner(...arguments);
+        }
+        return ids.map((id) => this.get_partner_by_id(id)).filter(Boolean);
+    },
+});
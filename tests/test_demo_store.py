@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de los almacenes de secuencias de ``demo_app.py`` (``demo_store.py``).
+
+Varios hilos (y, con SQLite, varios procesos) asignan NCF del mismo tipo a la
+vez; no puede haber duplicados, huecos ni números después del límite. No
+requieren Odoo; se ejecutan desde la raíz del repositorio con ``unittest``
+(la raíz es el paquete del módulo POS, que pytest intentaría importar):
+
+    python -m unittest tests.test_demo_store
+"""
+
+import multiprocessing
+import os
+import tempfile
+import threading
+import unittest
+from collections import Counter
+
+import demo_store
+
+TIPO_ID = 1
+INICIO = 1000
+
+
+def _secuencias(total):
+    return {TIPO_ID: {"serie": "B", "codigo": "01", "actual": INICIO, "limite": INICIO + total}}
+
+
+def _asignar_en_hilos(asignar, hilos, operaciones):
+    """Ejecuta ``asignar()`` ``operaciones`` veces en cada hilo y junta los NCF"""
+    resultados = [None] * hilos
+    barrera = threading.Barrier(hilos)
+
+    def target(indice):
+        barrera.wait()
+        resultados[indice] = [asignar() for _i in range(operaciones)]
+
+    pool = [threading.Thread(target=target, args=(i,)) for i in range(hilos)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return [ncf for resultado in resultados for ncf in resultado]
+
+
+def _proceso_sqlite(path, total, hilos, operaciones, cola):
+    """Cada proceso abre su propio almacén sobre el mismo archivo"""
+    store = demo_store.SQLiteSequenceStore(path, _secuencias(total))
+    try:
+        cola.put(_asignar_en_hilos(lambda: store.next_ncf(TIPO_ID), hilos, operaciones))
+    finally:
+        store.close()
+
+
+class TestSequenceStores(unittest.TestCase):
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory(prefix='ncf_demo_test_')
+        self.addCleanup(tmpdir.cleanup)
+        self.path = os.path.join(tmpdir.name, 'demo_ncf.sqlite3')
+
+    def _crear(self, backend, total):
+        store = demo_store.create_store(_secuencias(total), backend=backend, path=self.path)
+        self.addCleanup(store.close)
+        return store
+
+    def assertSinDuplicadosNiHuecos(self, ncfs, total):
+        duplicados = [ncf for ncf, cantidad in Counter(ncfs).items() if cantidad > 1]
+        self.assertEqual(duplicados, [])
+        self.assertEqual(sorted(int(ncf[-8:]) for ncf in ncfs), list(range(INICIO + 1, INICIO + total + 1)))
+
+    def test_hilos_concurrentes(self):
+        hilos, operaciones = 8, 250
+        for backend in ('memory', 'sqlite'):
+            with self.subTest(backend=backend):
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+                store = self._crear(backend, hilos * operaciones)
+                ncfs = _asignar_en_hilos(lambda: store.next_ncf(TIPO_ID), hilos, operaciones)
+                self.assertSinDuplicadosNiHuecos(ncfs, hilos * operaciones)
+
+    def test_procesos_concurrentes_sqlite(self):
+        procesos, hilos, operaciones = 3, 4, 150
+        total = procesos * hilos * operaciones
+        # El esquema se crea antes de lanzar los procesos
+        demo_store.SQLiteSequenceStore(self.path, _secuencias(total)).close()
+        ctx = multiprocessing.get_context('spawn')
+        cola = ctx.Queue()
+        pool = [
+            ctx.Process(target=_proceso_sqlite, args=(self.path, total, hilos, operaciones, cola))
+            for _i in range(procesos)
+        ]
+        for proc in pool:
+            proc.start()
+        ncfs = [ncf for _proc in pool for ncf in cola.get(timeout=120)]
+        for proc in pool:
+            proc.join()
+            self.assertEqual(proc.exitcode, 0)
+        self.assertSinDuplicadosNiHuecos(ncfs, total)
+
+    def test_secuencia_agotada(self):
+        for backend in ('memory', 'sqlite'):
+            with self.subTest(backend=backend):
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+                store = self._crear(backend, 3)
+                self.assertEqual(store.reserve(TIPO_ID, 2)[2:], (INICIO + 1, INICIO + 2))
+                with self.assertRaises(demo_store.SecuenciaAgotada):
+                    store.reserve(TIPO_ID, 2)
+                self.assertEqual(store.next_ncf(TIPO_ID), 'B0100001003')
+                with self.assertRaises(demo_store.SecuenciaAgotada):
+                    store.next_ncf(TIPO_ID)
+                with self.assertRaises(demo_store.SecuenciaNoConfigurada):
+                    store.next_ncf(TIPO_ID + 1)
+
+    def test_sqlite_persiste_entre_reinicios(self):
+        store = demo_store.SQLiteSequenceStore(self.path, _secuencias(10))
+        store.next_ncf(TIPO_ID)
+        store.close()
+        store = self._crear('sqlite', 10)
+        self.assertEqual(store.next_ncf(TIPO_ID), 'B0100001002')
+
+    def test_ruta_generate_ncf(self):
+        import demo_app
+
+        hilos, operaciones = 4, 50
+        anterior = demo_app.STORE
+        self.addCleanup(setattr, demo_app, 'STORE', anterior)
+        demo_app.STORE = self._crear('sqlite', hilos * operaciones)
+
+        def asignar():
+            respuesta = demo_app.app.test_client().post(
+                '/api/generate_ncf', json={'tipo_comprobante_id': TIPO_ID}
+            ).get_json()
+            self.assertTrue(respuesta['success'], respuesta.get('error'))
+            return respuesta['ncf']
+
+        ncfs = _asignar_en_hilos(asignar, hilos, operaciones)
+        self.assertSinDuplicadosNiHuecos(ncfs, hilos * operaciones)
+
+
+if __name__ == '__main__':
+    unittest.main()
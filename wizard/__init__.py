@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+from . import ncf_sequence_pos_split_wizard
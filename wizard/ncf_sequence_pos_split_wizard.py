@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, _
+
+
+class NCFSequencePosSplitWizard(models.TransientModel):
+    _name = 'ncf.sequence.pos.split.wizard'
+    _description = 'Asistente para Reservar Sub-rangos NCF a Terminales POS'
+
+    sequence_id = fields.Many2one(
+        'ncf.sequence',
+        string='Rango Autorizado',
+        required=True,
+        default=lambda self: self.env.context.get('active_id')
+    )
+    company_id = fields.Many2one(
+        related='sequence_id.company_id'
+    )
+    pos_config_ids = fields.Many2many(
+        'pos.config',
+        string='Terminales',
+        required=True,
+        domain="[('company_id', '=', company_id)]"
+    )
+    cantidad = fields.Integer(
+        string='NCF por Terminal',
+        required=True,
+        default=500,
+        help='Cantidad de números a reservar para cada terminal'
+    )
+
+    def action_split(self):
+        """Crea un sub-rango por terminal y muestra las secuencias creadas"""
+        self.ensure_one()
+        shards = self.sequence_id.split_for_pos_configs(self.pos_config_ids, self.cantidad)
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('Sub-rangos por Terminal'),
+            'res_model': 'ncf.sequence',
+            'view_mode': 'tree,form',
+            'domain': [('id', 'in', shards.ids)],
+            'target': 'current',
+        }